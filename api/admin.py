@@ -1,7 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import F
 from parler.admin import TranslatableAdmin
 from .models import (
-    Language, Category, Place, PlaceImage, OpeningHour,
+    Language, Category, Place, PlaceImage, OpeningHour, PlaceLike, TranslationMemory,
     ExpectationDefinition, SortTagDefinition
 )
 
@@ -33,7 +35,7 @@ class OpeningHourInline(admin.TabularInline):
 
 @admin.register(Place)
 class PlaceAdmin(TranslatableAdmin):
-    list_display = ('get_primary_name', 'get_category_name', 'is_active', 'created_at')
+    list_display = ('get_primary_name', 'get_category_name', 'is_active', 'like_count', 'created_at')
     list_filter = ('category', 'is_active', 'kyrenia', 'nicosia')
     search_fields = ('translations__name', 'translations__description', 'address')
     inlines = [PlaceImageInline, OpeningHourInline]
@@ -51,3 +53,37 @@ class PlaceAdmin(TranslatableAdmin):
             return obj.category.safe_translation_getter('name', any_language=True)
         return None
     get_category_name.short_description = 'Category'
+
+
+@admin.register(PlaceLike)
+class PlaceLikeAdmin(admin.ModelAdmin):
+    # Likes are only created through the like endpoint, which maintains
+    # Place.like_count; here they can be inspected and deleted, and deleting
+    # decrements the counters the same way.
+    list_display = ('place', 'device_id', 'created_at')
+    search_fields = ('device_id',)
+    raw_id_fields = ('place',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, PlaceLike.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Per place, by what was actually deleted, like the like endpoint.
+        with transaction.atomic():
+            for place_id in set(queryset.values_list('place_id', flat=True)):
+                deleted, _ = queryset.filter(place_id=place_id).delete()
+                if deleted:
+                    Place.objects.filter(pk=place_id).update(like_count=F('like_count') - deleted)
+
+
+@admin.register(TranslationMemory)
+class TranslationMemoryAdmin(admin.ModelAdmin):
+    list_display = ('source_text', 'source_language', 'target_language', 'backend', 'translated_text', 'created_at')
+    list_filter = ('backend', 'source_language', 'target_language')
+    search_fields = ('source_text', 'translated_text')
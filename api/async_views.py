@@ -0,0 +1,115 @@
+"""
+Async versions of the hot read endpoints (places list and detail,
+filter-options, wheel-spin) for ASGI deployments, routed ahead of the sync
+views when ASYNC_API_VIEWS is on (see api.urls).
+
+They reuse the sync views' query parameter handling, querysets and
+serializers, and go through the async ORM and cache wherever the sync views
+would block: under ASGI a sync view holds a worker thread for the whole
+request, these only hand the remaining sync-only steps (django-filter's
+validation, serializing a detail payload on a cache miss) to one.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod
+from django.utils.http import parse_etags
+from django.utils.translation import get_language
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from . import views
+from .attributes import attribute_index
+from .models import Place
+from .serializers import PlaceDetailSerializer, PlaceListSerializer, WheelSpinRequestSerializer
+
+
+class AsyncAPIView(View):
+    """
+    The parts of APIView these endpoints need, for async handlers: a DRF
+    Request, JSON rendering with DRF's renderer and DRF's exception handler.
+    Like the sync views they use no authentication, permissions or throttling.
+    Responses are always JSON; there is no browsable API.
+    """
+    renderer = JSONRenderer()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+        try:
+            return await super().dispatch(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = exception_handler(exc, {'view': self, 'args': args, 'kwargs': kwargs, 'request': self.request})
+            if response is None:
+                raise
+            return self.respond(response.data, response.status_code, headers=dict(response.items()) or None)
+
+    def respond(self, data, status=status.HTTP_200_OK, headers=None):
+        headers = {key: value for key, value in (headers or {}).items() if key.lower() != 'content-type'}
+        return HttpResponse(
+            self.renderer.render(data), status=status, content_type=self.renderer.media_type, headers=headers
+        )
+
+    def place_viewset(self, action, **kwargs):
+        # A PlaceViewSet set up as its dispatch() would for `action`.
+        return views.PlaceViewSet(action=action, request=self.request, format_kwarg=None, args=(), kwargs=kwargs)
+
+
+class PlaceListView(AsyncAPIView):
+    async def get(self, request):
+        viewset = self.place_viewset('list')
+        # django-filter validates ?category= against the database.
+        queryset = await sync_to_async(viewset.filter_queryset)(viewset.get_queryset())
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(viewset.get_list_rows(queryset), request, view=viewset)
+        data = await PlaceListSerializer.aserialize_rows(page, viewset.get_sparse_fields())
+        return self.respond(paginator.get_paginated_response(data).data)
+
+
+class PlaceDetailView(AsyncAPIView):
+    async def get(self, request, pk):
+        viewset = self.place_viewset('retrieve', pk=pk)
+        queryset = await sync_to_async(viewset.filter_queryset)(viewset.get_queryset())
+        try:
+            instance = await queryset.aget(pk=pk)
+        except (Place.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404(f"No {Place._meta.object_name} matches the given query.")
+        instance.set_current_language(get_language())
+        serializer = viewset.get_serializer(instance)
+        return self.respond(await serializer.ato_representation(instance))
+
+
+class FilterOptionsView(AsyncAPIView):
+    async def get(self, request):
+        payload, etag = await views.FilterOptionsView(request=request, format_kwarg=None).aget_cached_payload()
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return self.respond(payload, headers={'ETag': etag})
+
+
+class WheelSpinView(AsyncAPIView):
+    async def post(self, request):
+        view = views.WheelSpinView(request=request, format_kwarg=None)
+        request_serializer = WheelSpinRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return self.respond(request_serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        data = request_serializer.validated_data
+        place_pk = await attribute_index.arandom_pk(view.get_mask(data), data.get('category_ids'))
+        if place_pk is not None:
+            place = await Place.objects.language(get_language()).filter(
+                pk=place_pk, is_active=True
+            ).order_by().prefetch_related('open_times').afirst()
+            if place:
+                serializer = PlaceDetailSerializer(place, context=view.get_serializer_context())
+                return self.respond(await serializer.ato_representation(place))
+
+        return self.respond(view.not_found_payload, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,293 @@
+import operator
+import random
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import reduce
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Case, F, Value, When
+
+from .caching import aget_version, bump_version, get_version
+from .instrumentation import record_cache
+
+
+# Bit positions are persisted in Place.attribute_mask, so new flags must only
+# ever be appended to this tuple (in a migration that drops and re-adds that
+# generated column: the database cannot alter its expression).
+ATTRIBUTE_FIELDS = (
+    # Expectations
+    'outside_area', 'inside_area', 'reservation', 'kids_menu', 'baby_sit', 'kard_pay',
+    'cash', 'free_park_area', 'bar', 'coffee', 'dessert', 'kitchen',
+    'wheelchair_accessible_entrance', 'pets_allow', 'fish', 'meat_and_chicken',
+    # Sorting tags
+    'popular', 'historical_places', 'alcohol', 'beach', 'creative_places', 'castles',
+    'museum', 'parks', 'waterfalls', 'hiking_trails',
+    # Regions
+    'kyrenia', 'nicosia', 'famagusta', 'iskele', 'guzelyurt', 'karpaz', 'lefke',
+    # Other flags
+    'currency_supported', 'is_active',
+)
+ATTRIBUTE_BITS = {field: 1 << position for position, field in enumerate(ATTRIBUTE_FIELDS)}
+
+EXPECTATION_KEY_FIELDS = {
+    "outsideArea": "outside_area", "kardPay": "kard_pay", "coffee": "coffee",
+    "meatAndChicken": "meat_and_chicken",
+    "insideArea": "inside_area", "reservation": "reservation", "kidsMenu": "kids_menu", "babySit": "baby_sit",
+    "cash": "cash", "freeParkArea": "free_park_area", "bar": "bar", "dessert": "dessert", "kitchen": "kitchen",
+    "WheelchairAccessibleEntrance": "wheelchair_accessible_entrance", "petsAllow": "pets_allow", "fish": "fish"
+}
+
+SORTING_TAG_KEY_FIELDS = {
+    "historicalPlaces": "historical_places", "creativePlaces": "creative_places",
+    "hikingTrails": "hiking_trails", "popular": "popular", "alcohol": "alcohol", "beach": "beach",
+    "castles": "castles",
+    "museum": "museum", "parks": "parks", "waterfalls": "waterfalls",
+    "kyrenia": "kyrenia", "nicosia": "nicosia", "famagusta": "famagusta",
+    "iskele": "iskele", "guzelyurt": "guzelyurt", "karpaz": "karpaz", "lefke": "lefke"
+}
+
+REGION_KEY_FIELDS = {
+    "kyrenia": "kyrenia", "nicosia": "nicosia", "famagusta": "famagusta", "iskele": "iskele",
+    "guzelyurt": "guzelyurt", "karpaz": "karpaz", "lefke": "lefke"
+}
+
+
+def attribute_mask_expression():
+    # The database computes Place.attribute_mask from this, so every write
+    # path (save(), update(), bulk_create(), raw SQL) keeps it in step.
+    return reduce(operator.add, (
+        Case(When(**{field: True}, then=Value(bit)), default=Value(0)) for field, bit in ATTRIBUTE_BITS.items()
+    ))
+
+
+def compute_attribute_mask(place):
+    mask = 0
+    for field, bit in ATTRIBUTE_BITS.items():
+        if getattr(place, field, False):
+            mask |= bit
+    return mask
+
+
+def mask_for_keys(keys, key_fields, allow_field_names=False):
+    # Unknown keys are ignored, like the per-key Q() filters this replaces.
+    # With allow_field_names, raw boolean field names are accepted as well.
+    mask = 0
+    for key in keys:
+        field = key_fields.get(key)
+        if field is None and allow_field_names and key in ATTRIBUTE_BITS:
+            field = key
+        if field:
+            mask |= ATTRIBUTE_BITS[field]
+    return mask
+
+
+def filter_by_attribute_mask(queryset, mask):
+    if not mask:
+        return queryset
+    alias = f'_attribute_match_{mask}'
+    return queryset.alias(**{alias: F('attribute_mask').bitand(mask)}).filter(**{alias: mask})
+
+
+def _digits_to_int(digits):
+    return int(digits[::-1].decode() or '0', 2)
+
+
+class AttributeIndex:
+    """
+    In-process mirror of Place.attribute_mask: one bitset per attribute (and per
+    category), where bit i stands for the i-th place in primary key order.
+
+    Every process keeps its own copy and compares it against a version key in
+    the Django cache, so the cache must be shared between processes (see
+    api.checks). A process that is only a few single-place changes behind
+    patches those places' bits; anything else reloads the whole index.
+    """
+    VERSION_CACHE_KEY = 'api:attribute_index:version'
+    MAX_CANDIDATE_POOLS = 256
+    MAX_PATCHED_CHANGES = 64
+    CHANGE_TIMEOUT = 60 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._snapshot = None
+
+    def invalidate(self, place_id=None):
+        # `place_id` names the only Place that changed (saved, not deleted);
+        # without it every process reloads.
+        version = bump_version(self.VERSION_CACHE_KEY)
+        if place_id is not None and version is not None:
+            cache.set(self._change_key(version), place_id, self.CHANGE_TIMEOUT)
+
+    def _change_key(self, version):
+        return f'{self.VERSION_CACHE_KEY}:{version}:place'
+
+    def _current(self):
+        # The version and the snapshot it belongs to, read together.
+        with self._lock:
+            return self._version, self._snapshot
+
+    def _get_snapshot(self):
+        version = get_version(self.VERSION_CACHE_KEY)
+        current_version, snapshot = self._current()
+        if current_version == version:
+            record_cache('attribute_index', True)
+            return snapshot
+        record_cache('attribute_index', False)
+        with self._lock:
+            if self._version != version:
+                self._snapshot = self._refresh(self._version, self._snapshot, version)
+                self._version = version
+            return self._snapshot
+
+    def _refresh(self, old_version, snapshot, version):
+        behind = version - old_version if snapshot is not None else 0
+        if 0 < behind <= self.MAX_PATCHED_CHANGES:
+            changes = cache.get_many([self._change_key(old_version + step) for step in range(1, behind + 1)])
+            if len(changes) == behind:
+                patched = self._patch(snapshot, set(changes.values()))
+                if patched is not None:
+                    return patched
+        return self._load()
+
+    def _patch(self, snapshot, place_ids):
+        """
+        A copy of `snapshot` with the bits of `place_ids` re-read, or None when
+        that needs a full reload: a place was deleted, or is new but does not
+        sort after every loaded one.
+        """
+        from .models import Place
+
+        rows = {
+            pk: (mask, category_id)
+            for pk, mask, category_id in Place.objects.filter(pk__in=place_ids).values_list(
+                'pk', 'attribute_mask', 'category_id'
+            )
+        }
+        if len(rows) != len(place_ids):
+            return None
+        pks, attribute_bits, category_bits, _ = snapshot
+        # Snapshots are shared with concurrent readers, so nothing is changed in place.
+        pks, attribute_bits, category_bits = list(pks), dict(attribute_bits), dict(category_bits)
+        for pk in sorted(place_ids):
+            position = bisect_left(pks, pk)
+            if position == len(pks):
+                pks.append(pk)
+            elif pks[position] != pk:
+                return None
+            bit = 1 << position
+            mask, category_id = rows[pk]
+            for field, field_bit in ATTRIBUTE_BITS.items():
+                attribute_bits[field] = attribute_bits[field] | bit if mask & field_bit else attribute_bits[field] & ~bit
+            for other_id in category_bits:
+                category_bits[other_id] &= ~bit
+            category_bits[category_id] = category_bits.get(category_id, 0) | bit
+        return pks, attribute_bits, category_bits, OrderedDict()
+
+    def _load(self):
+        from .models import Place
+
+        rows = list(Place.objects.order_by('pk').values_list('pk', 'attribute_mask', 'category_id'))
+        # Bitsets are built as '0'/'1' digit strings and converted once; OR-ing
+        # single bits into a growing int would be quadratic in the catalog size.
+        attribute_digits = {field: bytearray(b'0') * len(rows) for field in ATTRIBUTE_FIELDS}
+        category_digits = {}
+        pks = []
+        for position, (pk, mask, category_id) in enumerate(rows):
+            pks.append(pk)
+            for field, bit in ATTRIBUTE_BITS.items():
+                if mask & bit:
+                    attribute_digits[field][position] = ord('1')
+            if category_id not in category_digits:
+                category_digits[category_id] = bytearray(b'0') * len(rows)
+            category_digits[category_id][position] = ord('1')
+        attribute_bits = {field: _digits_to_int(digits) for field, digits in attribute_digits.items()}
+        category_bits = {category_id: _digits_to_int(digits) for category_id, digits in category_digits.items()}
+        return pks, attribute_bits, category_bits, OrderedDict()
+
+    @staticmethod
+    def _select(snapshot, mask, category_ids):
+        pks, attribute_bits, category_bits, _ = snapshot
+        bits = (1 << len(pks)) - 1
+        for field, bit in ATTRIBUTE_BITS.items():
+            if mask & bit:
+                bits &= attribute_bits[field]
+        if category_ids:
+            selected_categories = 0
+            for category_id in category_ids:
+                selected_categories |= category_bits.get(category_id, 0)
+            bits &= selected_categories
+        return bits
+
+    def count(self, mask=0, category_ids=None):
+        return self._select(self._get_snapshot(), mask, category_ids).bit_count()
+
+    def facet_counts(self, mask=0, category_ids=None):
+        """
+        (total, {attribute field: count}, {category id: count}) of the places
+        matching `mask` and `category_ids`, by AND-ing the selection with each
+        bitset and counting bits; no query once the snapshot is loaded.
+        """
+        pks, attribute_bits, category_bits, _ = snapshot = self._get_snapshot()
+        bits = self._select(snapshot, mask, category_ids)
+        return (
+            bits.bit_count(),
+            {field: (bits & field_bits).bit_count() for field, field_bits in attribute_bits.items()},
+            {category_id: (bits & ids_bits).bit_count() for category_id, ids_bits in category_bits.items()},
+        )
+
+    def matching_pks(self, mask=0, category_ids=None):
+        return list(self._matching_pks(self._get_snapshot(), mask, category_ids))
+
+    def _matching_pks(self, snapshot, mask, category_ids):
+        pks = snapshot[0]
+        # Scanning the binary string is linear in the catalog size, whereas
+        # peeling off set bits one at a time would be quadratic on big ints.
+        digits = bin(self._select(snapshot, mask, category_ids))[:1:-1]
+        result = []
+        position = digits.find('1')
+        while position != -1:
+            result.append(pks[position])
+            position = digits.find('1', position + 1)
+        return tuple(result)
+
+    def candidate_pool(self, mask=0, category_ids=None):
+        return self._candidate_pool(self._get_snapshot(), mask, category_ids)
+
+    def _candidate_pool(self, snapshot, mask, category_ids):
+        # Pools are memoised per normalised filter signature and belong to the
+        # snapshot, so they are dropped together with it when a Place changes.
+        pools = snapshot[3]
+        signature = (mask, tuple(sorted(set(category_ids or ()))))
+        with self._lock:
+            pool = pools.get(signature)
+            if pool is not None:
+                pools.move_to_end(signature)
+                return pool
+        pool = self._matching_pks(snapshot, mask, signature[1])
+        with self._lock:
+            pools[signature] = pool
+            if len(pools) > self.MAX_CANDIDATE_POOLS:
+                pools.popitem(last=False)
+        return pool
+
+    def random_pk(self, mask=0, category_ids=None):
+        pool = self.candidate_pool(mask, category_ids)
+        return random.choice(pool) if pool else None
+
+    async def arandom_pk(self, mask=0, category_ids=None):
+        # random_pk() for async views: the version check goes through the async
+        # cache, and only a stale snapshot is (re)loaded in a worker thread.
+        version = await aget_version(self.VERSION_CACHE_KEY)
+        current_version, snapshot = self._current()
+        if current_version == version:
+            record_cache('attribute_index', True)
+        else:
+            snapshot = await sync_to_async(self._get_snapshot)()
+        pool = self._candidate_pool(snapshot, mask, category_ids)
+        return random.choice(pool) if pool else None
+
+
+attribute_index = AttributeIndex()
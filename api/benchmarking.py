@@ -0,0 +1,139 @@
+import contextlib
+import random
+import statistics
+import time
+from datetime import time as clock_time
+
+from django.conf import settings
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from .attributes import (
+    ATTRIBUTE_FIELDS, EXPECTATION_KEY_FIELDS, REGION_KEY_FIELDS, SORTING_TAG_KEY_FIELDS, attribute_index,
+)
+from .geo import geo_cell_for
+from .models import Category, ExpectationDefinition, OpeningHour, Place, PlaceImage, SortTagDefinition
+from .listings import rebuild_place_listings
+
+
+@contextlib.contextmanager
+def benchmark_database(verbosity=0):
+    # Seeded data goes into a throwaway test database, never the configured one.
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def seed_catalog(place_count, languages=None, category_count=8, images_per_place=0,
+                 with_opening_hours=False, batch_size=1000, seed=0):
+    rnd = random.Random(seed)
+    languages = languages or [settings.LANGUAGE_CODE]
+
+    categories = []
+    for index in range(category_count):
+        category = Category(icon_key=f"category_{index}")
+        for lang_code in languages:
+            category.set_current_language(lang_code)
+            category.name = f"Category {index} ({lang_code})"
+        category.save()
+        categories.append(category)
+
+    PlaceTranslation = Place._parler_meta.root_model
+    for start in range(0, place_count, batch_size):
+        places = []
+        for index in range(start, min(start + batch_size, place_count)):
+            place = Place(
+                category=rnd.choice(categories),
+                address=f"{index} Benchmark Street",
+                latitude=round(rnd.uniform(35.0, 35.7), 6),
+                longitude=round(rnd.uniform(32.7, 34.6), 6),
+                main_image=f"https://example.com/places/{index}.jpg",
+            )
+            for field in ATTRIBUTE_FIELDS:
+                setattr(place, field, rnd.random() < 0.3)
+            place.is_active = rnd.random() < 0.95
+            place.geo_cell = geo_cell_for(place.latitude, place.longitude)
+            places.append(place)
+        # bulk_create skips Place.save(), so geo_cell is filled in above
+        # (attribute_mask is generated by the database).
+        places = Place.objects.bulk_create(places)
+
+        translations = []
+        opening_hours = []
+        images = []
+        for place in places:
+            for lang_code in languages:
+                translations.append(PlaceTranslation(
+                    master_id=place.pk, language_code=lang_code,
+                    name=f"Place {place.pk} {lang_code}",
+                    description=f"Benchmark description for place {place.pk} in {lang_code}.",
+                ))
+            if with_opening_hours:
+                for day in range(7):
+                    opens = rnd.randint(6, 12)
+                    closes = rnd.choice([(opens + 8) % 24, 23, 2])
+                    opening_hours.append(OpeningHour(
+                        place=place, day_of_week=day,
+                        open_time=clock_time(opens, 0), close_time=clock_time(closes, 30),
+                    ))
+            for order in range(images_per_place):
+                images.append(PlaceImage(
+                    place=place, image_url=f"https://example.com/places/{place.pk}/{order}.jpg", order=order,
+                ))
+        PlaceTranslation.objects.bulk_create(translations, batch_size=batch_size)
+        OpeningHour.objects.bulk_create(opening_hours, batch_size=batch_size)
+        PlaceImage.objects.bulk_create(images, batch_size=batch_size)
+
+    # Nothing above sent post_save, so rebuild what the signals would maintain.
+    rebuild_place_listings(batch_size=batch_size)
+    attribute_index.invalidate()
+    return categories
+
+
+def seed_definitions(languages=None):
+    # One definition per filter key, labelled in every language, so
+    # /api/filter-options/ and the detail payload have real labels to resolve.
+    languages = languages or [settings.LANGUAGE_CODE]
+    # The detail serializer also labels alcohol as an expectation and coffee
+    # as a sort tag.
+    sort_tag_types = {key: 'general' for key in [*SORTING_TAG_KEY_FIELDS, 'coffee']}
+    sort_tag_types.update({key: 'region' for key in REGION_KEY_FIELDS})
+    definitions = [(ExpectationDefinition, key, {}) for key in {**EXPECTATION_KEY_FIELDS, 'alcohol': None}]
+    definitions += [(SortTagDefinition, key, {'type': sort_type}) for key, sort_type in sort_tag_types.items()]
+    for model, key, extra in definitions:
+        definition = model(key=key, icon_key=f"icon_{key}", **extra)
+        for lang_code in languages:
+            definition.set_current_language(lang_code)
+            definition.name = f"{key} ({lang_code})"
+        definition.save()
+
+
+def measure(func, iterations):
+    timings = []
+    query_counts = []
+    for _ in range(iterations):
+        # The query log is a bounded deque; once full, the captured count would stay at zero.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+    return summarize(timings, query_counts)
+
+
+def summarize(timings, query_counts):
+    percentiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+    return {
+        'iterations': len(timings),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(percentiles[49], 3),
+        'p95_ms': round(percentiles[94], 3),
+        'p99_ms': round(percentiles[98], 3),
+        'max_ms': round(max(timings), 3),
+        'queries_mean': round(statistics.fmean(query_counts), 2),
+        'queries_max': max(query_counts),
+    }
@@ -0,0 +1,92 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFINITIONS_VERSION_KEY = 'api:definitions:version'
+PLACE_FACETS_VERSION_KEY = 'api:place_facets:version'
+
+
+def _initial_version():
+    # Seeded from the clock rather than 0, so a version key that was evicted
+    # never comes back with a value that older cache entries were stored under.
+    return time.time_ns() // 1000
+
+
+def get_version(key):
+    return cache.get_or_set(key, _initial_version, None)
+
+
+def get_versions(*keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = get_version(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_version(key):
+    return await cache.aget_or_set(key, _initial_version, None)
+
+
+async def aget_versions(*keys):
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = await aget_version(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    # The new version, or None when the key was missing and had to be re-seeded.
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def place_version_key(place_id):
+    return f'api:place:{place_id}:version'
+
+
+def place_detail_cache_key(place_id, language_code, fields=None, languages=None):
+    # `fields` names the cached fields of a sparse (?fields= / ?omit=) payload,
+    # `languages` the translations it carries (?languages=).
+    versions = get_versions(place_version_key(place_id), DEFINITIONS_VERSION_KEY)
+    return _place_detail_cache_key(place_id, language_code, versions, fields, languages)
+
+
+async def aplace_detail_cache_key(place_id, language_code, fields=None, languages=None):
+    versions = await aget_versions(place_version_key(place_id), DEFINITIONS_VERSION_KEY)
+    return _place_detail_cache_key(place_id, language_code, versions, fields, languages)
+
+
+def _place_detail_cache_key(place_id, language_code, versions, fields, languages):
+    place_version, definitions_version = versions
+    key = f'api:place_detail:{place_id}:{language_code}:{place_version}:{definitions_version}'
+    if fields is not None or languages is not None:
+        # None (the default) and an empty selection must not share a key: a
+        # sparse payload of volatile fields only caches {}.
+        fields_part = '*' if fields is None else 'f:' + ','.join(fields)
+        if languages is None or isinstance(languages, str):
+            languages_part = languages or '*'
+        else:
+            languages_part = 'l:' + ','.join(languages)
+        variant = f'{fields_part}|{languages_part}'
+        key += ':' + hashlib.sha1(variant.encode()).hexdigest()[:16]
+    return key
+
+
+def get_place_detail_timeout():
+    return getattr(settings, 'PLACE_DETAIL_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def place_facets_cache_key(signature):
+    # `signature` is the normalised filter part of the request, see api.facets.
+    version = get_version(PLACE_FACETS_VERSION_KEY)
+    return f'api:place_facets:{version}:' + hashlib.sha1(signature.encode()).hexdigest()
+
+
+def get_place_facets_timeout():
+    return getattr(settings, 'PLACE_FACETS_CACHE_TIMEOUT', 60 * 60)
@@ -0,0 +1,17 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    # Cache version keys are how processes learn that their in-process state
+    # (AttributeIndex, definition registries) and cached payloads are stale.
+    if not isinstance(caches['default'], LocMemCache):
+        return []
+    return [Error(
+        "The default cache is a LocMemCache, which each process keeps for itself: after a Place is saved, "
+        "other worker processes keep serving stale wheel spins, place details and facet counts.",
+        hint="Set REDIS_URL (see CACHES in settings), or run a single worker process and silence this check.",
+        id='api.E001',
+    )]
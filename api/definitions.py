@@ -0,0 +1,65 @@
+import threading
+
+from parler import appsettings as parler_appsettings
+
+from .caching import DEFINITIONS_VERSION_KEY, get_version
+from .instrumentation import record_cache
+
+
+class DefinitionEntry:
+    __slots__ = ('key', 'icon_key', 'labels')
+
+    def __init__(self, key, icon_key, labels):
+        self.key = key
+        self.icon_key = icon_key
+        self.labels = labels
+
+    def label(self, language_code):
+        if language_code in self.labels:
+            return self.labels[language_code]
+        for fallback in parler_appsettings.PARLER_LANGUAGES.get_fallback_languages(language_code):
+            if fallback in self.labels:
+                return self.labels[fallback]
+        if self.labels:
+            return next(iter(self.labels.values()))
+        return self.key.title()
+
+
+class DefinitionRegistry:
+    """
+    Process-wide map of definition key -> DefinitionEntry (labels in every
+    language plus icon_key). Reloaded when the definitions version changes,
+    which api.signals bumps on any definition or translation save.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = {}
+
+    def all(self):
+        version = get_version(DEFINITIONS_VERSION_KEY)
+        if self._version == version:
+            record_cache('definitions', True)
+            return self._entries
+        record_cache('definitions', False)
+        with self._lock:
+            if self._version != version:
+                self._entries = self._load()
+                self._version = version
+            return self._entries
+
+    def _load(self):
+        from django.apps import apps
+
+        model = apps.get_model('api', self.model_name)
+        entries = {}
+        for definition in model.objects.prefetch_related('translations'):
+            labels = {translation.language_code: translation.name for translation in definition.translations.all()}
+            entries[definition.key] = DefinitionEntry(definition.key, definition.icon_key, labels)
+        return entries
+
+
+expectation_definitions = DefinitionRegistry('ExpectationDefinition')
+sort_tag_definitions = DefinitionRegistry('SortTagDefinition')
@@ -0,0 +1,90 @@
+"""
+Facet counts of /api/places/facets/: how many of the places the list would
+return for the same filters fall in each category and carry each expectation,
+sort tag and region.
+
+Filters the AttributeIndex bitsets can express (category, expectations,
+sorting_tags) are counted in memory; anything else (search, category_name,
+opening hours) is one grouped aggregate query over the filtered PlaceListing
+rows. Either way the result is the same (total, field counts, category counts)
+triple, which facets_payload() turns into the response.
+"""
+from urllib.parse import urlencode
+
+from django.db.models import Count, F
+from django.db.models.lookups import Exact
+from django_filters.constants import EMPTY_VALUES
+
+from .attributes import (
+    ATTRIBUTE_BITS, EXPECTATION_KEY_FIELDS, REGION_KEY_FIELDS, SORTING_TAG_KEY_FIELDS, mask_for_keys
+)
+from .filters import split_keys
+from .opening_hours import current_week_time
+
+# Response section -> {key: attribute field}, with the keys ?expectations= and
+# ?sorting_tags= take. Regions are sorting tags too, but listed on their own
+# like in /api/filter-options/.
+FACET_KEY_FIELDS = {
+    'expectations': EXPECTATION_KEY_FIELDS,
+    'sort_tags': {key: field for key, field in SORTING_TAG_KEY_FIELDS.items() if key not in REGION_KEY_FIELDS},
+    'regions': REGION_KEY_FIELDS,
+}
+FACET_FIELDS = tuple(dict.fromkeys(field for key_fields in FACET_KEY_FIELDS.values() for field in key_fields.values()))
+
+# PlaceFilter filters that AttributeIndex can evaluate.
+INDEX_FILTERS = frozenset({'category', 'expectations', 'sorting_tags'})
+
+
+def facets_signature(query_params, names, language_code):
+    # The parameters among `names` that are set, in a fixed order; with
+    # ?open_now= the counts also depend on the current minute.
+    params = {name: query_params[name].strip() for name in names if query_params.get(name, '').strip()}
+    if 'open_now' in params:
+        params['now'] = '{}T{:%H:%M}'.format(*current_week_time())
+    return f'{language_code}?{urlencode(sorted(params.items()))}'
+
+
+def index_selection(cleaned_data):
+    """
+    (mask, category_ids) for AttributeIndex.facet_counts() of a validated
+    PlaceFilter, or None when it sets filters other than INDEX_FILTERS.
+    """
+    if any(value not in EMPTY_VALUES for name, value in cleaned_data.items() if name not in INDEX_FILTERS):
+        return None
+    # The index holds inactive places as well; the list does not.
+    mask = ATTRIBUTE_BITS['is_active']
+    mask |= mask_for_keys(split_keys(cleaned_data.get('expectations') or ''), EXPECTATION_KEY_FIELDS)
+    mask |= mask_for_keys(split_keys(cleaned_data.get('sorting_tags') or ''), SORTING_TAG_KEY_FIELDS)
+    category = cleaned_data.get('category')
+    return mask, [category.pk] if category else None
+
+
+def count_in_database(queryset):
+    # AttributeIndex.facet_counts() of a filtered PlaceListing queryset, with
+    # one conditional COUNT per field, grouped by category.
+    rows = queryset.order_by().values('category_id').annotate(
+        facet_total=Count('pk'),
+        **{
+            f'facet_{field}': Count('pk', filter=Exact(F('attribute_mask').bitand(ATTRIBUTE_BITS[field]),
+                                                       ATTRIBUTE_BITS[field]))
+            for field in FACET_FIELDS
+        },
+    )
+    total, field_counts, category_counts = 0, dict.fromkeys(FACET_FIELDS, 0), {}
+    for row in rows:
+        total += row['facet_total']
+        category_counts[row['category_id']] = row['facet_total']
+        for field in FACET_FIELDS:
+            field_counts[field] += row[f'facet_{field}']
+    return total, field_counts, category_counts
+
+
+def facets_payload(total, field_counts, category_counts, category_ids):
+    # Every category and key is listed, with 0 when nothing matches.
+    payload = {
+        'count': total,
+        'place_types': {category_id: category_counts.get(category_id, 0) for category_id in category_ids},
+    }
+    for section, key_fields in FACET_KEY_FIELDS.items():
+        payload[section] = {key: field_counts[field] for key, field in key_fields.items()}
+    return payload
@@ -1,6 +1,40 @@
 import django_filters
-from django.db.models import Q
-from .models import Place, Category
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.translation import get_language
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from .models import Place, Category, OpeningHour, PlaceListing
+from .attributes import (
+    EXPECTATION_KEY_FIELDS, SORTING_TAG_KEY_FIELDS, filter_by_attribute_mask, mask_for_keys
+)
+from .opening_hours import MINUTES_PER_WEEK, current_week_time, parse_week_time
+from .search import search_listings
+
+
+class WeekTimeField(forms.CharField):
+    default_error_messages = {
+        'invalid': 'Enter a weekday and a time as <weekday>T<HH:MM>, e.g. friT18:30 or 4T18:30.',
+    }
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if not value:
+            return None
+        try:
+            return parse_week_time(value)
+        except ValueError:
+            raise ValidationError(self.error_messages['invalid'], code='invalid')
+
+
+class WeekTimeFilter(django_filters.Filter):
+    # Cleans to a (day_of_week, time) tuple.
+    field_class = WeekTimeField
+
 
 class PlaceFilter(django_filters.FilterSet):
 
@@ -13,6 +47,12 @@ class PlaceFilter(django_filters.FilterSet):
     sorting_tags = django_filters.CharFilter(method='filter_by_sorting_tags',
                                              label="Filter by comma-separated sorting/region keys")
 
+    open_now = django_filters.BooleanFilter(method='filter_by_open_now',
+                                            label="Only places open (true) or closed (false) right now")
+
+    open_at = WeekTimeFilter(method='filter_by_open_at',
+                             label="Only places open at <weekday>T<HH:MM>, e.g. friT18:30")
+
     class Meta:
         model = Place
         fields = ['category']
@@ -23,52 +63,167 @@ class PlaceFilter(django_filters.FilterSet):
             return queryset
 
 
-        return queryset.filter(category__translations__name__icontains=value).distinct()
+        # A subquery rather than a join, so places are not repeated per
+        # matching translation and the filter also works on PlaceListing.
+        return queryset.filter(category__in=Category._parler_meta.root_model.objects.filter(
+            name__icontains=value
+        ).values('master_id'))
 
     def filter_by_expectations(self, queryset, name, value):
 
-        keys = [key.strip() for key in value.split(',') if key.strip()]
+        keys = split_keys(value)
         if not keys:
             return queryset
-        exp_map = {
-            "outsideArea": "outside_area", "kardPay": "kard_pay", "coffee": "coffee",
-            "meatAndChicken": "meat_and_chicken",
-            "insideArea": "inside_area", "reservation": "reservation", "kidsMenu": "kids_menu", "babySit": "baby_sit",
-            "cash": "cash", "freeParkArea": "free_park_area", "bar": "bar", "dessert": "dessert", "kitchen": "kitchen",
-            "WheelchairAccessibleEntrance": "wheelchair_accessible_entrance", "petsAllow": "pets_allow", "fish": "fish"
-        }
-
-        q_objects = Q()
-        for key in keys:
-            model_field = exp_map.get(key)
-            if model_field:
-                q_objects &= Q(**{model_field: True})
-            else:
-                pass
-
-        return queryset.filter(q_objects)
+
+        return filter_by_attribute_mask(queryset, mask_for_keys(keys, EXPECTATION_KEY_FIELDS))
 
     def filter_by_sorting_tags(self, queryset, name, value):
 
-        keys = [key.strip() for key in value.split(',') if key.strip()]
+        keys = split_keys(value)
         if not keys:
             return queryset
 
-        sort_map = {
-            "historicalPlaces": "historical_places", "creativePlaces": "creative_places",
-            "hikingTrails": "hiking_trails", "popular": "popular", "alcohol": "alcohol", "beach": "beach",
-            "castles": "castles",
-            "museum": "museum", "parks": "parks", "waterfalls": "waterfalls",
-            "kyrenia": "kyrenia", "nicosia": "nicosia", "famagusta": "famagusta",
-            "iskele": "iskele", "guzelyurt": "guzelyurt", "karpaz": "karpaz", "lefke": "lefke"
-        }
-
-        q_objects = Q()
-        for key in keys:
-            model_field = sort_map.get(key)
-            if model_field:
-                q_objects &= Q(**{model_field: True})
-            else:
-                pass
-
-        return queryset.filter(q_objects)
\ No newline at end of file
+        return filter_by_attribute_mask(queryset, mask_for_keys(keys, SORTING_TAG_KEY_FIELDS))
+
+    def filter_by_open_now(self, queryset, name, value):
+        open_places = {f'{place_ref(queryset)}__in': open_place_ids(*current_week_time())}
+        return queryset.filter(**open_places) if value else queryset.exclude(**open_places)
+
+    def filter_by_open_at(self, queryset, name, value):
+        return queryset.filter(**{f'{place_ref(queryset)}__in': open_place_ids(*value)})
+
+
+class PlaceListingFilter(PlaceFilter):
+    # PlaceFilter on the PlaceListing rows of the places list.
+
+    class Meta:
+        model = PlaceListing
+        fields = ['category']
+
+
+class PlaceFilterBackend(DjangoFilterBackend):
+    # PlaceListing querysets are filtered with PlaceListingFilter.
+
+    def get_filterset_class(self, view, queryset=None):
+        if queryset is not None and queryset.model is PlaceListing:
+            return PlaceListingFilter
+        return super().get_filterset_class(view, queryset)
+
+
+class PlaceSearchFilter(filters.SearchFilter):
+    """
+    ?search= against the per-language document column of PlaceListing rows
+    instead of icontains joins over the translation tables.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        return search_listings(queryset, search_terms, get_language())
+
+
+class PlaceOrderingFilter(filters.OrderingFilter):
+    # Ordering through the translation joins repeats each place once per
+    # language, so these sort on the active language's value instead.
+    translated_ordering = {
+        'translations__name': 'sort_name',
+        'category__translations__name': 'sort_category_name',
+    }
+    # PlaceListing rows carry the same sort keys as columns.
+    listing_ordering = {
+        'translations__name': 'name',
+        'category__translations__name': 'sort_category_name',
+        'id': 'place_id',
+        'pk': 'place_id',
+    }
+
+    def get_ordering(self, request, queryset, view):
+        # Without an explicit ?ordering=, search results are ranked by relevance.
+        if not request.query_params.get(self.ordering_param) and request.query_params.get(api_settings.SEARCH_PARAM):
+            return ['-search_rank', '-created_at']
+        return super().get_ordering(request, queryset, view)
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+
+        if 'closing_soon' in {term.lstrip('-') for term in ordering}:
+            queryset = queryset.annotate(closing_soon=closing_minute(place_ref(queryset), *self.get_week_time(request)))
+
+        if queryset.model is PlaceListing:
+            resolved = [self._listing_term(term) for term in ordering]
+            if 'place_id' not in {term.lstrip('-') for term in resolved}:
+                resolved.append('place_id')
+            return queryset.order_by(*resolved)
+
+        language_code = get_language()
+        resolved = []
+        for term in ordering:
+            prefix, field = ('-', term[1:]) if term.startswith('-') else ('', term)
+            if field == 'translations__name':
+                queryset = queryset.annotate(sort_name=translated_name(Place, 'pk', language_code))
+            elif field == 'category__translations__name':
+                queryset = queryset.annotate(sort_category_name=translated_name(Category, 'category_id', language_code))
+            resolved.append(prefix + self.translated_ordering.get(field, field))
+        # A unique final key keeps the order stable, which keyset pagination relies on.
+        if not any(term.lstrip('-') in ('id', 'pk') for term in resolved):
+            resolved.append('id')
+        return queryset.order_by(*resolved)
+
+    def get_week_time(self, request):
+        # ordering=closing_soon is relative to ?open_at= when given (PlaceFilter
+        # has already rejected invalid values), otherwise to now.
+        try:
+            return parse_week_time(request.query_params['open_at'])
+        except (KeyError, ValueError):
+            return current_week_time()
+
+    def _listing_term(self, term):
+        prefix, field = ('-', term[1:]) if term.startswith('-') else ('', term)
+        return prefix + self.listing_ordering.get(field, field)
+
+
+def translated_name(model, master_ref, language_code, default=''):
+    # Active language, then parler's fallback language, then `default`
+    # (None leaves it NULL, like a missing translation).
+    translation_model = model._parler_meta.root_model
+
+    def name_in(code):
+        return Subquery(
+            translation_model.objects.filter(master=OuterRef(master_ref), language_code=code).values('name')[:1]
+        )
+
+    names = [name_in(language_code), name_in(settings.PARLER_DEFAULT_LANGUAGE_CODE)]
+    if default is not None:
+        names.append(Value(default))
+    return Coalesce(*names)
+
+
+def split_keys(value):
+    # ?expectations= / ?sorting_tags= values are comma separated keys.
+    return [key.strip() for key in value.split(',') if key.strip()]
+
+
+def place_ref(queryset):
+    # PlaceListing rows reference their place; other querysets are of Place.
+    return 'place_id' if queryset.model is PlaceListing else 'pk'
+
+
+def open_place_ids(day_of_week, at):
+    # A subquery, so places are not repeated per matching OpeningHour row.
+    return OpeningHour.objects.open_at(day_of_week, at).values('place_id')
+
+
+def closing_minute(master_ref, day_of_week, at):
+    """
+    Minutes from midnight of `day_of_week` to when the place closes, for
+    places open at `at` (the latest close when intervals overlap), and
+    MINUTES_PER_WEEK, which sorts after all of those, for closed places.
+    Back-to-back intervals are not chained, unlike WeeklySchedule.
+    """
+    closing = OpeningHour.objects.filter(place=OuterRef(master_ref)).open_at(day_of_week, at).with_closing_minute(
+        day_of_week
+    ).order_by('-closing_minute').values('closing_minute')[:1]
+    return Coalesce(Subquery(closing), Value(MINUTES_PER_WEEK))
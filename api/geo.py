@@ -0,0 +1,58 @@
+import math
+
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371.0088
+# Grid cells of 0.02 x 0.02 degrees (about 2.2 km north-south). Cell ids are
+# row-major, so the cells of one grid row form a contiguous id range.
+CELL_SIZE_DEGREES = 0.02
+CELLS_PER_ROW = round(360 / CELL_SIZE_DEGREES)
+MAX_ROW = round(180 / CELL_SIZE_DEGREES) - 1
+
+
+def _row(latitude):
+    return min(max(int(math.floor((latitude + 90) / CELL_SIZE_DEGREES)), 0), MAX_ROW)
+
+
+def _column(longitude):
+    return min(max(int(math.floor((longitude + 180) / CELL_SIZE_DEGREES)), 0), CELLS_PER_ROW - 1)
+
+
+def geo_cell_for(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return _row(float(latitude)) * CELLS_PER_ROW + _column(float(longitude))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    latitude_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_latitude = math.cos(math.radians(latitude))
+    if cos_latitude < 1e-6:
+        longitude_delta = 180.0
+    else:
+        longitude_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_latitude)), 180.0)
+    return (
+        max(latitude - latitude_delta, -90.0), min(latitude + latitude_delta, 90.0),
+        max(longitude - longitude_delta, -180.0), min(longitude + longitude_delta, 180.0),
+    )
+
+
+def geo_cell_filter(latitude, longitude, radius_km):
+    """
+    Q object selecting the grid cells that cover the bounding box of the
+    circle: one indexed range condition per grid row.
+    """
+    min_latitude, max_latitude, min_longitude, max_longitude = bounding_box(latitude, longitude, radius_km)
+    first_column, last_column = _column(min_longitude), _column(max_longitude)
+    condition = Q()
+    for row in range(_row(min_latitude), _row(max_latitude) + 1):
+        condition |= Q(geo_cell__range=(row * CELLS_PER_ROW + first_column, row * CELLS_PER_ROW + last_column))
+    return condition
+
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    delta_phi = phi2 - phi1
+    delta_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,101 @@
+import contextlib
+import contextvars
+import time
+
+_current_timing = contextvars.ContextVar('api_request_timing', default=None)
+
+
+class RequestTiming:
+    """
+    Per-request performance counters, filled in by ServerTimingMiddleware
+    (SQL, view and total time) and by the instrumented code paths
+    (serializer time, cache hits and misses).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.view_ms = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.caches = {}
+        self._serializer_depth = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+    def record_cache(self, name, hit):
+        hits, misses = self.caches.get(name, (0, 0))
+        if hit:
+            self.cache_hits += 1
+            self.caches[name] = (hits + 1, misses)
+        else:
+            self.cache_misses += 1
+            self.caches[name] = (hits, misses + 1)
+
+
+def current_timing():
+    return _current_timing.get()
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection (see install_query_recorder), so queries
+    # are counted wherever they run, including the worker threads of async
+    # ORM calls, which inherit the request's context.
+    timing = _current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing.execute_wrapper(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created receiver, connected in ApiConfig.ready().
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextlib.contextmanager
+def activate_timing(timing):
+    token = _current_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _current_timing.reset(token)
+
+
+def record_cache(name, hit):
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.record_cache(name, hit)
+
+
+@contextlib.contextmanager
+def serializer_timing():
+    """
+    Adds the enclosed time to the request's serializer time. Nested
+    serializers are only counted once, by the outermost one.
+    """
+    timing = _current_timing.get()
+    if timing is None or timing._serializer_depth:
+        yield
+        return
+    timing._serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing._serializer_depth -= 1
+        timing.serializer_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with serializer_timing():
+            return super().to_representation(instance)
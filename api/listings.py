@@ -0,0 +1,77 @@
+from django.apps import apps
+from django.conf import settings
+from django.utils.translation import get_language
+
+from .caching import PLACE_FACETS_VERSION_KEY, bump_version
+from .search import _chunks, normalize_text
+
+LISTING_FIELDS = [
+    'category', 'name', 'description', 'category_name', 'document', 'main_image', 'latitude', 'longitude',
+    'geo_cell', 'attribute_mask', 'is_active', 'created_at', 'popular', 'sort_category_name',
+]
+
+
+def listing_language(language_code=None):
+    # PlaceListing rows exist for settings.LANGUAGES only.
+    language_code = language_code or get_language()
+    if language_code in {code for code, name in settings.LANGUAGES}:
+        return language_code
+    return settings.PARLER_DEFAULT_LANGUAGE_CODE
+
+
+def rebuild_place_listings(place_ids=None, batch_size=1000):
+    Place = apps.get_model('api', 'Place')
+    PlaceTranslation = apps.get_model('api', 'PlaceTranslation')
+    CategoryTranslation = apps.get_model('api', 'CategoryTranslation')
+    PlaceListing = apps.get_model('api', 'PlaceListing')
+
+    language_codes = [code for code, name in settings.LANGUAGES]
+    fallback_language = settings.PARLER_DEFAULT_LANGUAGE_CODE
+
+    category_names = {
+        (master_id, language_code): name
+        for master_id, language_code, name in CategoryTranslation.objects.values_list('master_id', 'language_code', 'name')
+    }
+
+    places = Place.objects.order_by('pk').values_list(
+        'pk', 'category_id', 'address', 'main_image', 'latitude', 'longitude', 'geo_cell', 'attribute_mask',
+        'is_active', 'created_at', 'popular',
+    )
+    if place_ids is not None:
+        places = places.filter(pk__in=place_ids)
+
+    total = 0
+    for chunk in _chunks(places.iterator(chunk_size=batch_size), batch_size):
+        translations = {
+            (master_id, language_code): (name, description)
+            for master_id, language_code, name, description in PlaceTranslation.objects.filter(
+                master_id__in=[row[0] for row in chunk]
+            ).values_list('master_id', 'language_code', 'name', 'description')
+        }
+        listings = []
+        for (pk, category_id, address, main_image, latitude, longitude, geo_cell, attribute_mask, is_active,
+             created_at, popular) in chunk:
+            for language_code in language_codes:
+                name, description = translations.get(
+                    (pk, language_code), translations.get((pk, fallback_language), ('', None))
+                )
+                category_name = category_names.get(
+                    (category_id, language_code), category_names.get((category_id, fallback_language))
+                )
+                text = ' '.join(part for part in (name, description, category_name, address) if part)
+                listings.append(PlaceListing(
+                    place_id=pk, language_code=language_code, category_id=category_id,
+                    name=name, description=description, category_name=category_name,
+                    document=normalize_text(text), main_image=main_image,
+                    latitude=latitude, longitude=longitude, geo_cell=geo_cell, attribute_mask=attribute_mask,
+                    is_active=is_active, created_at=created_at, popular=popular,
+                    sort_category_name=category_name or '',
+                ))
+        PlaceListing.objects.bulk_create(
+            listings, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['language_code', 'place'], update_fields=LISTING_FIELDS,
+        )
+        total += len(listings)
+    # Facet counts are computed from these rows.
+    bump_version(PLACE_FACETS_VERSION_KEY)
+    return total
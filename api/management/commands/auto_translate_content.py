@@ -1,12 +1,19 @@
 import time
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 from api.models import Place, Category, ExpectationDefinition, SortTagDefinition  # Your parler models
-from api.utils import translate_text_with_mymemory
+from api.search import _chunks
+from api.translation import (
+    TranslationEngine, TranslationJob, TranslationMemoryLookup, TranslationWriter, checkpoint_signature,
+    clear_checkpoint, get_checkpoint, save_checkpoint, stale_translations,
+)
+from api.translation_backends import TRANSLATION_BACKENDS, get_translation_backend
 
 
 class Command(BaseCommand):
-    help = 'Attempts to automatically translate untranslated content for specified models using MyMemory (adapted for django-parler).'
+    help = 'Attempts to automatically translate untranslated content for specified models using the configured translation backend (adapted for django-parler).'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -25,13 +32,65 @@ class Command(BaseCommand):
         parser.add_argument(
             '--force-update',
             action='store_true',
-            help='Force update existing translations. Default: only translates empty fields.',
+            help='Force update existing translations. Default: only translates empty fields and '
+                 'translations whose source text changed since they were made.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint of an interrupted run with the same options and start from the beginning.',
         )
         parser.add_argument(
             '--delay',
             type=float,
             default=1.1,
-            help='Delay in seconds between translation API calls to respect rate limits.',
+            help='Minimum delay in seconds between translation API calls; used as the rate limit when --rate is not given.',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            help='Provider rate limit in requests per second, shared by all workers. Default: 1 / --delay.',
+        )
+        parser.add_argument(
+            '--burst',
+            type=int,
+            default=1,
+            help='Number of requests that may be sent back to back before the rate limit applies.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of concurrent translation requests.',
+        )
+        parser.add_argument(
+            '--max-retries',
+            type=int,
+            default=3,
+            help='Retries per string after a failed API call (exponential backoff with jitter).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Number of instances whose translations are collected, translated and saved together.',
+        )
+        parser.add_argument(
+            '--write-batch-size',
+            type=int,
+            default=500,
+            help='Number of translation rows written per bulk query.',
+        )
+        parser.add_argument(
+            '--backend',
+            type=str,
+            help=f"Translation backend: {', '.join(TRANSLATION_BACKENDS)} or a dotted path. Default: settings.TRANSLATION_BACKEND or mymemory.",
+        )
+        parser.add_argument(
+            '--stub-latency',
+            type=float,
+            default=0.0,
+            help='Per-request latency in seconds for the stub backend (for testing).',
         )
         parser.add_argument(
             '--source-lang',
@@ -62,8 +121,22 @@ class Command(BaseCommand):
             valid_target_languages = [code for code, name in settings.LANGUAGES if code != source_language]
 
         force_update = options['force_update']
-        api_delay = options['delay']
         pks_to_translate = options.get('pks')
+        chunk_size = max(options['chunk_size'], 1)
+        rate = options['rate'] or (1 / options['delay'] if options['delay'] > 0 else 1000.0)
+
+        try:
+            if options['backend'] == 'stub':
+                backend = get_translation_backend('stub', latency=options['stub_latency'])
+            else:
+                backend = get_translation_backend(options['backend'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        engine = TranslationEngine(
+            backend, workers=options['workers'], rate=rate, burst=options['burst'],
+            max_retries=options['max_retries'],
+        )
+        memory = TranslationMemoryLookup(backend.name)
 
         # Config for parler models
         models_config = {
@@ -78,13 +151,14 @@ class Command(BaseCommand):
         self.stdout.write(f"Source language: {source_language}")
         self.stdout.write(f"Target languages: {', '.join(valid_target_languages)}")
         self.stdout.write(f"Force update: {force_update}")
-        self.stdout.write(f"API call delay: {api_delay}s")
+        self.stdout.write(f"Translation backend: {backend.name} (batches of up to {backend.max_batch_size})")
+        self.stdout.write(f"Rate limit: {rate:g} req/s (burst {options['burst']}), workers: {options['workers']}")
         self.stdout.write(f"Models to translate: {', '.join(models_to_translate_input)}")
         if pks_to_translate:
             self.stdout.write(f"Specific PKs to translate: {', '.join(map(str, pks_to_translate))}")
 
-        total_api_calls = 0
-        total_saves = 0
+        total_rows_written = 0
+        started = time.perf_counter()
 
         for model_key in models_to_translate_input:
             if model_key not in models_config:
@@ -97,64 +171,94 @@ class Command(BaseCommand):
 
             self.stdout.write(self.style.HTTP_INFO(f"\n--- Translating {ModelClass._meta.verbose_name_plural} ---"))
 
-            queryset = ModelClass.objects.all()
-            if pks_to_translate:
-                queryset = queryset.filter(pk__in=pks_to_translate)
-
-            for instance in queryset:
-                item_identifier_text = instance.safe_translation_getter(
-                    fields_to_translate[0], language_code=source_language, any_language=True
-                ) or f"PK: {instance.pk}"
-                item_identifier = f"{ModelClass._meta.verbose_name} '{item_identifier_text[:30]}...' (ID: {instance.pk})"
-
-                instance_needs_saving = False
-
-                for field_name in fields_to_translate:
-                    instance.set_current_language(source_language)
-                    source_text = getattr(instance, field_name, None)
-
-                    if not source_text or not str(source_text).strip():
-                        self.stdout.write(
-                            f"  Skipping {item_identifier} field '{field_name}': no source text in '{source_language}'.")
-                        continue
-
-                    for lang_code in valid_target_languages:
-                        instance.set_current_language(lang_code)
-                        current_translation = getattr(instance, field_name, None)
-
-                        if force_update or not current_translation or not str(current_translation).strip():
-                            self.stdout.write(
-                                f"  Translating {item_identifier} field '{field_name}' from '{source_language}' to '{lang_code}'...")
-                            total_api_calls += 1
-
-                            translated_text = translate_text_with_mymemory(source_text, lang_code, source_language)
-
-                            if translated_text and translated_text.strip().lower() != source_text.strip().lower():
-                                setattr(instance, field_name,
-                                        translated_text)
-                                instance_needs_saving = True
-                                self.stdout.write(f"    -> '{translated_text[:70]}...'")
-                            elif translated_text:
-                                self.stdout.write(
-                                    f"    -> No change, same as source, or API returned empty for '{field_name}' to {lang_code}.")
-                            else:
-                                self.stdout.write(
-                                    self.style.ERROR(f"    -> Translation FAILED for '{field_name}' to {lang_code}."))
-
-
-                            if total_api_calls > 0:
-                                time.sleep(api_delay)
-                        else:
-                            self.stdout.write(
-                                f"  Skipping {item_identifier} field '{field_name}' for {lang_code} (already translated and non-empty).")
-
-                if instance_needs_saving:
-                    try:
-                        instance.save()
-                        total_saves += 1
-                        self.stdout.write(self.style.SUCCESS(f"  Saved translations for {item_identifier}"))
-                    except Exception as e:
-                        self.stderr.write(self.style.ERROR(f"  Error saving {item_identifier}: {e}"))
+            signature = checkpoint_signature(
+                model=model_key, source=source_language, targets=sorted(valid_target_languages),
+                force=force_update, pks=sorted(pks_to_translate or []),
+            )
+            resume_after = None if options['restart'] else get_checkpoint(signature, ModelClass)
+            if resume_after is not None:
+                self.stdout.write(f"  Resuming after ID {resume_after} (use --restart to start over).")
+
+            # One query selects everything missing or stale, in pk order, so
+            # runs (and their output) are deterministic and resumable.
+            stale = stale_translations(
+                ModelClass, fields_to_translate, source_language, valid_target_languages,
+                force_update=force_update, after_pk=resume_after, pks=pks_to_translate,
+            )
+            writer = TranslationWriter(ModelClass, batch_size=options['write_batch_size'])
+            for chunk in _chunks(stale, chunk_size):
+                pending = dict(chunk)
+                instances = ModelClass.objects.filter(pk__in=pending).order_by('pk').prefetch_related('translations')
+                self.translate_chunk(
+                    instances, pending, engine, memory, writer, fields_to_translate, source_language
+                )
+                # The chunk's rows and its checkpoint commit together.
+                with transaction.atomic():
+                    writer.flush()
+                    save_checkpoint(signature, ModelClass, chunk[-1][0])
+            clear_checkpoint(signature, ModelClass)
+            total_rows_written += writer.rows_written
+            self.stdout.write(self.style.SUCCESS(
+                f"  Wrote {writer.rows_written} {ModelClass._meta.verbose_name} translation rows"))
 
         self.stdout.write(self.style.SUCCESS(
-            f'\nFinished auto-translation attempt. API Calls: {total_api_calls}, Saves: {total_saves}'))
\ No newline at end of file
+            f'\nFinished auto-translation attempt in {time.perf_counter() - started:.1f}s. '
+            f'API Calls: {engine.requests}, Translation rows written: {total_rows_written}, '
+            f'Translation memory hits: {memory.hits}/{memory.hits + memory.misses} ({memory.hit_rate:.0%})'))
+
+    def describe(self, instance, fields_to_translate, source_language):
+        item_identifier_text = instance.safe_translation_getter(
+            fields_to_translate[0], language_code=source_language, any_language=True
+        ) or f"PK: {instance.pk}"
+        return f"{instance._meta.verbose_name} '{item_identifier_text[:30]}...' (ID: {instance.pk})"
+
+    def collect_jobs(self, instance, pending, fields_to_translate, source_language):
+        item_identifier = self.describe(instance, fields_to_translate, source_language)
+        jobs = []
+        for field_name in fields_to_translate:
+            instance.set_current_language(source_language)
+            source_text = getattr(instance, field_name, None)
+
+            if not source_text or not str(source_text).strip():
+                self.stdout.write(
+                    f"  Skipping {item_identifier} field '{field_name}': no source text in '{source_language}'.")
+                continue
+
+            for field, lang_code in sorted(pending):
+                if field == field_name:
+                    jobs.append(TranslationJob(instance, field_name, source_language, lang_code, source_text))
+        return jobs
+
+    def translate_chunk(self, instances, pending, engine, memory, writer, fields_to_translate, source_language):
+        jobs = []
+        for instance in instances:
+            jobs.extend(self.collect_jobs(instance, pending[instance.pk], fields_to_translate, source_language))
+
+        engine.run(memory.resolve(jobs))
+        memory.store()
+
+        for job in jobs:
+            instance = job.instance
+            item_identifier = self.describe(instance, fields_to_translate, source_language)
+            if job.attempts:
+                origin = f"{job.attempts} attempt{'s' if job.attempts != 1 else ''}"
+            else:
+                origin = "translation memory"
+            self.stdout.write(
+                f"  Translated {item_identifier} field '{job.field_name}' from '{source_language}' to '{job.target_language}'"
+                f" ({origin})")
+            translated_text = job.result
+            source_text = job.source_text
+
+            if job.error is not None:
+                self.stdout.write(
+                    self.style.ERROR(f"    -> Translation FAILED for '{job.field_name}' to {job.target_language}: {job.error}"))
+            elif translated_text and translated_text.strip().lower() != source_text.strip().lower():
+                writer.add(instance.pk, job.target_language, job.field_name, translated_text, source_text=source_text)
+                self.stdout.write(f"    -> '{translated_text[:70]}...'")
+            elif translated_text:
+                self.stdout.write(
+                    f"    -> No change, same as source, or API returned empty for '{job.field_name}' to {job.target_language}.")
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f"    -> Translation FAILED for '{job.field_name}' to {job.target_language}."))
@@ -0,0 +1,232 @@
+import asyncio
+import datetime
+import json
+import multiprocessing
+import random
+import socket
+import time
+import types
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import clear_url_caches, include, path
+
+from api import urls as api_urls
+from api.benchmarking import benchmark_database, seed_catalog, seed_definitions
+from api.models import Place
+
+
+def urlconf(name, patterns):
+    module = types.ModuleType(name)
+    module.urlpatterns = [path('api/', include(patterns))]
+    return module
+
+
+# The same routes with ASYNC_API_VIEWS off and on.
+URLCONFS = {
+    'sync': urlconf('benchmark_sync_urls', api_urls.sync_urlpatterns),
+    'async': urlconf('benchmark_async_urls', api_urls.async_urlpatterns + api_urls.sync_urlpatterns),
+}
+
+
+def serve(mode, port):
+    # Body of the forked server process: one uvicorn worker (a single event
+    # loop, sync views on Django's thread pool) over the benchmark database.
+    import uvicorn
+
+    settings.ROOT_URLCONF = URLCONFS[mode]
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, '127.0.0.1']
+    clear_url_caches()
+    uvicorn.run(get_asgi_application(), host='127.0.0.1', port=port, lifespan='off', log_level='warning',
+                access_log=False)
+
+
+async def fetch(reader, writer, request):
+    # One HTTP/1.1 request on a keep-alive connection; returns the status code.
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by the server')
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    return int(status_line.split()[1])
+
+
+def build_request(method, path, data, language):
+    lines = ['Host: 127.0.0.1', f'Accept-Language: {language}']
+    body = b''
+    if method == 'post':
+        body = json.dumps(data).encode()
+        lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+    elif data:
+        path = f'{path}?{urlencode(data)}'
+    head = '\r\n'.join([f'{method.upper()} {path} HTTP/1.1', *lines, '', ''])
+    return head.encode() + body
+
+
+class Command(BaseCommand):
+    help = ('Measures requests per second of the places list and detail, filter-options and wheel-spin endpoints '
+            'served by the sync and the async views on one uvicorn worker, with a fixed number of keep-alive '
+            'connections sending requests back to back (uses a throwaway test database on the configured '
+            'backend; needs uvicorn).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=10000,
+            help='Catalog size (number of places).',
+        )
+        parser.add_argument(
+            '--concurrency',
+            nargs='+',
+            type=int,
+            default=[1, 8, 32],
+            help='Connections kept busy at once.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=400,
+            help='Requests sent per scenario, mode and concurrency level.',
+        )
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            type=str,
+            help='Only run scenarios whose name starts with one of these prefixes (e.g. list detail).',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the results as JSON to this path.',
+        )
+
+    def scenarios(self, place_ids, rnd):
+        random_place = lambda: rnd.choice(place_ids)
+        return {
+            'list': ('get', lambda: ('/api/places/', {})),
+            'list_search': ('get', lambda: ('/api/places/', {'search': 'benchmark description'})),
+            'detail': ('get', lambda: (f'/api/places/{random_place()}/', {'device_id': 'benchmark-device'})),
+            'filter_options': ('get', lambda: ('/api/filter-options/', {})),
+            'wheel_spin': ('post', lambda: ('/api/wheel-spin/', {'expectation_keys': ['kardPay']})),
+        }
+
+    async def run(self, port, requests, concurrency):
+        pending = iter(requests)
+        statuses = set()
+
+        async def worker():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                for request in pending:
+                    statuses.add(await fetch(reader, writer, request))
+            finally:
+                writer.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, statuses
+
+    def start_server(self, mode):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        # Forked, so the server sees the seeded test database; connections
+        # must not be shared with it.
+        connections.close_all()
+        process = multiprocessing.get_context('fork').Process(target=serve, args=(mode, port), daemon=True)
+        process.start()
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return process, port
+            except OSError:
+                if not process.is_alive() or time.monotonic() > deadline:
+                    process.terminate()
+                    raise CommandError(f'The {mode} server did not start.')
+                time.sleep(0.1)
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('benchmark_concurrency needs an ASGI server: pip install uvicorn')
+
+        languages = [code for code, name in settings.LANGUAGES]
+        prefixes = options['scenarios']
+        total = options['requests']
+        results = []
+
+        with benchmark_database():
+            seed_definitions(languages)
+            seed_catalog(options['size'], languages=languages, images_per_place=3, with_opening_hours=True)
+            place_ids = list(Place.objects.filter(is_active=True).values_list('pk', flat=True))
+            vendor = connection.vendor
+            self.stdout.write(self.style.HTTP_INFO(
+                f"\n--- {options['size']} places, {len(languages)} languages on {vendor}, "
+                f"{total} requests per run ---"))
+
+            # Both modes get the same request sequences.
+            runs = []
+            for name, (method, build) in self.scenarios(place_ids, random.Random(0)).items():
+                if prefixes and not name.startswith(tuple(prefixes)):
+                    continue
+                for concurrency in options['concurrency']:
+                    requests = [
+                        build_request(method, *build(), languages[index % len(languages)])
+                        for index in range(concurrency + total)
+                    ]
+                    runs.append((name, concurrency, requests))
+
+            rps = {}
+            for mode in URLCONFS:
+                process, port = self.start_server(mode)
+                try:
+                    for name, concurrency, requests in runs:
+                        asyncio.run(self.run(port, requests[:concurrency], concurrency))  # Warm-up.
+                        elapsed, statuses = asyncio.run(self.run(port, requests[concurrency:], concurrency))
+                        rps[name, concurrency, mode] = total / elapsed
+                        results.append({
+                            'places': options['size'],
+                            'scenario': name,
+                            'mode': mode,
+                            'concurrency': concurrency,
+                            'requests': total,
+                            'seconds': round(elapsed, 3),
+                            'rps': round(total / elapsed, 1),
+                            'statuses': sorted(statuses),
+                        })
+                finally:
+                    process.terminate()
+                    process.join()
+
+        for name, concurrency, requests in runs:
+            sync, async_ = rps[name, concurrency, 'sync'], rps[name, concurrency, 'async']
+            self.stdout.write(
+                f"  {name:<16} concurrency={concurrency:<4} sync={sync:8.1f} rps  "
+                f"async={async_:8.1f} rps  ({async_ / sync:.2f}x)"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({
+                    'benchmark': 'concurrency',
+                    'database': vendor,
+                    'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    'results': results,
+                }, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\nResults written to {options['output']}"))
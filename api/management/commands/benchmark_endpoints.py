@@ -0,0 +1,157 @@
+import datetime
+import itertools
+import json
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmarking import benchmark_database, measure, seed_catalog, seed_definitions
+from api.models import Place
+
+
+class Command(BaseCommand):
+    help = ('Measures latency percentiles and SQL query counts of the public API endpoints against seeded '
+            'multi-language catalogs (uses a throwaway test database on the configured backend).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[1000, 10000, 100000],
+            help='Catalog sizes (number of places) to benchmark.',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Requests measured per scenario.',
+        )
+        parser.add_argument(
+            '--languages',
+            nargs='+',
+            type=str,
+            help='Languages to seed and to send as Accept-Language, in rotation. Default: settings.LANGUAGES.',
+        )
+        parser.add_argument(
+            '--images-per-place',
+            type=int,
+            default=3,
+            help='Gallery images seeded per place.',
+        )
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            type=str,
+            help='Only run scenarios whose name starts with one of these prefixes (e.g. list detail).',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the results as JSON to this path.',
+        )
+
+    def scenarios(self, categories, place_ids, rnd):
+        category = categories[0]
+        category.set_current_language(settings.LANGUAGE_CODE)
+        random_place = lambda: rnd.choice(place_ids)
+        return {
+            'list': ('get', lambda: ('/api/places/', {})),
+            'list_no_count': ('get', lambda: ('/api/places/', {'count': 'false'})),
+            'list_legacy_page': ('get', lambda: ('/api/places/', {'page': 5})),
+            'list_filter_category': ('get', lambda: ('/api/places/', {'category': category.pk})),
+            'list_filter_category_name': ('get', lambda: ('/api/places/', {'category_name': category.name})),
+            'list_filter_expectations': ('get', lambda: ('/api/places/', {'expectations': 'kardPay,outsideArea'})),
+            'list_filter_sorting_tags': ('get', lambda: ('/api/places/', {'sorting_tags': 'beach,popular'})),
+            'list_search': ('get', lambda: ('/api/places/', {'search': 'benchmark description'})),
+            'list_search_name': ('get', lambda: ('/api/places/', {'search': f'place {random_place()}'})),
+            'list_ordering_name': ('get', lambda: ('/api/places/', {'ordering': 'translations__name'})),
+            'list_ordering_category_name': ('get', lambda: ('/api/places/', {'ordering': '-category__translations__name'})),
+            'list_ordering_created_at': ('get', lambda: ('/api/places/', {'ordering': 'created_at'})),
+            'list_ordering_popular': ('get', lambda: ('/api/places/', {'ordering': '-popular'})),
+            'list_open_now': ('get', lambda: ('/api/places/', {'open_now': 'true'})),
+            'list_open_at': ('get', lambda: ('/api/places/', {'open_at': 'friT23:30'})),
+            'list_ordering_closing_soon': ('get', lambda: ('/api/places/', {'open_now': 'true', 'ordering': 'closing_soon'})),
+            'nearby': ('get', lambda: ('/api/places/nearby/', {'lat': 35.2, 'lng': 33.4, 'radius': 5})),
+            'detail': ('get', lambda: (f'/api/places/{random_place()}/', {'device_id': 'benchmark-device'})),
+            'detail_repeat': ('get', lambda: (f'/api/places/{place_ids[0]}/', {'device_id': 'benchmark-device'})),
+            'detail_bulk': ('get', lambda: ('/api/places/bulk/', {
+                'ids': ','.join(str(random_place()) for _ in range(30)), 'device_id': 'benchmark-device'})),
+            # Cached per filter signature: repeated requests after the warm-up are hits.
+            'facets': ('get', lambda: ('/api/places/facets/', {'expectations': 'kardPay'})),
+            'facets_search': ('get', lambda: ('/api/places/facets/', {'search': 'benchmark description'})),
+            'filter_options': ('get', lambda: ('/api/filter-options/', {})),
+            'wheel_spin': ('post', lambda: ('/api/wheel-spin/', {'expectation_keys': ['kardPay'], 'region_keys': ['kyrenia']})),
+            'like': ('post', lambda: (f'/api/places/{random_place()}/like/', {'device_id': 'benchmark-device'})),
+        }
+
+    def handle(self, *args, **options):
+        languages = options['languages'] or [code for code, name in settings.LANGUAGES]
+        prefixes = options['scenarios']
+        results = []
+
+        setup_test_environment()
+        try:
+            for size in options['sizes']:
+                with benchmark_database():
+                    started = time.perf_counter()
+                    seed_definitions(languages)
+                    categories = seed_catalog(
+                        size, languages=languages, images_per_place=options['images_per_place'],
+                        with_opening_hours=True,
+                    )
+                    self.stdout.write(self.style.HTTP_INFO(
+                        f"\n--- {size} places, {len(languages)} languages on {connection.vendor} "
+                        f"(seeded in {time.perf_counter() - started:.1f}s) ---"))
+
+                    rnd = random.Random(0)
+                    place_ids = list(Place.objects.filter(is_active=True).values_list('pk', flat=True))
+                    client = Client()
+                    for name, (method, build) in self.scenarios(categories, place_ids, rnd).items():
+                        if prefixes and not name.startswith(tuple(prefixes)):
+                            continue
+                        language_cycle = itertools.cycle(languages)
+                        statuses = set()
+
+                        def request():
+                            language = next(language_cycle)
+                            path, data = build()
+                            if method == 'post':
+                                response = client.post(path, data, content_type='application/json',
+                                                       HTTP_ACCEPT_LANGUAGE=language)
+                            else:
+                                response = client.get(path, data, HTTP_ACCEPT_LANGUAGE=language)
+                            statuses.add(response.status_code)
+
+                        request()  # Warm-up: first-request imports, index loads.
+                        stats = measure(request, options['iterations'])
+                        results.append({
+                            'places': size,
+                            'languages': len(languages),
+                            'scenario': name,
+                            'statuses': sorted(statuses),
+                            **stats,
+                        })
+                        self.stdout.write(
+                            f"  {name:<28} p50={stats['p50_ms']:8.2f} ms  p95={stats['p95_ms']:8.2f} ms  "
+                            f"p99={stats['p99_ms']:8.2f} ms  queries={stats['queries_mean']:<6} "
+                            f"status={','.join(map(str, sorted(statuses)))}"
+                        )
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({
+                    'benchmark': 'endpoints',
+                    'database': connection.vendor,
+                    'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    'iterations': options['iterations'],
+                    'results': results,
+                }, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\nResults written to {options['output']}"))
@@ -0,0 +1,92 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from api.attributes import ATTRIBUTE_BITS, EXPECTATION_KEY_FIELDS, REGION_KEY_FIELDS, attribute_index, mask_for_keys
+from api.benchmarking import benchmark_database, measure, seed_catalog
+from api.views import WheelSpinView
+
+
+class Command(BaseCommand):
+    help = 'Measures /api/wheel-spin/ latency against seeded catalogs of growing size (uses a throwaway test database).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[1000, 10000, 100000],
+            help='Catalog sizes (number of places) to benchmark.',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Spins measured per filter signature.',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the results as JSON to this path.',
+        )
+
+    def handle(self, *args, **options):
+        payloads = {
+            'no_filter': {},
+            'one_expectation': {'expectation_keys': ['kardPay']},
+            'expectation_and_region': {'expectation_keys': ['kardPay', 'outsideArea'], 'region_keys': ['kyrenia']},
+            'category': {'category_ids': [1, 2]},
+        }
+        factory = APIRequestFactory()
+        view = WheelSpinView.as_view()
+        results = []
+
+        for size in options['sizes']:
+            with benchmark_database():
+                started = time.perf_counter()
+                seed_catalog(size)
+                self.stdout.write(self.style.HTTP_INFO(
+                    f"\n--- {size} places (seeded in {time.perf_counter() - started:.1f}s) ---"))
+
+                started = time.perf_counter()
+                attribute_index.count()
+                index_load_ms = (time.perf_counter() - started) * 1000
+                self.stdout.write(f"  Attribute index load: {index_load_ms:.1f} ms")
+
+                for name, payload in payloads.items():
+                    mask = ATTRIBUTE_BITS['is_active']
+                    mask |= mask_for_keys(payload.get('expectation_keys', []), EXPECTATION_KEY_FIELDS, allow_field_names=True)
+                    mask |= mask_for_keys(payload.get('region_keys', []), REGION_KEY_FIELDS, allow_field_names=True)
+
+                    started = time.perf_counter()
+                    pool = attribute_index.candidate_pool(mask, payload.get('category_ids'))
+                    pool_build_ms = (time.perf_counter() - started) * 1000
+
+                    pick = measure(lambda: attribute_index.random_pk(mask, payload.get('category_ids')),
+                                   options['iterations'])
+                    spin = measure(
+                        lambda: view(factory.post('/api/wheel-spin/', payload, format='json')),
+                        options['iterations'],
+                    )
+                    results.append({
+                        'places': size,
+                        'signature': name,
+                        'candidates': len(pool),
+                        'index_load_ms': round(index_load_ms, 3),
+                        'pool_build_ms': round(pool_build_ms, 3),
+                        'pick': pick,
+                        'spin': spin,
+                    })
+                    self.stdout.write(
+                        f"  {name:<24} candidates={len(pool):<7} pool build={pool_build_ms:8.2f} ms  "
+                        f"pick p50={pick['p50_ms']:.3f} ms  "
+                        f"spin p50={spin['p50_ms']:.2f} ms p95={spin['p95_ms']:.2f} ms "
+                        f"queries={spin['queries_mean']}"
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({'benchmark': 'wheel_spin', 'results': results}, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\nResults written to {options['output']}"))
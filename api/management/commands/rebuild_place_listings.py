@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.listings import rebuild_place_listings
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-language PlaceListing rows that /api/places/ lists, searches and orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pks',
+            nargs='+',
+            type=int,
+            help='Rebuild only the listings of these place primary keys.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of places processed per batch.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_place_listings(options.get('pks'), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {total} place listings in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,117 @@
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import RequestTiming, activate_timing
+
+logger = logging.getLogger('api.performance')
+
+
+def get_sample_rate(url_name):
+    rates = getattr(settings, 'SERVER_TIMING_SAMPLE_RATES', {})
+    return rates.get(url_name, rates.get('default', 0.0))
+
+
+class ServerTimingMiddleware:
+    """
+    Records SQL count and time, serializer time, cache hits and misses, view
+    time and total time for a sample of requests, and reports them in a
+    Server-Timing header and one JSON log line on the 'api.performance'
+    logger. Sampling is per URL name, see SERVER_TIMING_SAMPLE_RATES.
+
+    Requests that are not sampled still go through the query wrapper (two
+    perf_counter() calls per query) but skip the header and the log line.
+
+    Works in sync and async middleware chains; queries are recorded by
+    api.instrumentation.record_query, which follows the request's context
+    into the worker threads of async ORM calls.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django runs the sync hooks of an async chain in a worker thread;
+            # these only read the clock, so they get coroutine wrappers.
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        request._server_timing = timing
+        with activate_timing(timing):
+            response = self.get_response(request)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        request._server_timing = timing
+        with activate_timing(timing):
+            response = await self.get_response(request)
+        return self.finish(request, response, timing)
+
+    async def aprocess_view(self, *args):
+        return ServerTimingMiddleware.process_view(self, *args)
+
+    async def aprocess_template_response(self, *args):
+        return ServerTimingMiddleware.process_template_response(self, *args)
+
+    def finish(self, request, response, timing):
+        if getattr(request, '_server_timing_sampled', False):
+            if timing.view_ms is None:
+                timing.view_ms = (time.perf_counter() - request._server_timing_view_started) * 1000
+            total_ms = (time.perf_counter() - timing.started) * 1000
+            response['Server-Timing'] = self.header(timing, total_ms)
+            logger.info(self.log_line(request, response, timing, total_ms))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, '_server_timing', None)
+        if timing is None:
+            return None
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        rate = get_sample_rate(url_name)
+        request._server_timing_sampled = rate >= 1 or (rate > 0 and random.random() < rate)
+        request._server_timing_view_started = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so the view time stops here.
+        if getattr(request, '_server_timing_sampled', False):
+            request._server_timing.view_ms = (time.perf_counter() - request._server_timing_view_started) * 1000
+        return response
+
+    @staticmethod
+    def header(timing, total_ms):
+        return ', '.join([
+            f'db;dur={timing.db_ms:.1f};desc="{timing.db_queries} queries"',
+            f'serializer;dur={timing.serializer_ms:.1f}',
+            f'view;dur={timing.view_ms:.1f}',
+            f'cache;desc="{timing.cache_hits} hits, {timing.cache_misses} misses"',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+    @staticmethod
+    def log_line(request, response, timing, total_ms):
+        return json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'url_name': request.resolver_match.url_name if request.resolver_match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'view_ms': round(timing.view_ms, 2),
+            'db_queries': timing.db_queries,
+            'db_ms': round(timing.db_ms, 2),
+            'serializer_ms': round(timing.serializer_ms, 2),
+            'cache_hits': timing.cache_hits,
+            'cache_misses': timing.cache_misses,
+            'caches': {name: {'hits': hits, 'misses': misses} for name, (hits, misses) in timing.caches.items()},
+        }, separators=(',', ':'))
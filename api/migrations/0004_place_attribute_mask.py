@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:08
+
+from django.db import migrations, models
+
+# Frozen copy of api.attributes.ATTRIBUTE_FIELDS as of this migration: bit i
+# of attribute_mask is the i-th field.
+ATTRIBUTE_FIELDS = (
+    'outside_area', 'inside_area', 'reservation', 'kids_menu', 'baby_sit', 'kard_pay',
+    'cash', 'free_park_area', 'bar', 'coffee', 'dessert', 'kitchen',
+    'wheelchair_accessible_entrance', 'pets_allow', 'fish', 'meat_and_chicken',
+    'popular', 'historical_places', 'alcohol', 'beach', 'creative_places', 'castles',
+    'museum', 'parks', 'waterfalls', 'hiking_trails',
+    'kyrenia', 'nicosia', 'famagusta', 'iskele', 'guzelyurt', 'karpaz', 'lefke',
+    'currency_supported', 'is_active',
+)
+
+
+def populate_attribute_mask(apps, schema_editor):
+    Place = apps.get_model('api', 'Place')
+    places = list(Place.objects.all())
+    for place in places:
+        place.attribute_mask = sum(
+            1 << position for position, field in enumerate(ATTRIBUTE_FIELDS) if getattr(place, field)
+        )
+    Place.objects.bulk_update(places, ['attribute_mask'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_remove_place_expectations_remove_place_tags_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='attribute_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_attribute_mask, migrations.RunPython.noop),
+    ]
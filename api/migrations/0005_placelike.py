@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_likes_to_table(apps, schema_editor):
+    Place = apps.get_model('api', 'Place')
+    PlaceLike = apps.get_model('api', 'PlaceLike')
+    for place in Place.objects.exclude(liked_by_devices=[]).only('pk', 'liked_by_devices').iterator():
+        device_ids = {str(device_id) for device_id in place.liked_by_devices or [] if device_id}
+        PlaceLike.objects.bulk_create(
+            [PlaceLike(place_id=place.pk, device_id=device_id) for device_id in device_ids],
+            ignore_conflicts=True,
+        )
+        Place.objects.filter(pk=place.pk).update(like_count=len(device_ids))
+
+
+def copy_likes_to_json(apps, schema_editor):
+    Place = apps.get_model('api', 'Place')
+    PlaceLike = apps.get_model('api', 'PlaceLike')
+    liked_by_devices = {}
+    for place_id, device_id in PlaceLike.objects.order_by('pk').values_list('place_id', 'device_id').iterator():
+        liked_by_devices.setdefault(place_id, []).append(device_id)
+    for place_id, device_ids in liked_by_devices.items():
+        Place.objects.filter(pk=place_id).update(liked_by_devices=device_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_place_attribute_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='PlaceLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(max_length=255, verbose_name='Device ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='api.place', verbose_name='Place')),
+            ],
+            options={
+                'verbose_name': 'Place Like',
+                'verbose_name_plural': 'Place Likes',
+                'constraints': [models.UniqueConstraint(fields=('device_id', 'place'), name='unique_place_like_per_device')],
+            },
+        ),
+        migrations.RunPython(copy_likes_to_table, copy_likes_to_json),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_placelike'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='place',
+            name='liked_by_devices',
+        ),
+    ]
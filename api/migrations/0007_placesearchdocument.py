@@ -0,0 +1,99 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of api.search as of this migration.
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'tr': 'turkish',
+    'ru': 'russian',
+    'ar': 'arabic',
+    'uk': 'simple',
+}
+BATCH_SIZE = 1000
+
+
+def normalize_text(text):
+    return ' '.join(str(text).casefold().split())
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for language_code, config in SEARCH_CONFIGS.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS api_placesearch_{language_code}_fts ON api_placesearchdocument "
+            f"USING gin (to_tsvector('{config}'::regconfig, document)) WHERE language_code = '{language_code}'"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for language_code in SEARCH_CONFIGS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS api_placesearch_{language_code}_fts")
+
+
+def populate_search_documents(apps, schema_editor):
+    Place = apps.get_model('api', 'Place')
+    PlaceTranslation = apps.get_model('api', 'PlaceTranslation')
+    CategoryTranslation = apps.get_model('api', 'CategoryTranslation')
+    PlaceSearchDocument = apps.get_model('api', 'PlaceSearchDocument')
+
+    language_codes = [code for code, name in settings.LANGUAGES]
+    fallback_language = settings.PARLER_DEFAULT_LANGUAGE_CODE
+    category_names = {
+        (master_id, language_code): name
+        for master_id, language_code, name in CategoryTranslation.objects.values_list('master_id', 'language_code', 'name')
+    }
+    places = list(Place.objects.order_by('pk').values_list('pk', 'category_id', 'address'))
+    for start in range(0, len(places), BATCH_SIZE):
+        chunk = places[start:start + BATCH_SIZE]
+        translations = {
+            (master_id, language_code): (name, description)
+            for master_id, language_code, name, description in PlaceTranslation.objects.filter(
+                master_id__in=[pk for pk, _, _ in chunk]
+            ).values_list('master_id', 'language_code', 'name', 'description')
+        }
+        documents = []
+        for pk, category_id, address in chunk:
+            for language_code in language_codes:
+                name, description = translations.get(
+                    (pk, language_code), translations.get((pk, fallback_language), ('', ''))
+                )
+                category_name = category_names.get(
+                    (category_id, language_code), category_names.get((category_id, fallback_language), '')
+                )
+                text = ' '.join(part for part in (name, description, category_name, address) if part)
+                documents.append(PlaceSearchDocument(
+                    place_id=pk, language_code=language_code, document=normalize_text(text)
+                ))
+        PlaceSearchDocument.objects.bulk_create(documents, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_remove_place_liked_by_devices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language_code', models.CharField(max_length=15, verbose_name='Language')),
+                ('document', models.TextField(blank=True)),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='api.place', verbose_name='Place')),
+            ],
+            options={
+                'verbose_name': 'Place Search Document',
+                'verbose_name_plural': 'Place Search Documents',
+                'constraints': [models.UniqueConstraint(fields=('language_code', 'place'), name='unique_place_search_document')],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
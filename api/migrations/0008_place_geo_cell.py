@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:20
+
+import math
+
+from django.db import migrations, models
+
+# Frozen copy of the api.geo grid as of this migration.
+CELL_SIZE_DEGREES = 0.02
+CELLS_PER_ROW = round(360 / CELL_SIZE_DEGREES)
+MAX_ROW = round(180 / CELL_SIZE_DEGREES) - 1
+
+
+def geo_cell_for(latitude, longitude):
+    row = min(max(int(math.floor((float(latitude) + 90) / CELL_SIZE_DEGREES)), 0), MAX_ROW)
+    column = min(max(int(math.floor((float(longitude) + 180) / CELL_SIZE_DEGREES)), 0), CELLS_PER_ROW - 1)
+    return row * CELLS_PER_ROW + column
+
+
+def populate_geo_cell(apps, schema_editor):
+    Place = apps.get_model('api', 'Place')
+    places = list(Place.objects.filter(latitude__isnull=False, longitude__isnull=False).only('pk', 'latitude', 'longitude'))
+    for place in places:
+        place.geo_cell = geo_cell_for(place.latitude, place.longitude)
+    Place.objects.bulk_update(places, ['geo_cell'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_placesearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_geo_cell, migrations.RunPython.noop),
+    ]
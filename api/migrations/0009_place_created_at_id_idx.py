@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_place_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['-created_at', 'id'], name='place_created_at_id_idx'),
+        ),
+    ]
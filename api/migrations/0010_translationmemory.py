@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_place_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationMemory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_hash', models.CharField(max_length=64)),
+                ('source_language', models.CharField(max_length=15, verbose_name='Source Language')),
+                ('target_language', models.CharField(max_length=15, verbose_name='Target Language')),
+                ('backend', models.CharField(max_length=50)),
+                ('source_text', models.TextField()),
+                ('translated_text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Translation Memory Entry',
+                'verbose_name_plural': 'Translation Memory',
+                'constraints': [models.UniqueConstraint(fields=('source_hash', 'source_language', 'target_language', 'backend'), name='unique_translation_memory_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_translationmemory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signature', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=100)),
+                ('last_object_id', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Translation Checkpoint',
+                'verbose_name_plural': 'Translation Checkpoints',
+                'constraints': [models.UniqueConstraint(fields=('signature', 'model'), name='unique_translation_checkpoint')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TranslationFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.CharField(max_length=64)),
+                ('field_name', models.CharField(max_length=64)),
+                ('language_code', models.CharField(max_length=15, verbose_name='Language')),
+                ('source_hash', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Translation Fingerprint',
+                'verbose_name_plural': 'Translation Fingerprints',
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id', 'language_code', 'field_name'), name='unique_translation_fingerprint')],
+            },
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of api.search and api.listings as of this migration.
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'tr': 'turkish',
+    'ru': 'russian',
+    'ar': 'arabic',
+    'uk': 'simple',
+}
+BATCH_SIZE = 1000
+
+
+def normalize_text(text):
+    return ' '.join(str(text).casefold().split())
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for language_code, config in SEARCH_CONFIGS.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS api_placelisting_{language_code}_fts ON api_placelisting "
+            f"USING gin (to_tsvector('{config}'::regconfig, document)) WHERE language_code = '{language_code}'"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for language_code in SEARCH_CONFIGS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS api_placelisting_{language_code}_fts")
+
+
+def populate_place_listings(apps, schema_editor):
+    Place = apps.get_model('api', 'Place')
+    PlaceTranslation = apps.get_model('api', 'PlaceTranslation')
+    CategoryTranslation = apps.get_model('api', 'CategoryTranslation')
+    PlaceListing = apps.get_model('api', 'PlaceListing')
+
+    language_codes = [code for code, name in settings.LANGUAGES]
+    fallback_language = settings.PARLER_DEFAULT_LANGUAGE_CODE
+    category_names = {
+        (master_id, language_code): name
+        for master_id, language_code, name in CategoryTranslation.objects.values_list('master_id', 'language_code', 'name')
+    }
+    places = list(Place.objects.order_by('pk').values_list(
+        'pk', 'category_id', 'address', 'main_image', 'latitude', 'longitude', 'attribute_mask', 'is_active',
+        'created_at', 'popular',
+    ))
+    for start in range(0, len(places), BATCH_SIZE):
+        chunk = places[start:start + BATCH_SIZE]
+        translations = {
+            (master_id, language_code): (name, description)
+            for master_id, language_code, name, description in PlaceTranslation.objects.filter(
+                master_id__in=[row[0] for row in chunk]
+            ).values_list('master_id', 'language_code', 'name', 'description')
+        }
+        listings = []
+        for pk, category_id, address, main_image, latitude, longitude, attribute_mask, is_active, created_at, popular in chunk:
+            for language_code in language_codes:
+                name, description = translations.get(
+                    (pk, language_code), translations.get((pk, fallback_language), ('', None))
+                )
+                category_name = category_names.get(
+                    (category_id, language_code), category_names.get((category_id, fallback_language))
+                )
+                text = ' '.join(part for part in (name, description, category_name, address) if part)
+                listings.append(PlaceListing(
+                    place_id=pk, language_code=language_code, category_id=category_id,
+                    name=name, description=description, category_name=category_name,
+                    document=normalize_text(text), main_image=main_image,
+                    latitude=latitude, longitude=longitude, attribute_mask=attribute_mask,
+                    is_active=is_active, created_at=created_at, popular=popular,
+                    sort_category_name=category_name or '',
+                ))
+        PlaceListing.objects.bulk_create(listings, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_translation_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='place',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Place', 'verbose_name_plural': 'Places'},
+        ),
+        migrations.CreateModel(
+            name='PlaceListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language_code', models.CharField(max_length=15, verbose_name='Language')),
+                ('name', models.CharField(blank=True, max_length=255, verbose_name='Name')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Description')),
+                ('category_name', models.CharField(blank=True, max_length=255, null=True, verbose_name='Category Name')),
+                ('document', models.TextField(blank=True)),
+                ('main_image', models.URLField(blank=True, max_length=500, null=True, verbose_name='Main Image URL')),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Latitude')),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Longitude')),
+                ('attribute_mask', models.BigIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('popular', models.BooleanField(default=False)),
+                ('sort_category_name', models.CharField(blank=True, max_length=255)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.category', verbose_name='Category')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listings', to='api.place', verbose_name='Place')),
+            ],
+            options={
+                'verbose_name': 'Place Listing',
+                'verbose_name_plural': 'Place Listings',
+                'indexes': [models.Index(fields=['language_code', '-created_at', 'place'], name='listing_created_at_idx'), models.Index(fields=['language_code', 'name', 'place'], name='listing_name_idx'), models.Index(fields=['language_code', 'sort_category_name', 'place'], name='listing_category_name_idx')],
+                'constraints': [models.UniqueConstraint(fields=('language_code', 'place'), name='unique_place_listing')],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(populate_place_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_placelisting'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='openinghour',
+            index=models.Index(fields=['day_of_week', 'open_time', 'close_time'], name='opening_hour_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Frozen copy of api.search.SEARCH_CONFIGS as of migration 0007.
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'tr': 'turkish',
+    'ru': 'russian',
+    'ar': 'arabic',
+    'uk': 'simple',
+}
+BATCH_SIZE = 1000
+
+
+def copy_geo_cells(apps, schema_editor):
+    Place = apps.get_model('api', 'Place')
+    PlaceListing = apps.get_model('api', 'PlaceListing')
+    PlaceListing.objects.update(
+        geo_cell=Subquery(Place.objects.filter(pk=OuterRef('place_id')).values('geo_cell')[:1])
+    )
+
+
+def restore_search_documents(apps, schema_editor):
+    # Backwards only: the listing documents hold the same text the search
+    # documents did.
+    PlaceListing = apps.get_model('api', 'PlaceListing')
+    PlaceSearchDocument = apps.get_model('api', 'PlaceSearchDocument')
+    if schema_editor.connection.vendor == 'postgresql':
+        for language_code, config in SEARCH_CONFIGS.items():
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS api_placesearch_{language_code}_fts ON api_placesearchdocument "
+                f"USING gin (to_tsvector('{config}'::regconfig, document)) WHERE language_code = '{language_code}'"
+            )
+    rows = PlaceListing.objects.order_by('pk').values_list('place_id', 'language_code', 'document')
+    PlaceSearchDocument.objects.bulk_create(
+        (
+            PlaceSearchDocument(place_id=place_id, language_code=language_code, document=document)
+            for place_id, language_code, document in rows.iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_opening_hour_lookup_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='placelisting',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='placelisting',
+            index=models.Index(fields=['language_code', 'geo_cell'], name='listing_geo_cell_idx'),
+        ),
+        migrations.RunPython(copy_geo_cells, migrations.RunPython.noop),
+        migrations.RunPython(migrations.RunPython.noop, restore_search_documents),
+        migrations.DeleteModel(
+            name='PlaceSearchDocument',
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:10
+
+import operator
+from functools import reduce
+
+from django.db import migrations, models
+
+# Frozen copy of api.attributes.ATTRIBUTE_FIELDS as of this migration: bit i
+# of attribute_mask is the i-th field.
+ATTRIBUTE_FIELDS = (
+    'outside_area', 'inside_area', 'reservation', 'kids_menu', 'baby_sit', 'kard_pay',
+    'cash', 'free_park_area', 'bar', 'coffee', 'dessert', 'kitchen',
+    'wheelchair_accessible_entrance', 'pets_allow', 'fish', 'meat_and_chicken',
+    'popular', 'historical_places', 'alcohol', 'beach', 'creative_places', 'castles',
+    'museum', 'parks', 'waterfalls', 'hiking_trails',
+    'kyrenia', 'nicosia', 'famagusta', 'iskele', 'guzelyurt', 'karpaz', 'lefke',
+    'currency_supported', 'is_active',
+)
+
+
+def attribute_mask_expression():
+    return reduce(operator.add, (
+        models.Case(models.When(**{field: True}, then=models.Value(1 << position)), default=models.Value(0))
+        for position, field in enumerate(ATTRIBUTE_FIELDS)
+    ))
+
+
+def populate_attribute_mask(apps, schema_editor):
+    # Backwards only: the plain column is filled in by Place.save() again.
+    Place = apps.get_model('api', 'Place')
+    Place.objects.update(attribute_mask=attribute_mask_expression())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_placelisting_geo_cell_remove_placesearchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, populate_attribute_mask),
+        # The database cannot turn a column into a generated one in place.
+        migrations.RemoveField(
+            model_name='place',
+            name='attribute_mask',
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='attribute_mask',
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=attribute_mask_expression(),
+                output_field=models.BigIntegerField(),
+            ),
+        ),
+    ]
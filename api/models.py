@@ -1,7 +1,14 @@
 from django.db import models
-from django.utils.translation import gettext_lazy as _
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import ExtractHour, ExtractMinute
+from django.utils.translation import get_language, gettext_lazy as _
+from django.utils.functional import cached_property
 from datetime import datetime 
+from functools import lru_cache
 from parler.models import TranslatableModel, TranslatedFields
+from .attributes import attribute_mask_expression
+from .geo import geo_cell_for
+from .opening_hours import MINUTES_PER_DAY, WeeklySchedule, minute_of_week
 
 
 class Language(models.Model): 
@@ -115,51 +122,100 @@ class Place(TranslatableModel):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    liked_by_devices = models.JSONField(default=list, blank=True)
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    # Packed copy of the boolean flags above, see api.attributes.ATTRIBUTE_FIELDS
+    attribute_mask = models.GeneratedField(
+        expression=attribute_mask_expression(),
+        output_field=models.BigIntegerField(),
+        db_persist=True,
+    )
+    # Grid cell of (latitude, longitude), see api.geo
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
 
     class Meta:
         verbose_name = _("Place")
         verbose_name_plural = _("Places")
-        ordering = ['-created_at', 'translations__name']
+        # Not by translated name: that joins the translations and repeats each
+        # place once per language.
+        ordering = ['-created_at', 'id']
+        indexes = [
+            # Keyset pagination key of the places list, see api.pagination
+            models.Index(fields=['-created_at', 'id'], name='place_created_at_id_idx'),
+        ]
 
     def __str__(self):
         return self.safe_translation_getter("name", default=f"Place {self.pk}")
 
-    def get_working_hours_status(self): 
-        now = datetime.now().time()
-        today_weekday = datetime.now().weekday()
-
-        status_texts = {"Closed": _("Closed"), "Open": _("Open")}
-        current_status = {
-            "is_open_now": False,
-            "status_text": str(status_texts["Closed"]), 
-            "next_change_time": None
-        }
-
-        todays_hours = self.open_times.filter(day_of_week=today_weekday).first()
-
-        if todays_hours:
-            open_time = todays_hours.open_time
-            close_time = todays_hours.close_time
-
-            if close_time < open_time:
-                if now >= open_time or now < close_time:
-                    current_status["is_open_now"] = True
-                    current_status["status_text"] = str(status_texts["Open"])
-                    current_status["next_change_time"] = close_time.strftime("%H:%M")
-                elif now < open_time:
-                    current_status["status_text"] = _("Opens at %(time)s") % {'time': open_time.strftime("%H:%M")}
-                    current_status["next_change_time"] = open_time.strftime("%H:%M")
-            else:
-                if open_time <= now < close_time:
-                    current_status["is_open_now"] = True
-                    current_status["status_text"] = str(status_texts["Open"])
-                    current_status["next_change_time"] = close_time.strftime("%H:%M")
-                elif now < open_time:
-                    current_status["status_text"] = _("Opens at %(time)s") % {'time': open_time.strftime("%H:%M")}
-                    current_status["next_change_time"] = open_time.strftime("%H:%M")
+    def save(self, *args, **kwargs):
+        self.geo_cell = geo_cell_for(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if update_fields & {'latitude', 'longitude'}:
+                update_fields.add('geo_cell')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    @cached_property
+    def opening_schedule(self):
+        # Uses the prefetched open_times when the queryset has them.
+        return WeeklySchedule.from_opening_hours(self.open_times.all())
+
+    def get_working_hours_status(self, now=None):
+        return working_hours_status(self.opening_schedule, now)
+
+
+STATUS_TEXTS = {
+    'closed': _("Closed"),
+    'open': _("Open"),
+    'opens_at': _("Opens at %(time)s"),
+    'opens_on': _("Opens %(day)s at %(time)s"),
+}
+
+
+@lru_cache(maxsize=None)
+def _status_text(key, language_code):
+    # gettext is slow enough to show up per row on list pages; the catalogs
+    # never change at runtime, so resolve each message once per language.
+    return str(STATUS_TEXTS[key])
+
+
+@lru_cache(maxsize=None)
+def _day_name(day, language_code):
+    return str(dict(OpeningHour.DAYS_OF_WEEK)[day])
+
+
+def working_hours_status(schedule, now=None):
+    """Working-hours status payload of a WeeklySchedule at `now`."""
+    now = now or datetime.now()
+    current_minute = minute_of_week(now.weekday(), now.time())
+    language_code = get_language()
+
+    current_status = {
+        "is_open_now": False,
+        "status_text": _status_text('closed', language_code),
+        "next_change_time": None
+    }
+
+    is_open, next_change = schedule.status_at(current_minute)
+    if is_open:
+        current_status["is_open_now"] = True
+        current_status["status_text"] = _status_text('open', language_code)
+    if next_change is None:
         return current_status
 
+    next_change_time = f"{next_change % MINUTES_PER_DAY // 60:02d}:{next_change % 60:02d}"
+    current_status["next_change_time"] = next_change_time
+    if not is_open:
+        next_change_day = next_change // MINUTES_PER_DAY
+        if next_change_day == now.weekday() and next_change > current_minute:
+            current_status["status_text"] = _status_text('opens_at', language_code) % {'time': next_change_time}
+        else:
+            current_status["status_text"] = _status_text('opens_on', language_code) % {
+                'day': _day_name(next_change_day, language_code), 'time': next_change_time
+            }
+    return current_status
+
 
 class PlaceImage(models.Model): 
     place = models.ForeignKey(Place, verbose_name=_("Place"), related_name='images', on_delete=models.CASCADE)
@@ -174,6 +230,28 @@ class PlaceImage(models.Model):
     def __str__(self):
         return f"Image for {self.place.safe_translation_getter('name', default=f'Place {self.place_id}')} (Order: {self.order})"
     
+class OpeningHourQuerySet(models.QuerySet):
+    def open_at(self, day_of_week, at):
+        """
+        Rows whose interval covers `at` on `day_of_week`: that day's rows, and
+        the previous day's overnight ones (close_time < open_time), which
+        close on `day_of_week`. Same rules as WeeklySchedule.from_hours.
+        """
+        overnight = Q(close_time__lt=F('open_time'))
+        return self.filter(
+            Q(day_of_week=day_of_week, open_time__lte=at) & (Q(close_time__gt=at) | overnight)
+            | Q(overnight, day_of_week=(day_of_week - 1) % 7, close_time__gt=at)
+        )
+
+    def with_closing_minute(self, day_of_week):
+        # Minutes from midnight of `day_of_week` to each row's close, for rows
+        # of open_at(day_of_week, ...): overnight rows of that day close a day later.
+        return self.annotate(closing_minute=Case(
+            When(Q(close_time__lt=F('open_time')) & Q(day_of_week=day_of_week), then=Value(MINUTES_PER_DAY)),
+            default=Value(0),
+        ) + ExtractHour('close_time') * 60 + ExtractMinute('close_time'))
+
+
 class OpeningHour(models.Model):
     DAYS_OF_WEEK = (
         (0, _('Monday')), (1, _('Tuesday')), (2, _('Wednesday')),
@@ -185,13 +263,161 @@ class OpeningHour(models.Model):
     open_time = models.TimeField(_("Open Time"))
     close_time = models.TimeField(_("Close Time"))
 
+    objects = OpeningHourQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Opening Hour")
         verbose_name_plural = _("Opening Hours")
         ordering = ['day_of_week', 'open_time']
         unique_together = ('place', 'day_of_week', 'open_time')
+        indexes = [
+            # open_at() lookups of ?open_now= / ?open_at= and ordering=closing_soon.
+            models.Index(fields=['day_of_week', 'open_time', 'close_time'], name='opening_hour_lookup_idx'),
+        ]
 
     def __str__(self):
         place_name = self.place.safe_translation_getter("name", default=f"Place {self.place_id}")
         return f"{self.get_day_of_week_display()}: {self.open_time.strftime('%H:%M')} - {self.close_time.strftime('%H:%M')} for {place_name}"
 
+
+class PlaceLikeQuerySet(models.QuerySet):
+    def liked_place_ids(self, device_id, place_ids):
+        if not device_id:
+            return set()
+        return set(self.filter(device_id=device_id, place_id__in=place_ids).values_list('place_id', flat=True))
+
+    async def aliked_place_ids(self, device_id, place_ids):
+        if not device_id:
+            return set()
+        return {pk async for pk in self.filter(device_id=device_id, place_id__in=place_ids).values_list('place_id', flat=True)}
+
+
+class PlaceLike(models.Model):
+    place = models.ForeignKey(Place, verbose_name=_("Place"), related_name='likes', on_delete=models.CASCADE)
+    device_id = models.CharField(_("Device ID"), max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PlaceLikeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Place Like")
+        verbose_name_plural = _("Place Likes")
+        constraints = [
+            models.UniqueConstraint(fields=['device_id', 'place'], name='unique_place_like_per_device'),
+        ]
+
+    def __str__(self):
+        return f"{self.device_id} likes place {self.place_id}"
+
+
+class PlaceListing(models.Model):
+    # Flat per-(place, language) read model of the places list: the name,
+    # description and category name resolved like parler does (language, then
+    # PARLER_DEFAULT_LANGUAGE_CODE), the search document and the filter, sort
+    # and geo columns, so list, search, ordering and nearby need no joins.
+    # Maintained by api.signals / rebuild_place_listings.
+    place = models.ForeignKey(Place, verbose_name=_("Place"), related_name='listings', on_delete=models.CASCADE)
+    language_code = models.CharField(_("Language"), max_length=15)
+    category = models.ForeignKey(Category, verbose_name=_("Category"), related_name='+', on_delete=models.CASCADE)
+    name = models.CharField(_("Name"), max_length=255, blank=True)
+    description = models.TextField(_("Description"), blank=True, null=True)
+    # NULL when the category has no translation in either language.
+    category_name = models.CharField(_("Category Name"), max_length=255, blank=True, null=True)
+    document = models.TextField(blank=True)
+    main_image = models.URLField(_("Main Image URL"), max_length=500, blank=True, null=True)
+    latitude = models.DecimalField(_("Latitude"), max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(_("Longitude"), max_digits=9, decimal_places=6, null=True, blank=True)
+    # Place.geo_cell, for /api/places/nearby/.
+    geo_cell = models.BigIntegerField(null=True, blank=True)
+    attribute_mask = models.BigIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    # Sort keys of ?ordering=, see PlaceOrderingFilter.listing_ordering
+    created_at = models.DateTimeField()
+    popular = models.BooleanField(default=False)
+    sort_category_name = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = _("Place Listing")
+        verbose_name_plural = _("Place Listings")
+        constraints = [
+            models.UniqueConstraint(fields=['language_code', 'place'], name='unique_place_listing'),
+        ]
+        indexes = [
+            models.Index(fields=['language_code', '-created_at', 'place'], name='listing_created_at_idx'),
+            models.Index(fields=['language_code', 'name', 'place'], name='listing_name_idx'),
+            models.Index(fields=['language_code', 'sort_category_name', 'place'], name='listing_category_name_idx'),
+            models.Index(fields=['language_code', 'geo_cell'], name='listing_geo_cell_idx'),
+        ]
+
+    def __str__(self):
+        return f"Listing of place {self.place_id} ({self.language_code})"
+
+
+class TranslationMemory(models.Model):
+    # Translations already fetched from a provider, keyed by a hash of the
+    # whitespace-normalised source text. auto_translate_content checks this
+    # table before calling the provider.
+    source_hash = models.CharField(max_length=64)
+    source_language = models.CharField(_("Source Language"), max_length=15)
+    target_language = models.CharField(_("Target Language"), max_length=15)
+    backend = models.CharField(max_length=50)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Translation Memory Entry")
+        verbose_name_plural = _("Translation Memory")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_hash', 'source_language', 'target_language', 'backend'],
+                name='unique_translation_memory_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source_language}->{self.target_language} ({self.backend}): {self.source_text[:30]}"
+
+
+class TranslationFingerprint(models.Model):
+    # SHA-256 of the source text a machine translation was made from, per
+    # (object, field, target language). A translation whose fingerprint no
+    # longer matches its source text is stale.
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    field_name = models.CharField(max_length=64)
+    language_code = models.CharField(_("Language"), max_length=15)
+    source_hash = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Translation Fingerprint")
+        verbose_name_plural = _("Translation Fingerprints")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model', 'object_id', 'language_code', 'field_name'],
+                name='unique_translation_fingerprint',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id} {self.field_name} ({self.language_code})"
+
+
+class TranslationCheckpoint(models.Model):
+    # Last object whose translations auto_translate_content committed, per
+    # run signature (options) and model, so an interrupted run can resume.
+    signature = models.CharField(max_length=64)
+    model = models.CharField(max_length=100)
+    last_object_id = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Translation Checkpoint")
+        verbose_name_plural = _("Translation Checkpoints")
+        constraints = [
+            models.UniqueConstraint(fields=['signature', 'model'], name='unique_translation_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} up to {self.last_object_id}"
@@ -0,0 +1,106 @@
+from bisect import bisect_right
+from datetime import datetime
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+WEEKDAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+def minute_of_week(day_of_week, value):
+    return day_of_week * MINUTES_PER_DAY + value.hour * 60 + value.minute
+
+
+def current_week_time():
+    # (day_of_week, time) of now, to the minute, as working_hours_status sees it.
+    now = datetime.now()
+    return now.weekday(), now.time().replace(second=0, microsecond=0)
+
+
+def parse_week_time(value):
+    """
+    (day_of_week, time) of '<weekday>T<HH:MM>', where the weekday is 0-6
+    (Monday is 0, like OpeningHour.day_of_week), an English day name or its
+    first three letters, e.g. '4T18:30' or 'friT18:30'. Raises ValueError.
+    """
+    # The last 't', since day names may contain one ('tuesday', 'saturday').
+    day, separator, clock = value.strip().lower().rpartition('t')
+    if not separator:
+        raise ValueError(value)
+    day = day.strip()
+    if day.isdigit() and int(day) < len(WEEKDAY_NAMES):
+        day_of_week = int(day)
+    else:
+        matches = [index for index, name in enumerate(WEEKDAY_NAMES) if len(day) >= 3 and name.startswith(day)]
+        if len(matches) != 1:
+            raise ValueError(value)
+        day_of_week = matches[0]
+    return day_of_week, datetime.strptime(clock.strip(), '%H:%M').time()
+
+
+class WeeklySchedule:
+    """
+    Opening hours compiled into sorted, non-overlapping [start, end) intervals
+    measured in minutes since Monday 00:00. Intervals that run past Sunday
+    midnight are split and wrapped to the start of the week.
+    """
+
+    def __init__(self, intervals):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    @classmethod
+    def from_opening_hours(cls, opening_hours):
+        return cls.from_hours(
+            (opening_hour.day_of_week, opening_hour.open_time, opening_hour.close_time)
+            for opening_hour in opening_hours
+        )
+
+    @classmethod
+    def from_hours(cls, hours):
+        """Build from (day_of_week, open_time, close_time) tuples."""
+        intervals = []
+        for day_of_week, open_time, close_time in hours:
+            start = minute_of_week(day_of_week, open_time)
+            end = minute_of_week(day_of_week, close_time)
+            if close_time < open_time:
+                # Overnight, e.g. 18:00-02:00 closes on the following day.
+                end += MINUTES_PER_DAY
+            if end <= start:
+                continue
+            if end > MINUTES_PER_WEEK:
+                intervals.append((start, MINUTES_PER_WEEK))
+                intervals.append((0, end - MINUTES_PER_WEEK))
+            else:
+                intervals.append((start, end))
+        return cls(intervals)
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def status_at(self, minute):
+        """
+        Returns (is_open, next_change) for a minute of the week, where
+        next_change is the minute of the week the status flips next, or None
+        when it never does.
+        """
+        if not self.starts:
+            return False, None
+        if self.starts == [0] and self.ends == [MINUTES_PER_WEEK]:
+            return True, None
+        index = bisect_right(self.starts, minute) - 1
+        if index >= 0 and minute < self.ends[index]:
+            end = self.ends[index]
+            if end == MINUTES_PER_WEEK and self.starts[0] == 0:
+                # Open across Sunday midnight; the wrapped interval continues it.
+                end = self.ends[0]
+            return True, end % MINUTES_PER_WEEK
+        if index + 1 < len(self.starts):
+            return False, self.starts[index + 1]
+        return False, self.starts[0]
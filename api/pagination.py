@@ -0,0 +1,166 @@
+import base64
+import binascii
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PlaceKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the queryset's full ordering. The ordering
+    must end in a unique key, which PlaceOrderingFilter guarantees by appending
+    the primary key. A cursor carries the ordering values of the row it starts
+    after, so every page is one indexed range scan instead of COUNT + OFFSET.
+
+    ?count=false skips the COUNT(*). Requests with the old ?page= parameter are
+    still served by PageNumberPagination.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    legacy_page_query_param = 'page'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy_paginator = None
+        if request.query_params.get(self.legacy_page_query_param):
+            self.legacy_paginator = PageNumberPagination()
+            return self.legacy_paginator.paginate_queryset(queryset, request, view)
+
+        queryset, page_queryset, values, reverse = self.prepare(queryset, request)
+        self.count = queryset.count() if self.include_count(request) else None
+        return self.finish(list(page_queryset), values, reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # paginate_queryset() with the async ORM, for api.async_views.
+        self.request = request
+        self.legacy_paginator = None
+        if request.query_params.get(self.legacy_page_query_param):
+            self.legacy_paginator = PageNumberPagination()
+            return await sync_to_async(self.legacy_paginator.paginate_queryset)(queryset, request, view)
+
+        queryset, page_queryset, values, reverse = self.prepare(queryset, request)
+        self.count = await queryset.acount() if self.include_count(request) else None
+        return self.finish([row async for row in page_queryset], values, reverse)
+
+    def prepare(self, queryset, request):
+        # The queryset to count and the one of the requested page (one row
+        # more than a page, to tell whether there is a next one).
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = [term for term in queryset.query.order_by if isinstance(term, str)]
+        if not self.ordering:
+            self.ordering = ['pk']
+            queryset = queryset.order_by('pk')
+
+        values, reverse = self.decode_cursor(request)
+
+        page_queryset = queryset
+        ordering = self.ordering
+        if reverse:
+            ordering = [self._flip(term) for term in ordering]
+            page_queryset = page_queryset.order_by(*ordering)
+        if values is not None:
+            page_queryset = page_queryset.filter(self._after(ordering, values))
+        return queryset, page_queryset[:self.page_size + 1], values, reverse
+
+    def finish(self, results, values, reverse):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if self.legacy_paginator is not None:
+            return self.legacy_paginator.get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() not in ('0', 'false', 'no')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        values = [self._value(instance, term.lstrip('-')) for term in self.ordering]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.base_url, self.legacy_page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = payload['v'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    @staticmethod
+    def _value(instance, field):
+        # Pages are model instances, or dicts when the view paginates a values() queryset.
+        value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if hasattr(value, 'pk'):
+            return value.pk
+        return value
+
+    @staticmethod
+    def _flip(term):
+        return term[1:] if term.startswith('-') else f'-{term}'
+
+    @staticmethod
+    def _after(ordering, values):
+        # Lexicographic "row comes after (v1, v2, ...)" in the given ordering:
+        # (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ...
+        condition = Q()
+        equal_so_far = Q()
+        for term, value in zip(ordering, values):
+            field = term.lstrip('-')
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            condition |= equal_so_far & Q(**{f'{field}__{lookup}': value})
+            equal_so_far &= Q(**{field: value})
+        return condition
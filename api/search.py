@@ -0,0 +1,68 @@
+from django.db import connection
+from django.db.models import F, FloatField, Func, Value
+
+# Text search configuration per language. PostgreSQL ships no Ukrainian
+# stemmer, so Ukrainian documents are only lowercased and tokenised.
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'tr': 'turkish',
+    'ru': 'russian',
+    'ar': 'arabic',
+    'uk': 'simple',
+}
+
+
+def search_config(language_code):
+    return SEARCH_CONFIGS.get(language_code, 'simple')
+
+
+def normalize_text(text):
+    return ' '.join(str(text).casefold().split())
+
+
+class ToTSVector(Func):
+    # Renders exactly the expression the per-language GIN indexes are built on,
+    # so PostgreSQL can match the index.
+    function = 'to_tsvector'
+
+    def __init__(self, expression, config, **extra):
+        super().__init__(expression, **extra)
+        self.config = config
+
+    def as_sql(self, compiler, connection, **extra_context):
+        template = "%(function)s('" + self.config + "'::regconfig, %(expressions)s)"
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
+def search_listings(queryset, terms, language_code):
+    # PlaceListing rows of `language_code` carry their own document.
+    return match_documents(queryset, 'document', terms, language_code)
+
+
+def match_documents(queryset, document_field, terms, language_code):
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+        config = search_config(language_code)
+        vector = ToTSVector(F(document_field), config, output_field=SearchVectorField())
+        query = SearchQuery(' '.join(terms), config=config, search_type='websearch')
+        return queryset.alias(search_vector=vector).filter(search_vector=query).annotate(
+            search_rank=SearchRank(vector, query)
+        )
+
+    # Portable fallback (SQLite in tests): every term must appear in the
+    # casefolded document. No stemming or relevance ranking.
+    for term in terms:
+        queryset = queryset.filter(**{f'{document_field}__contains': normalize_text(term)})
+    return queryset.annotate(search_rank=Value(1.0, output_field=FloatField()))
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
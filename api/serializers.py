@@ -1,11 +1,23 @@
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.db import models
 from .models import (
-    Language, Category, Place, PlaceImage, OpeningHour,
-    ExpectationDefinition, SortTagDefinition
+    Language, Category, Place, PlaceImage, OpeningHour, PlaceLike,
+    ExpectationDefinition, SortTagDefinition, working_hours_status
 )
 from django.utils.translation import get_language, activate 
+from .caching import aplace_detail_cache_key, get_place_detail_timeout, place_detail_cache_key
+from .opening_hours import WeeklySchedule
+from .definitions import expectation_definitions, sort_tag_definitions
+from .instrumentation import TimedSerializerMixin, record_cache, serializer_timing
 from parler_rest.serializers import TranslatableModelSerializer, TranslatedFieldsField
 from parler_rest.fields import TranslatedField
 
@@ -14,8 +26,8 @@ class LanguageSerializer(serializers.ModelSerializer):
         model = Language
         fields = ['code', 'name', 'flag_icon_key']
 
-class CategorySerializer(TranslatableModelSerializer):
-    translations = TranslatedFieldsField(shared_model=Category)
+class CategorySerializer(TimedSerializerMixin, TranslatableModelSerializer):
+    name = TranslatedField()
 
     class Meta:
         model = Category
@@ -35,21 +47,35 @@ class OpeningHourSerializer(serializers.ModelSerializer):
         model = OpeningHour
         fields = ['day', 'open', 'close']
 
-class ExpectationDefinitionSerializer(TranslatableModelSerializer):
+class ExpectationDefinitionSerializer(TimedSerializerMixin, TranslatableModelSerializer):
     name = TranslatedField()
 
     class Meta:
         model = ExpectationDefinition
         fields = ['key', 'icon_key', 'name']
 
-class SortTagDefinitionSerializer(TranslatableModelSerializer):
+class SortTagDefinitionSerializer(TimedSerializerMixin, TranslatableModelSerializer):
     name = TranslatedField()
 
     class Meta:
         model = SortTagDefinition
         fields = ['key', 'icon_key', 'type', 'name']
 
-class PlaceListSerializer(TranslatableModelSerializer):
+class SparseFieldsMixin:
+    """
+    Limits the serializer to the field names in context['fields'] (see
+    PlaceViewSet.get_sparse_fields); None keeps every field.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+class PlaceListSerializer(SparseFieldsMixin, TimedSerializerMixin, TranslatableModelSerializer):
     name = TranslatedField()
     description = TranslatedField()
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -67,9 +93,164 @@ class PlaceListSerializer(TranslatableModelSerializer):
     def get_working_hours_status(self, obj):
         return obj.get_working_hours_status()
 
-
-class PlaceDetailSerializer(TranslatableModelSerializer):
-    all_translations = TranslatedFieldsField(shared_model=Place, source='translations', read_only=True)
+    # Columns of the PlaceListing values() rows read by serialize_rows().
+    row_fields = ('place_id', 'category_id', 'main_image', 'latitude', 'longitude', 'category_name')
+    _decimal_field = None
+
+    @classmethod
+    def serialize_rows(cls, rows, fields=None):
+        """
+        Builds exactly the payload of PlaceListSerializer(places, many=True)
+        from PlaceListing values() rows with row_fields, without model
+        instances: one query for the translations and one for the opening
+        hours of the page.
+        `fields` limits the payload (and the queries) like context['fields'].
+        """
+        with serializer_timing():
+            translations, hours = cls._row_related_querysets(rows, fields)
+            return cls._build_rows(rows, fields, list(translations), list(hours))
+
+    @classmethod
+    async def aserialize_rows(cls, rows, fields=None):
+        # serialize_rows() with the async ORM.
+        translations, hours = cls._row_related_querysets(rows, fields)
+        translations = [row async for row in translations]
+        hours = [row async for row in hours]
+        with serializer_timing():
+            return cls._build_rows(rows, fields, translations, hours)
+
+    @classmethod
+    def _row_related_querysets(cls, rows, fields):
+        wanted = set(cls.Meta.fields if fields is None else fields)
+        place_ids = [row['place_id'] for row in rows]
+        # Same query as the translations prefetch, so languages come out in the same order.
+        translations = Place._parler_meta.root_model.objects.filter(
+            master__in=place_ids
+        ).values_list('master_id', 'language_code', 'name', 'description')
+        hours = OpeningHour.objects.filter(
+            place__in=place_ids
+        ).values_list('place_id', 'day_of_week', 'open_time', 'close_time')
+        if not rows or not wanted & {'name', 'description'}:
+            translations = translations.none()
+        if not rows or 'working_hours_status' not in wanted:
+            hours = hours.none()
+        return translations, hours
+
+    @classmethod
+    def _build_rows(cls, rows, fields, translations, opening_hours):
+        if not rows:
+            return []
+        wanted = set(cls.Meta.fields if fields is None else fields)
+        if cls._decimal_field is None:
+            cls._decimal_field = cls().fields['latitude']
+        decimal = cls._decimal_field.to_representation
+        place_ids = [row['place_id'] for row in rows]
+
+        names = {pk: OrderedDict() for pk in place_ids}
+        descriptions = {pk: OrderedDict() for pk in place_ids}
+        for master_id, language_code, name, description in translations:
+            names[master_id][language_code] = name
+            descriptions[master_id][language_code] = description
+
+        hours = defaultdict(list)
+        for place_id, day_of_week, open_time, close_time in opening_hours:
+            hours[place_id].append((day_of_week, open_time, close_time))
+
+        now = datetime.now()
+        results = []
+        for row in rows:
+            pk = row['place_id']
+            item = {
+                'id': pk,
+                'name': names[pk],
+                'description': descriptions[pk],
+                'category': row['category_id'],
+                # None when the category has no usable translation, as DRF
+                # renders the TranslationDoesNotExist of category.name.
+                'category_name': row['category_name'],
+                'main_image': row['main_image'],
+            }
+            item['latitude'] = None if row['latitude'] is None else decimal(row['latitude'])
+            item['longitude'] = None if row['longitude'] is None else decimal(row['longitude'])
+            if 'working_hours_status' in wanted:
+                item['working_hours_status'] = working_hours_status(WeeklySchedule.from_hours(hours[pk]), now)
+            if fields is not None:
+                # In Meta.fields order, like SparseFieldsMixin.
+                item = {name: value for name, value in item.items() if name in wanted}
+            results.append(item)
+        return results
+
+
+class NearbyPlaceSerializer(PlaceListSerializer):
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(PlaceListSerializer.Meta):
+        fields = PlaceListSerializer.Meta.fields + ['distance_km']
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_km, 3)
+
+
+def get_request_device_id(context):
+    request = context.get('request')
+    device_id = None
+    if request:
+        if request.method == 'POST' and hasattr(request, 'data'):
+            device_id = request.data.get('device_id')
+        elif hasattr(request, 'GET'):
+            device_id = request.GET.get('device_id')
+    return device_id
+
+
+class PlaceDetailListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Look up the device's likes for the whole page in one query.
+        places = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'user_interaction' in self.child.fields:
+            device_id = get_request_device_id(self.context)
+            self.context['liked_place_ids'] = PlaceLike.objects.liked_place_ids(
+                device_id, [place.pk for place in places]
+            )
+        return super().to_representation(places)
+
+
+# context['languages'] value that selects every translation.
+ALL_LANGUAGES = 'all'
+
+
+class LanguageScopedTranslatedFieldsField(TranslatedFieldsField):
+    """
+    TranslatedFieldsField limited to context['languages']: a list of codes
+    (in that order), ALL_LANGUAGES, or None for the active language, falling
+    back to PARLER_DEFAULT_LANGUAGE_CODE when there is no translation in it.
+    Only the selected translations are read, from the prefetch if there is one.
+    """
+
+    def to_representation(self, value):
+        if value is None:
+            return None
+        serializer = self.serializer_class(instance=self.parent.instance, context=self.context, partial=self.parent.partial)
+        languages = self.context.get('languages')
+        if languages == ALL_LANGUAGES:
+            selected = list(value.all())
+        else:
+            if languages is None:
+                languages = dict.fromkeys([get_language(), settings.PARLER_DEFAULT_LANGUAGE_CODE])
+            if 'translations' in getattr(value.instance, '_prefetched_objects_cache', {}):
+                translations = [translation for translation in value.all() if translation.language_code in languages]
+            else:
+                translations = value.filter(language_code__in=list(languages))
+            by_language = {translation.language_code: translation for translation in translations}
+            selected = [by_language[code] for code in languages if code in by_language]
+            if self.context.get('languages') is None:
+                selected = selected[:1]
+        return OrderedDict(
+            (translation.language_code, serializer.to_representation(translation)) for translation in selected
+        )
+
+
+class PlaceDetailSerializer(SparseFieldsMixin, TranslatableModelSerializer):
+    all_translations = LanguageScopedTranslatedFieldsField(shared_model=Place, source='translations', read_only=True)
 
     type = serializers.CharField(source='category.name', read_only=True)
     location = serializers.SerializerMethodField()
@@ -87,6 +268,10 @@ class PlaceDetailSerializer(TranslatableModelSerializer):
     _expectation_definitions_cache = None
     _sort_tag_definitions_cache = None
 
+    # Per-device and time-dependent fields, computed on every request and
+    # merged into the cached part of the payload.
+    volatile_fields = ('working_hours_status', 'user_interaction')
+
     class Meta:
         model = Place
         fields = [
@@ -97,36 +282,82 @@ class PlaceDetailSerializer(TranslatableModelSerializer):
             'expectations', 
             'sorting_tags',
         ]
-    def _get_all_expectation_definitions(self):
-        current_lang_for_debug = get_language()
-
-        # Fetch all master objects first
-        all_master_definitions = ExpectationDefinition.objects.all()
-
-        temp_cache = {}
-        for defn_master in all_master_definitions:
-            defn_master.set_current_language(current_lang_for_debug)
-            temp_cache[defn_master.key] = defn_master
+        list_serializer_class = PlaceDetailListSerializer
+
+    def to_representation(self, instance):
+        with serializer_timing():
+            readable_fields, cached_fields, sparse = self._split_fields()
+            cache_key = place_detail_cache_key(instance.pk, get_language(), sparse, self.context.get('languages'))
+            cached = cache.get(cache_key)
+            record_cache('place_detail', cached is not None)
+            if cached is None:
+                cached = self._serialize_fields(instance, cached_fields)
+                cache.set(cache_key, cached, get_place_detail_timeout())
+            return self._merge_volatile(instance, readable_fields, cached)
+
+    async def ato_representation(self, instance):
+        """
+        to_representation() for async views, with async cache access and the
+        device's like looked up with the async ORM. The instance must come with
+        its open_times prefetched, so a cache hit needs no other query; a miss
+        serializes the cached part, with its lazy related queries, in a worker
+        thread.
+        """
+        readable_fields, cached_fields, sparse = self._split_fields()
+        if 'user_interaction' in self.fields and 'liked_place_ids' not in self.context:
+            self.context['liked_place_ids'] = await PlaceLike.objects.aliked_place_ids(
+                get_request_device_id(self.context), [instance.pk]
+            )
+        cache_key = await aplace_detail_cache_key(instance.pk, get_language(), sparse, self.context.get('languages'))
+        cached = await cache.aget(cache_key)
+        record_cache('place_detail', cached is not None)
+        if cached is None:
+            cached = await sync_to_async(self._serialize_fields)(instance, cached_fields)
+            await cache.aset(cache_key, cached, get_place_detail_timeout())
+        with serializer_timing():
+            return self._merge_volatile(instance, readable_fields, cached)
+
+    def _split_fields(self):
+        readable_fields = list(self._readable_fields)
+        cached_fields = [field for field in readable_fields if field.field_name not in self.volatile_fields]
+        # Sparse payloads are cached under their own key.
+        sparse = None if self.context.get('fields') is None else [field.field_name for field in cached_fields]
+        return readable_fields, cached_fields, sparse
+
+    def _merge_volatile(self, instance, readable_fields, cached):
+        volatile = self._serialize_fields(
+            instance, [field for field in readable_fields if field.field_name in self.volatile_fields]
+        )
+        return {
+            field.field_name: volatile[field.field_name] if field.field_name in volatile else cached[field.field_name]
+            for field in readable_fields
+            if field.field_name in volatile or field.field_name in cached
+        }
 
-        self._expectation_definitions_cache = temp_cache
+    def _serialize_fields(self, instance, fields):
+        # Same per-field loop as Serializer.to_representation.
+        ret = {}
+        for field in fields:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
+        return ret
 
+    def _get_all_expectation_definitions(self):
+        # One registry lookup per serializer instance, which a ListSerializer
+        # shares across the whole page.
+        if self._expectation_definitions_cache is None:
+            self._expectation_definitions_cache = expectation_definitions.all()
         return self._expectation_definitions_cache
 
     def _get_all_sort_tag_definitions(self):
-        current_lang_for_debug = get_language()
-
-        all_master_definitions = SortTagDefinition.objects.all()
-
-        temp_cache = {}
-        for defn_master in all_master_definitions:
-            defn_master.set_current_language(current_lang_for_debug)
-
-            temp_cache[defn_master.key] = defn_master
-
-        self._sort_tag_definitions_cache = temp_cache
+        if self._sort_tag_definitions_cache is None:
+            self._sort_tag_definitions_cache = sort_tag_definitions.all()
         return self._sort_tag_definitions_cache
-    
-    
+
     def get_location(self, obj):
         return {
             "latitude": str(obj.latitude) if obj.latitude is not None else None,
@@ -148,6 +379,7 @@ class PlaceDetailSerializer(TranslatableModelSerializer):
             "meat_and_chicken": "meatAndChicken"
         }
         all_definitions = self._get_all_expectation_definitions()
+        current_lang = get_language()
         display_list = []
 
         for model_field, definition_key in field_to_key_map.items():
@@ -156,8 +388,7 @@ class PlaceDetailSerializer(TranslatableModelSerializer):
                 definition_obj = all_definitions.get(definition_key)
                 item_data = {
                     definition_key: True,
-                    # 'name' from definition_obj will be in the current language
-                    "label": definition_obj.name if definition_obj else definition_key.title(),
+                    "label": definition_obj.label(current_lang) if definition_obj else definition_key.title(),
                     "icon_key": definition_obj.icon_key if definition_obj else None
                 }
                 if not definition_obj:
@@ -177,6 +408,7 @@ class PlaceDetailSerializer(TranslatableModelSerializer):
             "iskele": "iskele", "guzelyurt": "guzelyurt", "karpaz": "karpaz", "lefke": "lefke"
         }
         all_definitions = self._get_all_sort_tag_definitions()
+        current_lang = get_language()
         display_list = []
         for model_field, definition_key in field_to_key_map.items():
             is_true = getattr(obj, model_field, False)
@@ -184,8 +416,7 @@ class PlaceDetailSerializer(TranslatableModelSerializer):
                 definition_obj = all_definitions.get(definition_key)
                 item_data = {
                     definition_key: True,
-                    # 'name' from definition_obj will be in the current language
-                    "label": definition_obj.name if definition_obj else definition_key.title(),
+                    "label": definition_obj.label(current_lang) if definition_obj else definition_key.title(),
                     "icon_key": definition_obj.icon_key if definition_obj else None
                 }
                 if not definition_obj:
@@ -224,18 +455,10 @@ class PlaceDetailSerializer(TranslatableModelSerializer):
             }
     
     def get_user_interaction(self, obj):
-        request = self.context.get('request')
-        device_id = None
-        if request:
-            if request.method == 'POST' and hasattr(request, 'data'):
-                device_id = request.data.get('device_id')
-            elif hasattr(request, 'GET'):
-                device_id = request.GET.get('device_id')
-
-        is_liked = False
-        if device_id and device_id in obj.liked_by_devices:
-            is_liked = True
-        return {"is_liked": is_liked}
+        liked_place_ids = self.context.get('liked_place_ids')
+        if liked_place_ids is None:
+            liked_place_ids = PlaceLike.objects.liked_place_ids(get_request_device_id(self.context), [obj.pk])
+        return {"is_liked": obj.pk in liked_place_ids}
 
 
 class WheelSpinRequestSerializer(serializers.Serializer): 
@@ -246,4 +469,28 @@ class WheelSpinRequestSerializer(serializers.Serializer):
 
 class LikeRequestSerializer(serializers.Serializer):
     device_id = serializers.CharField(required=True)
-    
\ No newline at end of file
+    
+
+class BulkPlacesRequestSerializer(serializers.Serializer):
+    max_ids = 50
+
+    ids = serializers.CharField(help_text="Comma-separated place ids, at most 50")
+
+    def validate_ids(self, value):
+        try:
+            ids = [int(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            raise serializers.ValidationError("Expected comma-separated integer ids.")
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise serializers.ValidationError("At least one id is required.")
+        if len(ids) > self.max_ids:
+            raise serializers.ValidationError(f"At most {self.max_ids} ids per request.")
+        return ids
+
+
+class NearbyRequestSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=0.01, max_value=50, default=5, help_text="Search radius in km")
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .attributes import attribute_index
+from .caching import DEFINITIONS_VERSION_KEY, PLACE_FACETS_VERSION_KEY, bump_version, place_version_key
+from .listings import rebuild_place_listings
+from .models import Category, ExpectationDefinition, OpeningHour, Place, PlaceImage, SortTagDefinition
+
+
+def translation_model(model):
+    return model._parler_meta.root_model
+
+
+# After commit, so that other processes re-read the committed row.
+@receiver(post_save, sender=Place)
+def update_attribute_index(sender, instance, **kwargs):
+    place_id = instance.pk
+    transaction.on_commit(lambda: attribute_index.invalidate(place_id))
+
+
+@receiver(post_delete, sender=Place)
+def invalidate_attribute_index(sender, **kwargs):
+    transaction.on_commit(attribute_index.invalidate)
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_place(sender, instance, **kwargs):
+    key = place_version_key(instance.pk)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+@receiver(post_save, sender=translation_model(Place))
+@receiver(post_delete, sender=translation_model(Place))
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_delete, sender=PlaceImage)
+@receiver(post_save, sender=OpeningHour)
+@receiver(post_delete, sender=OpeningHour)
+def invalidate_place_related(sender, instance, **kwargs):
+    place_id = getattr(instance, 'place_id', None) or getattr(instance, 'master_id', None)
+    if place_id:
+        key = place_version_key(place_id)
+        transaction.on_commit(lambda: bump_version(key))
+
+
+# Category names and definition labels end up in every place detail payload.
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=translation_model(Category))
+@receiver(post_delete, sender=translation_model(Category))
+@receiver(post_save, sender=ExpectationDefinition)
+@receiver(post_delete, sender=ExpectationDefinition)
+@receiver(post_save, sender=translation_model(ExpectationDefinition))
+@receiver(post_delete, sender=translation_model(ExpectationDefinition))
+@receiver(post_save, sender=SortTagDefinition)
+@receiver(post_delete, sender=SortTagDefinition)
+@receiver(post_save, sender=translation_model(SortTagDefinition))
+@receiver(post_delete, sender=translation_model(SortTagDefinition))
+def invalidate_definitions(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(DEFINITIONS_VERSION_KEY))
+
+
+@receiver(post_save, sender=Place)
+def update_place_listings(sender, instance, **kwargs):
+    transaction.on_commit(lambda: rebuild_place_listings([instance.pk]))
+
+
+@receiver(post_save, sender=translation_model(Place))
+@receiver(post_delete, sender=translation_model(Place))
+def update_place_listings_for_translation(sender, instance, **kwargs):
+    place_id = instance.master_id
+    transaction.on_commit(lambda: rebuild_place_listings([place_id]))
+
+
+@receiver(post_save, sender=translation_model(Category))
+@receiver(post_delete, sender=translation_model(Category))
+def update_place_listings_for_category(sender, instance, **kwargs):
+    category_id = instance.master_id
+    transaction.on_commit(
+        lambda: rebuild_place_listings(Place.objects.filter(category_id=category_id).values('pk'))
+    )
+
+
+# rebuild_place_listings() invalidates facet counts itself; these change them
+# (or the category entries of the payload) without a listing rebuild.
+@receiver(post_delete, sender=Place)
+@receiver(post_save, sender=OpeningHour)
+@receiver(post_delete, sender=OpeningHour)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=translation_model(Category))
+@receiver(post_delete, sender=translation_model(Category))
+def invalidate_place_facets(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(PLACE_FACETS_VERSION_KEY))
@@ -1,3 +1,1292 @@
-from django.test import TestCase
+import json
+import random
+import re
+import sys
+import types
+from datetime import datetime, time
+from decimal import Decimal
+from io import StringIO
+from functools import reduce
+from operator import and_
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import translation
+from rest_framework.renderers import JSONRenderer
+
+from .attributes import (
+    ATTRIBUTE_BITS, EXPECTATION_KEY_FIELDS, SORTING_TAG_KEY_FIELDS, AttributeIndex, attribute_index,
+    compute_attribute_mask, filter_by_attribute_mask, mask_for_keys
+)
+from .benchmarking import measure, seed_catalog, seed_definitions
+from .caching import get_version, place_version_key
+from .geo import geo_cell_for, haversine_km
+from .models import (
+    Category, ExpectationDefinition, OpeningHour, Place, PlaceLike, PlaceListing, TranslationMemory,
+    working_hours_status
+)
+from .opening_hours import MINUTES_PER_DAY, WeeklySchedule
+from .serializers import NearbyPlaceSerializer, PlaceListSerializer
+from .translation import (
+    TokenBucket, TranslationEngine, TranslationJob, TranslationMemoryLookup, TranslationWriter,
+    checkpoint_signature, save_checkpoint, stale_translations
+)
+from .translation_backends import MyMemoryBackend, StubBackend, get_translation_backend
+from .urls import async_urlpatterns, sync_urlpatterns
+
+
+def create_place(category, name='Place', **fields):
+    place = Place(category=category, **fields)
+    place.set_current_language('en')
+    place.name = name
+    place.save()
+    return place
+
+
+def list_ids(client, params=None):
+    response = client.get('/api/places/', {'page_size': 100, **(params or {})}, HTTP_ACCEPT_LANGUAGE='en')
+    return [item['id'] for item in response.json()['results']]
+
+
+class AttributeMaskFilterTests(TestCase):
+    FIELDS = ('kard_pay', 'coffee', 'fish', 'beach', 'museum', 'kyrenia')
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.language('en').create(name='Cafe')
+        rnd = random.Random(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(40):
+                create_place(category, f'Place {index}', is_active=index % 7 != 0,
+                             **{field: rnd.random() < 0.5 for field in self.FIELDS})
+
+    def boolean_filter(self, keys, key_fields):
+        # The per-key Q(field=True) filters the mask replaced; unknown keys are ignored.
+        conditions = [Q(**{key_fields[key]: True}) for key in keys if key in key_fields]
+        places = Place.objects.filter(is_active=True)
+        if conditions:
+            places = places.filter(reduce(and_, conditions))
+        return sorted(places.values_list('pk', flat=True))
+
+    def test_list_filters_match_boolean_filters(self):
+        cases = [
+            ('expectations', EXPECTATION_KEY_FIELDS, ['kardPay']),
+            ('expectations', EXPECTATION_KEY_FIELDS, ['kardPay', 'coffee', 'fish']),
+            ('expectations', EXPECTATION_KEY_FIELDS, ['coffee', 'unknownKey']),
+            ('expectations', EXPECTATION_KEY_FIELDS, ['unknownKey']),
+            ('sorting_tags', SORTING_TAG_KEY_FIELDS, ['beach']),
+            ('sorting_tags', SORTING_TAG_KEY_FIELDS, ['museum', 'kyrenia']),
+        ]
+        for param, key_fields, keys in cases:
+            with self.subTest(param=param, keys=keys):
+                self.assertEqual(sorted(list_ids(self.client, {param: ', '.join(keys)})),
+                                 self.boolean_filter(keys, key_fields))
+
+    def test_expectations_and_sorting_tags_combine(self):
+        expected = sorted(
+            Place.objects.filter(is_active=True, coffee=True, beach=True).values_list('pk', flat=True)
+        )
+        ids = list_ids(self.client, {'expectations': 'coffee', 'sorting_tags': 'beach'})
+        self.assertEqual(sorted(ids), expected)
+
+    def test_mask_follows_saved_fields(self):
+        place = Place.objects.filter(is_active=True, coffee=False).first()
+        mask = mask_for_keys(['coffee'], EXPECTATION_KEY_FIELDS)
+        self.assertFalse(filter_by_attribute_mask(Place.objects.filter(pk=place.pk), mask).exists())
+        place.coffee = True
+        with self.captureOnCommitCallbacks(execute=True):
+            place.save()
+        self.assertTrue(filter_by_attribute_mask(Place.objects.filter(pk=place.pk), mask).exists())
+        self.assertIn(place.pk, list_ids(self.client, {'expectations': 'coffee'}))
+
+    def test_mask_follows_updates_that_skip_save(self):
+        # The database generates the mask, so update() and bulk_create() keep it too.
+        mask = mask_for_keys(['coffee'], EXPECTATION_KEY_FIELDS)
+        Place.objects.update(coffee=False)
+        self.assertFalse(filter_by_attribute_mask(Place.objects.all(), mask).exists())
+        updated = Place.objects.first()
+        Place.objects.filter(pk=updated.pk).update(coffee=True)
+        created = Place.objects.bulk_create([Place(category=updated.category, coffee=True)])
+        self.assertEqual(
+            sorted(filter_by_attribute_mask(Place.objects.all(), mask).values_list('pk', flat=True)),
+            sorted([updated.pk, created[0].pk]),
+        )
+        for place in Place.objects.all():
+            self.assertEqual(place.attribute_mask, compute_attribute_mask(place))
+
+
+class KeysetPaginationTests(TestCase):
+    ORDERINGS = [
+        'translations__name', '-translations__name', 'category__translations__name',
+        '-category__translations__name', 'popular', '-popular', 'created_at', '-created_at', 'id',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        categories = [Category.objects.language('en').create(name=name) for name in ('Museum', 'Beach', 'Cafe')]
+        with self.captureOnCommitCallbacks(execute=True):
+            # Repeated names, categories and flags, so most orderings need the pk tie-breaker.
+            for index in range(17):
+                create_place(categories[index % 3], f'Place {index % 4}', popular=index % 5 == 0)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_pages_match_single_page(self):
+        for ordering in self.ORDERINGS:
+            with self.subTest(ordering=ordering):
+                expected = list_ids(self.client, {'ordering': ordering})
+                self.assertEqual(len(expected), 17)
+
+                forward, page = [], self.get('/api/places/', {'ordering': ordering, 'page_size': 4})
+                while True:
+                    forward.append([item['id'] for item in page['results']])
+                    if not page['next']:
+                        break
+                    page = self.get(page['next'])
+                self.assertEqual([pk for ids in forward for pk in ids], expected)
+
+                backward = [[item['id'] for item in page['results']]]
+                while page['previous']:
+                    page = self.get(page['previous'])
+                    backward.append([item['id'] for item in page['results']])
+                self.assertEqual(backward[::-1], forward)
+
+    def test_cursor_skips_nothing_after_insert(self):
+        page = self.get('/api/places/', {'ordering': 'translations__name', 'page_size': 5})
+        seen = [item['id'] for item in page['results']]
+        with self.captureOnCommitCallbacks(execute=True):
+            create_place(Category.objects.first(), 'Place 0')
+        while page['next']:
+            page = self.get(page['next'])
+            seen.extend(item['id'] for item in page['results'])
+        # The new place sorts after the first page, so it shows up exactly once.
+        self.assertEqual(sorted(seen), sorted(Place.objects.values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/places/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class OpeningHoursFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.language('en').create(name='Bar')
+        hours = {
+            'day': [(4, time(9), time(17))],
+            'night': [(4, time(18), time(2))],
+            'sunday_night': [(6, time(22), time(3))],
+            'evening': [(4, time(12), time(23))],
+            'none': [],
+        }
+        self.places = {}
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, intervals in hours.items():
+                place = self.places[name] = create_place(category, name)
+                for day_of_week, open_time, close_time in intervals:
+                    OpeningHour.objects.create(place=place, day_of_week=day_of_week, open_time=open_time,
+                                               close_time=close_time)
+
+    def names(self, params):
+        names = {place.pk: name for name, place in self.places.items()}
+        return [names[pk] for pk in list_ids(self.client, params)]
+
+    def test_open_at(self):
+        cases = {
+            'friT13:00': {'day', 'evening'},
+            'fridayT20:00': {'night', 'evening'},
+            '5T01:59': {'night'},
+            'satT02:00': set(),
+            'sunT23:00': {'sunday_night'},
+            'monT00:30': {'sunday_night'},
+            'monT03:00': set(),
+        }
+        for value, expected in cases.items():
+            with self.subTest(open_at=value):
+                self.assertEqual(set(self.names({'open_at': value})), expected)
+
+    def test_open_at_matches_weekly_schedule(self):
+        schedules = {name: WeeklySchedule.from_opening_hours(place.open_times.all())
+                     for name, place in self.places.items()}
+        for day_of_week in range(7):
+            for hour in range(0, 24, 3):
+                expected = {name for name, schedule in schedules.items()
+                            if schedule.status_at(day_of_week * MINUTES_PER_DAY + hour * 60)[0]}
+                with self.subTest(day=day_of_week, hour=hour):
+                    self.assertEqual(set(self.names({'open_at': f'{day_of_week}T{hour:02d}:00'})), expected)
+
+    def test_open_now(self):
+        with mock.patch('api.filters.current_week_time', return_value=(4, time(20))):
+            self.assertEqual(set(self.names({'open_now': 'true'})), {'night', 'evening'})
+            self.assertEqual(set(self.names({'open_now': 'false'})), {'day', 'sunday_night', 'none'})
+
+    def test_closing_soon(self):
+        names = self.names({'open_at': 'friT20:00', 'ordering': 'closing_soon'})
+        self.assertEqual(names, ['evening', 'night'])
+        # Closed places sort last, by pk.
+        with mock.patch('api.filters.current_week_time', return_value=(5, time(1))):
+            names = self.names({'ordering': 'closing_soon'})
+        self.assertEqual(names, ['night', 'day', 'sunday_night', 'evening', 'none'])
+
+    def test_invalid_open_at(self):
+        for value in ('funday', 'friT25:00', 'T18:00', 'tT18:00'):
+            with self.subTest(open_at=value):
+                response = self.client.get('/api/places/', {'open_at': value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('open_at', response.json())
+
+
+class PlaceFacetsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.categories = [Category.objects.language('en').create(name=name) for name in ('Cafe', 'Beach')]
+        rnd = random.Random(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(30):
+                create_place(self.categories[index % 2], f'Place {index}', is_active=index % 9 != 0,
+                             coffee=rnd.random() < 0.5, beach=rnd.random() < 0.5, kyrenia=rnd.random() < 0.3)
+
+    def assert_facets_match_list(self, params):
+        facets = self.client.get('/api/places/facets/', params, HTTP_ACCEPT_LANGUAGE='en').json()
+        self.assertEqual(facets['count'], len(list_ids(self.client, params)))
+        for section, key in (('expectations', 'coffee'), ('sort_tags', 'beach'), ('regions', 'kyrenia')):
+            param = 'expectations' if section == 'expectations' else 'sorting_tags'
+            keys = ','.join(filter(None, [params.get(param), key]))
+            self.assertEqual(facets[section][key], len(list_ids(self.client, {**params, param: keys})))
+        for category in self.categories:
+            if 'category' not in params:
+                self.assertEqual(facets['place_types'][str(category.pk)],
+                                 len(list_ids(self.client, {**params, 'category': category.pk})))
+
+    def test_index_counts_match_list(self):
+        for params in ({}, {'expectations': 'coffee'}, {'category': self.categories[1].pk, 'sorting_tags': 'beach'}):
+            with self.subTest(params=params):
+                self.assert_facets_match_list(params)
+
+    def test_database_counts_match_list(self):
+        for params in ({'search': 'place'}, {'category_name': 'caf', 'expectations': 'coffee'}):
+            with self.subTest(params=params):
+                self.assert_facets_match_list(params)
+
+    def test_counts_follow_saves(self):
+        self.assert_facets_match_list({})
+        place = Place.objects.filter(is_active=True, coffee=False).first()
+        place.coffee = True
+        with self.captureOnCommitCallbacks(execute=True):
+            place.save()
+        self.assert_facets_match_list({})
+
+    def test_categories_follow_saves(self):
+        facets = lambda: self.client.get('/api/places/facets/', HTTP_ACCEPT_LANGUAGE='en').json()['place_types']
+        self.assertEqual(len(facets()), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.language('en').create(name='Museum')
+        self.assertEqual(facets()[str(category.pk)], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            category.delete()
+        self.assertNotIn(str(category.pk), facets())
+
+        # Renaming changes what ?category_name= matches.
+        params = {'category_name': 'seaside'}
+        self.assertEqual(self.client.get('/api/places/facets/', params).json()['count'], 0)
+        category = self.categories[1]
+        category.set_current_language('en')
+        category.name = 'Seaside'
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        self.assert_facets_match_list(params)
+        self.assertEqual(self.client.get('/api/places/facets/', params).json()['count'], 13)
+
+
+def urlconf(patterns):
+    module = types.ModuleType('urls')
+    module.urlpatterns = [path('api/', include(patterns))]
+    return module
+
+
+class PlaceSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        museum = Category.objects.language('en').create(name='Museum')
+        museum.set_current_language('tr')
+        museum.name = 'Müze'
+        museum.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.harbour = self.translated(museum, en=('Harbour house', 'Walks along the harbour and the old harbour'),
+                                           tr=('Liman evi', 'Eski limanda yürüyüşler'))
+            self.cafe = self.translated(museum, en=('Castle cafe', 'Coffee near the harbour'),
+                                        tr=('Kale kafesi', 'Limana yakın kahve'))
+            self.sea = self.translated(museum, en=('Sea house', 'Only in English'))
+
+    def translated(self, category, **translations):
+        place = Place(category=category)
+        for language_code, (name, description) in translations.items():
+            place.set_current_language(language_code)
+            place.name, place.description = name, description
+        place.save()
+        return place
+
+    def search(self, terms, language):
+        response = self.client.get('/api/places/', {'search': terms}, HTTP_ACCEPT_LANGUAGE=language)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_search_matches_the_active_language(self):
+        self.assertEqual(self.search('liman evi', 'tr'), [self.harbour.pk])
+        self.assertEqual(self.search('liman evi', 'en'), [])
+        self.assertEqual(self.search('castle', 'en'), [self.cafe.pk])
+        self.assertEqual(self.search('castle', 'tr'), [])
+        # Category names are searchable, and places without a translation
+        # fall back to the default language.
+        self.assertEqual(set(self.search('müze', 'tr')), {self.harbour.pk, self.cafe.pk, self.sea.pk})
+        self.assertEqual(self.search('sea house', 'tr'), [self.sea.pk])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Stemming and ranking need PostgreSQL full-text search')
+    def test_results_are_stemmed_and_ranked(self):
+        self.assertEqual(self.search('castles', 'en'), [self.cafe.pk])
+        # The newer cafe mentions the harbour once, so relevance beats recency.
+        self.assertEqual(self.search('harbour', 'en'), [self.harbour.pk, self.cafe.pk])
+        self.assertEqual(self.search('liman', 'tr'), [self.harbour.pk, self.cafe.pk])
+        # An explicit ordering replaces the ranking.
+        response = self.client.get('/api/places/', {'search': 'harbour', 'ordering': '-created_at'},
+                                   HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.cafe.pk, self.harbour.pk])
+
+
+class NearbyPlacesTests(TestCase):
+    CENTER = (35.1856, 33.3823)
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.language('en').create(name='Cafe')
+        rnd = random.Random(9)
+        lat, lng = self.CENTER
+        with self.captureOnCommitCallbacks(execute=True):
+            self.places = [
+                create_place(self.category, f'Place {index}', is_active=index % 11 != 0,
+                             latitude=Decimal(f'{lat + rnd.uniform(-0.2, 0.2):.6f}'),
+                             longitude=Decimal(f'{lng + rnd.uniform(-0.2, 0.2):.6f}'))
+                for index in range(50)
+            ]
+            create_place(self.category, 'Nowhere')
+
+    def nearby(self, **params):
+        lat, lng = self.CENTER
+        return self.client.get('/api/places/nearby/', {'lat': lat, 'lng': lng, **params}, HTTP_ACCEPT_LANGUAGE='en')
+
+    def expected(self, radius, limit):
+        distances = {
+            place.pk: haversine_km(*self.CENTER, float(place.latitude), float(place.longitude))
+            for place in self.places if place.is_active
+        }
+        return sorted((pk for pk, distance in distances.items() if distance <= radius), key=distances.get)[:limit]
+
+    def test_nearest_places_in_distance_order(self):
+        for radius, limit in ((5, 20), (12, 100), (25, 10), (50, 100)):
+            with self.subTest(radius=radius, limit=limit):
+                payload = self.nearby(radius=radius, limit=limit).json()
+                self.assertEqual([item['id'] for item in payload], self.expected(radius, limit))
+                distances = [item['distance_km'] for item in payload]
+                self.assertEqual(distances, sorted(distances))
+                self.assertTrue(all(distance <= radius for distance in distances))
+        self.assertGreater(len(self.expected(12, 100)), 5)
+
+    def test_payload_matches_model_serializer(self):
+        with mock.patch('api.serializers.datetime', FrozenDatetime), mock.patch('api.models.datetime', FrozenDatetime):
+            with self.assertNumQueries(3):
+                payload = self.nearby(radius=12).content
+            places = Place.objects.language('en').in_bulk(self.expected(12, 20))
+            for place in places.values():
+                place.distance_km = haversine_km(*self.CENTER, float(place.latitude), float(place.longitude))
+            expected = [places[pk] for pk in self.expected(12, 20)]
+            with translation.override('en'):
+                self.assertEqual(payload, JSONRenderer().render(NearbyPlaceSerializer(expected, many=True).data))
+            sparse = self.nearby(radius=12, fields='distance_km,id').json()
+        self.assertEqual(list(sparse[0]), ['id', 'distance_km'])
+
+    def test_defaults_and_caps(self):
+        self.assertEqual([item['id'] for item in self.nearby().json()], self.expected(5, 20))
+        self.assertEqual(self.nearby(radius=50, limit=100).status_code, 200)
+        for params in ({'radius': 51}, {'radius': 0}, {'limit': 101}, {'limit': 0}, {'lat': 91}):
+            with self.subTest(params=params):
+                self.assertEqual(self.nearby(**params).status_code, 400)
+
+    def test_list_filters_apply(self):
+        other = Category.objects.language('en').create(name='Museum')
+        with self.captureOnCommitCallbacks(execute=True):
+            museum = create_place(other, 'Museum', latitude=Decimal('35.186'), longitude=Decimal('33.382'))
+        self.assertEqual([item['id'] for item in self.nearby(category=other.pk).json()], [museum.pk])
+
+
+class AsyncViewTests(TestCase):
+    SYNC_URLS = urlconf(sync_urlpatterns)
+    ASYNC_URLS = urlconf(async_urlpatterns + sync_urlpatterns)
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.language('en').create(name='Cafe')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.places = [create_place(category, f'Place {index}', kard_pay=index % 2 == 0, coffee=index % 3 == 0)
+                           for index in range(6)]
+            OpeningHour.objects.create(place=self.places[0], day_of_week=0, open_time=time(9), close_time=time(2))
+
+    async def fetch(self, urls, method, url, data=None):
+        with override_settings(ROOT_URLCONF=urls):
+            if method == 'post':
+                response = await self.async_client.post(url, data, content_type='application/json',
+                                                        headers={'accept-language': 'tr'})
+            else:
+                response = await self.async_client.get(url, data, headers={'accept-language': 'tr'})
+        return response.status_code, response.content, response.headers.get('ETag')
+
+    async def test_responses_match_sync_views(self):
+        pk = self.places[0].pk
+        cases = [
+            ('get', '/api/places/', {}),
+            ('get', '/api/places/', {'expectations': 'kardPay', 'ordering': '-translations__name', 'page_size': 2}),
+            ('get', '/api/places/', {'fields': 'name,working_hours_status', 'count': 'false'}),
+            ('get', '/api/places/', {'open_at': 'funday'}),
+            ('get', '/api/places/', {'cursor': 'invalid'}),
+            ('get', f'/api/places/{pk}/', {}),
+            ('get', f'/api/places/{pk}/', {'languages': 'all', 'omit': 'images'}),
+            ('get', '/api/places/0/', {}),
+            ('get', '/api/filter-options/', {}),
+            ('post', '/api/wheel-spin/', {'expectation_keys': ['kardPay', 'coffee'], 'category_ids': []}),
+            ('post', '/api/wheel-spin/', {'expectation_keys': ['fish']}),
+            ('post', '/api/wheel-spin/', {'category_ids': 'x'}),
+        ]
+        for method, url, data in cases:
+            with self.subTest(method=method, url=url, data=data):
+                expected = await self.fetch(self.SYNC_URLS, method, url, data)
+                if method == 'post' and expected[0] == 200:
+                    # A random pick; compare the shape, not the place.
+                    status_code, content, _ = await self.fetch(self.ASYNC_URLS, method, url, data)
+                    self.assertEqual(status_code, 200)
+                    self.assertIn(b'"working_hours_status"', content)
+                else:
+                    self.assertEqual(await self.fetch(self.ASYNC_URLS, method, url, data), expected)
+
+    async def test_filter_options_not_modified(self):
+        _, _, etag = await self.fetch(self.ASYNC_URLS, 'get', '/api/filter-options/')
+        with override_settings(ROOT_URLCONF=self.ASYNC_URLS):
+            response = await self.async_client.get('/api/filter-options/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 1, 3, 16, 45)
+
+
+class ListRowSerializationTests(TestCase):
+    def setUp(self):
+        cafe = Category.objects.language('en').create(name='Cafe')
+        cafe.set_current_language('tr')
+        cafe.name = 'Kafe'
+        cafe.save()
+        untranslated = Category.objects.language('ru').create(name='Музей')
+        with self.captureOnCommitCallbacks(execute=True):
+            first = create_place(cafe, 'Kahve', main_image='https://example.com/kahve.jpg',
+                                 latitude=Decimal('35.335'), longitude=Decimal('33.3175'))
+            first.set_current_language('tr')
+            first.name = 'Kahveci'
+            first.description = 'Liman kenarı'
+            first.save()
+            second = create_place(untranslated, 'Kale', latitude=Decimal('35.1'))
+            second.set_current_language('ru')
+            second.name = 'Замок'
+            second.save()
+            create_place(cafe, 'Deniz', description='Sea view')
+            OpeningHour.objects.create(place=first, day_of_week=2, open_time=time(9), close_time=time(17))
+            OpeningHour.objects.create(place=second, day_of_week=4, open_time=time(10), close_time=time(12))
+        self.place_ids = [first.pk, second.pk]
+
+    def render(self, language, fields=None):
+        # The list payload from PlaceListing rows and from the model serializer it replaced.
+        rows = PlaceListing.objects.filter(language_code=language).order_by('place_id').values(
+            *PlaceListSerializer.row_fields
+        )
+        places = Place.objects.language(language).order_by('pk').prefetch_related(
+            'translations', 'category__translations', 'open_times'
+        )
+        context = {} if fields is None else {'fields': fields}
+        with translation.override(language), mock.patch('api.serializers.datetime', FrozenDatetime), \
+                mock.patch('api.models.datetime', FrozenDatetime):
+            from_rows = JSONRenderer().render(PlaceListSerializer.serialize_rows(list(rows), fields))
+            from_models = JSONRenderer().render(PlaceListSerializer(places, many=True, context=context).data)
+        return from_rows, from_models
+
+    def test_rows_match_model_serializer(self):
+        for language in ('en', 'tr', 'ru'):
+            with self.subTest(language=language):
+                from_rows, from_models = self.render(language)
+                self.assertIn(b'"working_hours_status"', from_rows)
+                self.assertEqual(from_rows, from_models)
+
+    def test_sparse_rows_match_model_serializer(self):
+        for fields in (['id', 'name'], ['latitude', 'category_name', 'working_hours_status']):
+            with self.subTest(fields=fields):
+                from_rows, from_models = self.render('tr', fields)
+                self.assertEqual(from_rows, from_models)
+
+
+class BulkPlacesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.language('en').create(name='Cafe')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.places = [create_place(category, f'Place {index}', is_active=index != 3) for index in range(12)]
+            for place in self.places:
+                place.set_current_language('tr')
+                place.name = f'{place.name} tr'
+                place.save()
+                place.images.create(image_url=f'https://example.com/{place.pk}.jpg', order=0)
+                OpeningHour.objects.create(place=place, day_of_week=0, open_time=time(9), close_time=time(17))
+
+    def get(self, ids):
+        return self.client.get('/api/places/bulk/', {'ids': ','.join(map(str, ids)), 'device_id': 'device-1'},
+                               HTTP_ACCEPT_LANGUAGE='tr')
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        for size in (1, 5, 12):
+            cache.clear()
+            ids = [place.pk for place in self.places[:size]]
+            with self.subTest(size=size), self.assertNumQueries(8):
+                response = self.get(ids)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), size if size < 4 else size - 1)
+
+    def test_request_order_and_unknown_ids(self):
+        ids = [self.places[5].pk, 10_000, self.places[3].pk, self.places[0].pk, self.places[5].pk]
+        payload = self.get(ids).json()
+        self.assertEqual([item['id'] for item in payload], [self.places[5].pk, self.places[0].pk])
+        self.assertEqual(payload[0]['name'], 'Place 5 tr')
+        # The bulk payloads are cached for the single-place endpoint too.
+        detail = self.client.get(f'/api/places/{self.places[5].pk}/', HTTP_ACCEPT_LANGUAGE='tr').json()
+        self.assertEqual(detail['name'], 'Place 5 tr')
+
+    def test_invalid_ids_are_rejected(self):
+        self.assertEqual(self.get(range(1, 51)).status_code, 200)
+        for ids in (range(1, 52), ['1', 'x'], []):
+            with self.subTest(ids=ids):
+                response = self.get(ids)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ids', response.json())
+
+
+class PlaceLikeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.language('en').create(name='Cafe')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.places = [create_place(category, f'Place {index}') for index in range(3)]
+
+    def like(self, place, device_id):
+        response = self.client.post(f'/api/places/{place.pk}/like/', {'device_id': device_id},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def like_count(self, place):
+        return Place.objects.values_list('like_count', flat=True).get(pk=place.pk)
+
+    def test_like_toggles(self):
+        place = self.places[0]
+        self.assertEqual(self.like(place, 'device-1'), {'success': True, 'is_liked': True, 'like_count': 1})
+        self.assertEqual(self.like(place, 'device-2')['like_count'], 2)
+        self.assertEqual(self.like(place, 'device-1'), {'success': True, 'is_liked': False, 'like_count': 1})
+        self.assertEqual(list(PlaceLike.objects.values_list('device_id', flat=True)), ['device-2'])
+
+    def test_like_count_is_updated_in_the_database(self):
+        # An F() update, not a save() of a possibly stale instance.
+        place = self.places[0]
+        Place.objects.filter(pk=place.pk).update(like_count=5)
+        self.assertEqual(self.like(place, 'device-1')['like_count'], 6)
+        self.assertEqual(self.like(place, 'device-1')['like_count'], 5)
+
+    def test_missing_device_id_is_rejected(self):
+        response = self.client.post(f'/api/places/{self.places[0].pk}/like/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.like_count(self.places[0]), 0)
+
+    def test_user_interaction_is_looked_up_once_per_page(self):
+        self.like(self.places[0], 'device-1')
+        self.like(self.places[2], 'device-1')
+        self.like(self.places[1], 'device-2')
+        ids = ','.join(str(place.pk) for place in self.places)
+        params = {'ids': ids, 'fields': 'id,user_interaction', 'device_id': 'device-1'}
+        with self.assertNumQueries(2):
+            payload = self.client.get('/api/places/bulk/', params).json()
+        self.assertEqual([item['user_interaction']['is_liked'] for item in payload], [True, False, True])
+        params.pop('device_id')
+        payload = self.client.get('/api/places/bulk/', params).json()
+        self.assertEqual([item['user_interaction']['is_liked'] for item in payload], [False, False, False])
+
+    def test_admin_deletion_keeps_like_count(self):
+        for device_id in ('device-1', 'device-2'):
+            self.like(self.places[0], device_id)
+        self.like(self.places[1], 'device-1')
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+        self.assertEqual(self.client.get('/admin/api/placelike/add/').status_code, 403)
+        like = PlaceLike.objects.get(place=self.places[0], device_id='device-1')
+        self.client.post(f'/admin/api/placelike/{like.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(self.like_count(self.places[0]), 1)
+
+        self.client.post('/admin/api/placelike/', {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': list(PlaceLike.objects.values_list('pk', flat=True)),
+        })
+        self.assertFalse(PlaceLike.objects.exists())
+        self.assertEqual([self.like_count(place) for place in self.places], [0, 0, 0])
+
+
+class PlaceLikeMigrationTests(TransactionTestCase):
+    migrate_from = [('api', '0004_place_attribute_mask')]
+    migrate_to = [('api', '0005_placelike')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_liked_by_devices_are_copied_to_likes(self):
+        old_apps = self.migrate(self.migrate_from)
+        Category = old_apps.get_model('api', 'Category')
+        Place = old_apps.get_model('api', 'Place')
+        category = Category.objects.create()
+        liked = Place.objects.create(category=category, liked_by_devices=['device-1', 'device-2', 'device-1', ''])
+        unliked = Place.objects.create(category=category, liked_by_devices=[])
+
+        new_apps = self.migrate(self.migrate_to)
+        PlaceLike = new_apps.get_model('api', 'PlaceLike')
+        Place = new_apps.get_model('api', 'Place')
+        self.assertEqual(
+            set(PlaceLike.objects.values_list('place_id', 'device_id')), {(liked.pk, 'device-1'), (liked.pk, 'device-2')}
+        )
+        self.assertEqual(dict(Place.objects.values_list('pk', 'like_count')), {liked.pk: 2, unliked.pk: 0})
+
+
+class FilterOptionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.definition = ExpectationDefinition.objects.language('en').create(key='kardPay', name='Card payment')
+        self.definition.set_current_language('tr')
+        self.definition.name = 'Kartla ödeme'
+        self.definition.save()
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/filter-options/', HTTP_ACCEPT_LANGUAGE='en', **headers)
+
+    def test_not_modified_round_trip(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['expectations'][0]['name'], {'en': 'Card payment', 'tr': 'Kartla ödeme'})
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get(etag='"other", ' + etag).status_code, 304)
+        self.assertEqual(self.get(etag='"other"').status_code, 200)
+
+    def test_etag_changes_after_definition_edit(self):
+        etag = self.get()['ETag']
+        self.definition.set_current_language('en')
+        self.definition.name = 'Card'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.definition.save()
+
+        response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['expectations'][0]['name']['en'], 'Card')
+        self.assertEqual(self.get(etag=response['ETag']).status_code, 304)
+
+
+class PlaceDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.language('en').create(name='Cafe')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place = create_place(self.category, 'Kahve', kard_pay=True)
+        self.url = f'/api/places/{self.place.pk}/'
+
+    def test_volatile_only_sparse_view_does_not_replace_full_view(self):
+        sparse = self.client.get(self.url, {'fields': 'user_interaction', 'languages': 'en'})
+        self.assertEqual(list(sparse.json()), ['user_interaction'])
+
+        full = self.client.get(self.url, {'languages': 'en'}).json()
+        self.assertEqual(full['name'], 'Kahve')
+        self.assertIn('all_translations', full)
+        self.assertIn('working_hours_status', full)
+
+    def get(self, language='en', **params):
+        response = self.client.get(self.url, params, HTTP_ACCEPT_LANGUAGE=language)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_payload_is_cached_until_place_is_saved(self):
+        self.assertIsNone(self.get()['address'])
+        # A queryset update sends no signals, so the cached payload stays.
+        Place.objects.filter(pk=self.place.pk).update(address='Stale street')
+        self.assertIsNone(self.get()['address'])
+
+        # The version is bumped when the save commits, not before.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place.address = 'Harbour street'
+            self.place.save()
+            self.assertIsNone(self.get()['address'])
+        self.assertEqual(self.get()['address'], 'Harbour street')
+
+    def test_translation_save_invalidates(self):
+        self.assertEqual(self.get()['name'], 'Kahve')
+        translation = self.place.translations.get(language_code='en')
+        translation.name = 'Kahve Evi'
+        with self.captureOnCommitCallbacks(execute=True):
+            translation.save()
+        self.assertEqual(self.get()['name'], 'Kahve Evi')
+
+    def test_opening_hour_save_invalidates(self):
+        self.assertEqual(self.get()['open_times'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            opening_hour = OpeningHour.objects.create(place=self.place, day_of_week=0, open_time=time(9),
+                                                      close_time=time(17))
+        self.assertEqual(self.get()['open_times'], [{'day': 'Monday', 'open': '09:00', 'close': '17:00'}])
+        with self.captureOnCommitCallbacks(execute=True):
+            opening_hour.delete()
+        self.assertEqual(self.get()['open_times'], [])
+
+    def test_category_rename_invalidates(self):
+        self.assertEqual(self.get()['type'], 'Cafe')
+        self.category.set_current_language('en')
+        self.category.name = 'Coffee shop'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(self.get()['type'], 'Coffee shop')
+
+    def test_language_and_field_variants(self):
+        self.place.set_current_language('tr')
+        self.place.name = 'Kahveci'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place.save()
+
+        self.assertEqual(self.get('tr')['name'], 'Kahveci')
+        self.assertEqual(self.get('en')['name'], 'Kahve')
+        self.assertEqual(set(self.get(languages='en')['all_translations']), {'en'})
+        self.assertEqual(set(self.get(languages='all')['all_translations']), {'en', 'tr'})
+        self.assertEqual(self.get(fields='name,address'), {'name': 'Kahve', 'address': None})
+        self.assertEqual(self.get(omit='all_translations')['name'], 'Kahve')
+        self.assertNotIn('all_translations', self.get(omit='all_translations'))
+        # The sparse and language variants leave the default payload alone.
+        full = self.get()
+        self.assertEqual(full['name'], 'Kahve')
+        self.assertIn('open_times', full)
+
+
+class AttributeIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.language('en').create(name='Beach')
+        self.other_category = Category.objects.language('en').create(name='Museum')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.places = [create_place(self.category, f'Place {index}', beach=index % 2 == 0) for index in range(4)]
+        self.index = AttributeIndex()
+        self.beach = ATTRIBUTE_BITS['beach'] | ATTRIBUTE_BITS['is_active']
+
+    def change(self, place, **fields):
+        for name, value in fields.items():
+            setattr(place, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            place.save()
+
+    def test_saved_place_is_patched_without_reload(self):
+        self.assertEqual(self.index.count(self.beach), 2)
+        with mock.patch.object(self.index, '_load', wraps=self.index._load) as load:
+            self.change(self.places[1], beach=True, category=self.other_category)
+            self.assertEqual(self.index.count(self.beach), 3)
+            self.assertEqual(self.index.matching_pks(self.beach, [self.other_category.pk]), [self.places[1].pk])
+            self.assertEqual(self.index.count(0, [self.category.pk]), 3)
+        load.assert_not_called()
+
+    def test_new_place_is_appended(self):
+        self.index.count()
+        with mock.patch.object(self.index, '_load', wraps=self.index._load) as load:
+            with self.captureOnCommitCallbacks(execute=True):
+                place = create_place(self.category, 'New', beach=True)
+            self.assertIn(place.pk, self.index.matching_pks(self.beach))
+        load.assert_not_called()
+
+    def test_deleted_place_reloads(self):
+        self.index.count()
+        place = self.places[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            place.delete()
+        self.assertEqual(self.index.count(self.beach), 1)
+        self.assertEqual(self.index.count(), 3)
+
+    def test_missing_change_record_reloads(self):
+        self.index.count()
+        self.change(self.places[1], beach=True)
+        versions = range(self.index._version + 1, self.index._version + 10)
+        cache.delete_many([self.index._change_key(version) for version in versions])
+        with mock.patch.object(self.index, '_load', wraps=self.index._load) as load:
+            self.assertEqual(self.index.count(self.beach), 3)
+        load.assert_called_once()
+
+    def test_module_index_follows_saves(self):
+        self.assertEqual(attribute_index.count(self.beach), 2)
+        self.change(self.places[2], is_active=False)
+        self.assertEqual(attribute_index.count(self.beach), 1)
+
+
+class WheelSpinTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cafe = Category.objects.language('en').create(name='Cafe')
+        museum = Category.objects.language('en').create(name='Museum')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.places = [
+                create_place(self.cafe, 'Card cafe', kard_pay=True, kyrenia=True),
+                create_place(self.cafe, 'Cash cafe', kard_pay=False, kyrenia=True),
+                create_place(museum, 'Card museum', kard_pay=True, kyrenia=True),
+                create_place(self.cafe, 'Closed cafe', kard_pay=True, kyrenia=True, is_active=False),
+                create_place(self.cafe, 'Nicosia cafe', kard_pay=True, nicosia=True),
+            ]
+            place = self.places[0]
+            place.set_current_language('tr')
+            place.name = 'Kartlı kafe'
+            place.save()
+
+    def spin(self, **data):
+        return self.client.post('/api/wheel-spin/', data, content_type='application/json', HTTP_ACCEPT_LANGUAGE='tr')
+
+    def test_spin_samples_the_matching_pool(self):
+        cases = [
+            ({}, [0, 1, 2, 4]),
+            ({'expectation_keys': ['kardPay']}, [0, 2, 4]),
+            ({'expectation_keys': ['kardPay'], 'category_ids': [self.cafe.pk]}, [0, 4]),
+            ({'expectation_keys': ['kardPay'], 'region_keys': ['kyrenia'], 'category_ids': [self.cafe.pk]}, [0]),
+        ]
+        for data, expected in cases:
+            with self.subTest(data=data), mock.patch('api.attributes.random.choice', side_effect=max) as choice:
+                response = self.spin(**data)
+                pool = choice.call_args.args[0]
+                self.assertEqual(sorted(pool), [self.places[index].pk for index in expected])
+                self.assertEqual(response.json()['id'], max(pool))
+
+    def test_spin_is_in_the_active_language(self):
+        with mock.patch('api.attributes.random.choice', side_effect=min):
+            self.assertEqual(self.spin(category_ids=[self.cafe.pk]).json()['name'], 'Kartlı kafe')
+        # The payload is cached for the single-place endpoint too.
+        detail = self.client.get(f'/api/places/{self.places[0].pk}/', HTTP_ACCEPT_LANGUAGE='tr').json()
+        self.assertEqual(detail['name'], 'Kartlı kafe')
+
+    def test_queries_do_not_depend_on_the_pool_size(self):
+        # Both pools pick the same place, so both requests hit its cached payload.
+        with mock.patch('api.attributes.random.choice', side_effect=max):
+            self.spin()
+            counts = []
+            for data in ({}, {'region_keys': ['nicosia']}):
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.spin(**data).json()['id'], self.places[4].pk)
+                counts.append(len(queries))
+                sql = ' '.join(query['sql'] for query in queries.captured_queries).upper()
+                self.assertNotIn('COUNT(', sql)
+                self.assertNotIn('OFFSET', sql)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_no_match_is_not_found(self):
+        response = self.spin(expectation_keys=['kardPay'], category_ids=[self.cafe.pk], region_keys=['karpaz'])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.spin(category_ids=['x']).status_code, 400)
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATES={'default': 0.0, 'place-list': 1.0, 'filter-options': 0.1})
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.language('en').create(name='Cafe')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_place(category, 'Kahve')
+
+    def test_sampled_request_gets_header_and_log_line(self):
+        with self.assertLogs('api.performance', 'INFO') as logs:
+            response = self.client.get('/api/places/', HTTP_ACCEPT_LANGUAGE='en')
+        metrics = re.findall(r'(?:^|, )(\w+);', response['Server-Timing'])
+        self.assertEqual(metrics, ['db', 'serializer', 'view', 'cache', 'total'])
+
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['url_name'], line['status']), ('place-list', 200))
+        self.assertIn(f'desc="{line["db_queries"]} queries"', response['Server-Timing'])
+        self.assertGreater(line['db_queries'], 0)
+
+    def test_requests_are_sampled_per_url_name(self):
+        with self.assertNoLogs('api.performance', 'INFO'):
+            response = self.client.get('/api/categories/')
+        self.assertNotIn('Server-Timing', response)
+
+        for draw, sampled in ((0.05, True), (0.5, False)):
+            with self.subTest(draw=draw), mock.patch('api.middleware.random.random', return_value=draw):
+                response = self.client.get('/api/filter-options/')
+                self.assertEqual('Server-Timing' in response, sampled)
+
+    async def test_async_chain_records_queries(self):
+        with self.assertLogs('api.performance', 'INFO') as logs:
+            response = await self.async_client.get('/api/places/', headers={'accept-language': 'en'})
+        self.assertIn('Server-Timing', response)
+        self.assertGreater(json.loads(logs.records[0].getMessage())['db_queries'], 0)
+
+
+class BenchmarkSeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed_definitions(['en', 'tr'])
+        self.categories = seed_catalog(40, languages=['en', 'tr'], category_count=3, images_per_place=2,
+                                       with_opening_hours=True)
+
+    def test_seeded_catalog_matches_what_saves_maintain(self):
+        places = list(Place.objects.all())
+        self.assertEqual(len(places), 40)
+        for place in places:
+            self.assertEqual(place.attribute_mask, compute_attribute_mask(place))
+            self.assertEqual(place.geo_cell, geo_cell_for(place.latitude, place.longitude))
+        self.assertEqual(PlaceListing.objects.count(), 40 * len(settings.LANGUAGES))
+        self.assertEqual(OpeningHour.objects.count(), 40 * 7)
+
+        response = self.client.get('/api/places/', {'expectations': 'kardPay', 'page_size': 100},
+                                   HTTP_ACCEPT_LANGUAGE='tr')
+        expected = sorted(place.pk for place in places if place.is_active and place.kard_pay)
+        self.assertEqual(sorted(item['id'] for item in response.json()['results']), expected)
+        self.assertEqual(self.client.get(f'/api/places/{places[0].pk}/').status_code, 200)
+        labels = self.client.get('/api/filter-options/').json()['expectations']
+        self.assertEqual(len(labels), len(EXPECTATION_KEY_FIELDS) + 1)
+        self.assertEqual(labels[0]['name']['tr'], f"{labels[0]['key']} (tr)")
+
+    def test_measure_reports_percentiles_and_queries(self):
+        summary = measure(lambda: self.client.get('/api/places/'), 5)
+        self.assertEqual(summary['iterations'], 5)
+        self.assertLessEqual(summary['p50_ms'], summary['p95_ms'])
+        self.assertLessEqual(summary['p99_ms'], summary['max_ms'])
+        self.assertGreater(summary['queries_max'], 0)
+
+
+class WorkingHoursStatusTests(TestCase):
+    # 2024-01-01 is a Monday.
+    MONDAY = datetime(2024, 1, 1)
+
+    def status(self, hours, day, hour, minute=0):
+        now = self.MONDAY.replace(day=1 + day, hour=hour, minute=minute)
+        with translation.override('en'):
+            return working_hours_status(WeeklySchedule.from_hours(hours), now)
+
+    def test_overnight_interval_is_open_after_midnight(self):
+        hours = [(4, time(18), time(2))]  # Friday 18:00-02:00
+        status = self.status(hours, 5, 1, 30)
+        self.assertEqual((status['is_open_now'], status['status_text'], status['next_change_time']),
+                         (True, 'Open', '02:00'))
+        status = self.status(hours, 5, 2)
+        self.assertEqual((status['is_open_now'], status['status_text']), (False, 'Opens Friday at 18:00'))
+        status = self.status(hours, 4, 12)
+        self.assertEqual((status['is_open_now'], status['status_text']), (False, 'Opens at 18:00'))
+
+    def test_sunday_night_wraps_into_monday(self):
+        schedule = WeeklySchedule.from_hours([(6, time(22), time(3))])  # Sunday 22:00-03:00
+        self.assertEqual(schedule.status_at(6 * MINUTES_PER_DAY + 23 * 60), (True, 3 * 60))
+        self.assertEqual(schedule.status_at(60), (True, 3 * 60))
+        self.assertEqual(schedule.status_at(3 * 60), (False, 6 * MINUTES_PER_DAY + 22 * 60))
+
+        status = self.status([(6, time(22), time(3))], 0, 1)
+        self.assertEqual((status['is_open_now'], status['next_change_time']), (True, '03:00'))
+
+    def test_wrapped_interval_merges_with_monday_hours(self):
+        schedule = WeeklySchedule.from_hours([(6, time(22), time(3)), (0, time(3), time(10))])
+        self.assertEqual(schedule.status_at(6 * MINUTES_PER_DAY + 23 * 60), (True, 10 * 60))
+
+    def test_opens_next_week_on_the_same_day(self):
+        status = self.status([(2, time(9), time(18))], 2, 20)
+        self.assertEqual(status['status_text'], 'Opens Wednesday at 09:00')
+
+    def test_no_hours_is_closed_for_good(self):
+        status = self.status([], 3, 12)
+        self.assertEqual((status['is_open_now'], status['status_text'], status['next_change_time']),
+                         (False, 'Closed', None))
+
+    @skipUnless(
+        all((settings.BASE_DIR / 'locale' / code / 'LC_MESSAGES' / 'django.mo').exists() for code in ('ru', 'tr')),
+        'the message catalogs are not compiled (manage.py compilemessages)',
+    )
+    def test_status_texts_are_translated(self):
+        schedule = WeeklySchedule.from_hours([(2, time(9), time(18))])
+        with translation.override('ru'):
+            status = working_hours_status(schedule, self.MONDAY.replace(hour=12))
+        self.assertEqual(status['status_text'], 'Откроется: Среда, 09:00')
+        with translation.override('tr'):
+            status = working_hours_status(schedule, self.MONDAY.replace(day=3, hour=20))
+        self.assertEqual(status['status_text'], 'Açılış: Çarşamba 09:00')
+
+
+class IncrementalTranslationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.language('en').create(name='Cafe')
+        self.places = [create_place(category, name) for name in ('Kahve', 'Deniz', 'Kale')]
+
+    def translate(self, *args, **options):
+        out = StringIO()
+        call_command('auto_translate_content', *args, models=['place'], languages=['tr', 'ru'], backend='stub',
+                     rate=1000, stdout=out, **options)
+        return out.getvalue()
+
+    def stale(self, **options):
+        return dict(stale_translations(Place, ['name', 'description'], 'en', ['tr', 'ru'], **options))
+
+    def name(self, place, language_code):
+        return Place._parler_meta.root_model.objects.get(master=place, language_code=language_code).name
+
+    def test_second_run_translates_nothing(self):
+        self.assertEqual(self.stale(), {place.pk: {('name', 'tr'), ('name', 'ru')} for place in self.places})
+        self.assertIn('Translation rows written: 6', self.translate())
+        self.assertEqual(self.name(self.places[0], 'tr'), '[tr] Kahve')
+
+        self.assertEqual(self.stale(), {})
+        self.assertIn('API Calls: 0, Translation rows written: 0', self.translate())
+
+    def test_changed_source_text_is_stale(self):
+        self.translate()
+        place = self.places[1]
+        place.set_current_language('en')
+        place.name = 'Deniz Evi'
+        place.save()
+
+        self.assertEqual(self.stale(), {place.pk: {('name', 'tr'), ('name', 'ru')}})
+        self.translate()
+        self.assertEqual(self.name(place, 'ru'), '[ru] Deniz Evi')
+        self.assertEqual(self.stale(), {})
+
+    def test_manual_translation_is_kept(self):
+        place = self.places[0]
+        place.set_current_language('tr')
+        place.name = 'Kahveci'
+        place.save()
+
+        self.assertEqual(self.stale()[place.pk], {('name', 'ru')})
+        self.translate()
+        self.assertEqual(self.name(place, 'tr'), 'Kahveci')
+        self.assertEqual(self.stale(force_update=True)[place.pk], {('name', 'tr'), ('name', 'ru')})
+
+    def test_interrupted_run_resumes_after_checkpoint(self):
+        signature = checkpoint_signature(model='place', source='en', targets=['ru', 'tr'], force=False, pks=[])
+        save_checkpoint(signature, Place, self.places[0].pk)
+        self.translate()
+        translations = Place._parler_meta.root_model.objects
+        self.assertFalse(translations.filter(master=self.places[0], language_code='tr').exists())
+        self.assertEqual(self.name(self.places[2], 'tr'), '[tr] Kale')
+
+        # The checkpoint is cleared once a run completes, so the next one starts over.
+        self.assertEqual(set(self.stale()), {self.places[0].pk})
+        self.translate()
+        self.assertEqual(self.stale(), {})
+
+    def test_writer_flushes_in_batches_and_bumps_versions_on_commit(self):
+        writer = TranslationWriter(Place, batch_size=2)
+        for place in self.places:
+            writer.add(place.pk, 'tr', 'name', f'{place.pk} tr', source_text=str(place.pk))
+        translations = Place._parler_meta.root_model.objects
+        self.assertFalse(translations.filter(language_code='tr').exists())
+
+        key = place_version_key(self.places[0].pk)
+        version = get_version(key)
+        with self.captureOnCommitCallbacks(execute=True):
+            # Two batches: each reads the affected rows, creates them and
+            # upserts their fingerprints (plus a savepoint and its release).
+            with self.assertNumQueries(10):
+                self.assertEqual(writer.flush(), 3)
+            self.assertEqual(get_version(key), version)
+        self.assertNotEqual(get_version(key), version)
+        self.assertEqual(writer.rows_written, 3)
+        self.assertEqual(self.name(self.places[2], 'tr'), f'{self.places[2].pk} tr')
+
+    def test_failed_checkpoint_rolls_back_its_chunk(self):
+        with mock.patch('api.management.commands.auto_translate_content.save_checkpoint',
+                        side_effect=RuntimeError('checkpoint failed')):
+            with self.assertRaises(RuntimeError):
+                self.translate()
+        self.assertFalse(Place._parler_meta.root_model.objects.exclude(language_code='en').exists())
+
+
+class FailingBackend(StubBackend):
+    name = 'failing'
+
+    def translate_many(self, texts, source_language, target_language):
+        super().translate_many(texts, source_language, target_language)
+        raise RuntimeError('provider down')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FlakyBackend(StubBackend):
+    name = 'flaky'
+    max_batch_size = 2
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def translate_many(self, texts, source_language, target_language):
+        with self._lock:
+            self.failures -= 1
+            failing = self.failures >= 0
+        if failing:
+            raise RuntimeError('rate limited')
+        return super().translate_many(texts, source_language, target_language)
+
+
+class TranslationEngineTests(TestCase):
+    def test_token_bucket_allows_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+        for _ in range(4):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [0.5] * 4)
+        self.assertEqual(clock.now, 2.0)
+
+        clock.now += 10
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(len(clock.sleeps), 4)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_failed_requests_are_retried_with_bounded_backoff(self):
+        clock = FakeClock()
+        backend = FlakyBackend(failures=3)
+        engine = TranslationEngine(backend, workers=1, rate=1000, burst=10, max_retries=3, backoff_base=1.0,
+                                   backoff_max=3.0, sleep=clock.sleep)
+        # Full jitter draws from [0, min(backoff_max, base * 2 ** attempt)]; take the upper bound.
+        engine._random = mock.Mock(uniform=lambda low, high: high)
+        jobs = engine.run([TranslationJob(None, 'name', 'en', 'tr', 'Castle')])
+        self.assertEqual((jobs[0].result, jobs[0].attempts), ('[tr] Castle', 4))
+        self.assertEqual(engine.requests, 4)
+        self.assertEqual(clock.sleeps, [1.0, 2.0, 3.0])
+
+        engine = TranslationEngine(FlakyBackend(failures=5), rate=1000, burst=10, max_retries=2, sleep=clock.sleep)
+        jobs = engine.run([TranslationJob(None, 'name', 'en', 'tr', 'Castle')])
+        self.assertEqual((jobs[0].result, str(jobs[0].error), jobs[0].attempts), (None, 'rate limited', 3))
+
+    def test_jobs_are_batched_per_language_pair_in_input_order(self):
+        backend = FlakyBackend(failures=0)
+        texts = ['Sea', 'Castle', 'Harbour', 'Museum', 'Park']
+        jobs = [
+            TranslationJob(None, 'name', 'en', target_language, text)
+            for text, target_language in zip(texts, ['tr', 'ru', 'tr', 'tr', 'ru'])
+        ]
+        results = TranslationEngine(backend, rate=1000).run(jobs)
+        self.assertIs(results[0], jobs[0])
+        self.assertEqual([job.result for job in results],
+                         ['[tr] Sea', '[ru] Castle', '[tr] Harbour', '[tr] Museum', '[ru] Park'])
+        # tr: [Sea, Harbour], [Museum]; ru: [Castle, Park].
+        self.assertEqual(backend.requests, 3)
+
+
+class TranslationBackendTests(TestCase):
+    def test_backend_selection(self):
+        with override_settings(TRANSLATION_BACKEND='stub'):
+            backend = get_translation_backend(latency=0.5)
+        self.assertIsInstance(backend, StubBackend)
+        self.assertEqual(backend.latency, 0.5)
+        self.assertIsInstance(get_translation_backend('mymemory'), MyMemoryBackend)
+        self.assertIsInstance(get_translation_backend('api.translation_backends.StubBackend'), StubBackend)
+        with self.assertRaisesMessage(ImproperlyConfigured, "Unknown translation backend 'deepl'"):
+            get_translation_backend('deepl')
+        with mock.patch.dict(sys.modules, {'google': None, 'google.cloud': None}), \
+                self.assertRaisesMessage(ImproperlyConfigured, 'requires google-cloud-translate'):
+            get_translation_backend('google')
+
+    def test_command_sends_multi_string_requests(self):
+        category = Category.objects.language('en').create(name='Cafe')
+        for name in ('Kahve', 'Deniz', 'Kale'):
+            create_place(category, name)
+        out = StringIO()
+        call_command('auto_translate_content', models=['place'], languages=['tr', 'ru'], backend='stub', rate=1000,
+                     stdout=out)
+        # One request per target language carries all three names.
+        self.assertIn('API Calls: 2, Translation rows written: 6', out.getvalue())
+        with self.assertRaisesMessage(CommandError, "Unknown translation backend 'deepl'"):
+            call_command('auto_translate_content', models=['place'], backend='deepl', stdout=StringIO())
+
+
+class TranslationMemoryTests(TestCase):
+    def jobs(self, *texts, target_language='tr'):
+        return [TranslationJob(None, 'name', 'en', target_language, text) for text in texts]
+
+    def run_jobs(self, backend, jobs):
+        memory = TranslationMemoryLookup(backend.name)
+        TranslationEngine(backend, rate=1000, max_retries=0).run(memory.resolve(jobs))
+        memory.store()
+        return memory
+
+    def test_duplicates_are_translated_once(self):
+        backend = StubBackend()
+        jobs = self.jobs('Sea view', 'Sea  view ', 'Castle')
+        self.run_jobs(backend, jobs)
+        self.assertEqual([job.result for job in jobs], ['[tr] Sea view', '[tr] Sea view', '[tr] Castle'])
+        self.assertEqual(backend.requests, 1)
+        self.assertEqual(TranslationMemory.objects.count(), 2)
+
+    def test_later_runs_are_served_from_memory(self):
+        self.run_jobs(StubBackend(), self.jobs('Sea view'))
+        backend = StubBackend()
+        jobs = self.jobs('Sea view', 'Sea view', 'Castle')
+        memory = self.run_jobs(backend, jobs)
+        self.assertEqual((memory.hits, memory.misses), (2, 1))
+        self.assertEqual(jobs[0].result, '[tr] Sea view')
+        self.assertEqual(backend.requests, 1)
+
+    def test_memory_is_per_language_pair_and_backend(self):
+        self.run_jobs(StubBackend(), self.jobs('Sea view'))
+        memory = TranslationMemoryLookup(StubBackend.name)
+        self.assertEqual(len(memory.resolve(self.jobs('Sea view', target_language='ru'))), 1)
+        memory = TranslationMemoryLookup('other')
+        self.assertEqual(len(memory.resolve(self.jobs('Sea view'))), 1)
+
+    def test_failures_are_not_remembered(self):
+        backend = FailingBackend()
+        jobs = self.jobs('Sea view', 'Sea view')
+        self.run_jobs(backend, jobs)
+        self.assertEqual([str(job.error) for job in jobs], ['provider down', 'provider down'])
+        self.assertFalse(TranslationMemory.objects.exists())
@@ -0,0 +1,398 @@
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, CharField, Exists, ExpressionWrapper, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast
+from parler.cache import get_translation_cache_key
+
+from api.caching import DEFINITIONS_VERSION_KEY, bump_version, place_version_key
+from api.listings import rebuild_place_listings
+from api.models import Category, Place, TranslationCheckpoint, TranslationFingerprint, TranslationMemory
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `capacity`
+    banked. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class TranslationJob:
+    __slots__ = ('instance', 'field_name', 'source_language', 'target_language', 'source_text', 'result', 'error', 'attempts')
+
+    def __init__(self, instance, field_name, source_language, target_language, source_text):
+        self.instance = instance
+        self.field_name = field_name
+        self.source_language = source_language
+        self.target_language = target_language
+        self.source_text = source_text
+        self.result = None
+        self.error = None
+        self.attempts = 0
+
+
+class TranslationEngine:
+    """
+    Sends translation jobs to a TranslationBackend. Jobs are grouped per
+    (source, target) language pair and split into provider-sized batches,
+    which run on a worker pool. Every request first takes a token from the
+    rate limiter; failed requests are retried with exponential backoff and
+    full jitter. run() returns the jobs in their input order, so callers can
+    apply results deterministically.
+    """
+
+    def __init__(self, backend, workers=4, rate=1.0, burst=1, max_retries=3,
+                 backoff_base=1.0, backoff_max=30.0, sleep=time.sleep):
+        self.backend = backend
+        self.workers = max(workers, 1)
+        self.limiter = TokenBucket(rate, burst, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.requests = 0
+        self._sleep = sleep
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def run(self, jobs):
+        jobs = list(jobs)
+        batches = list(self._batches(jobs))
+        if not batches:
+            return jobs
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as executor:
+            list(executor.map(self._run_batch, batches))
+        return jobs
+
+    def _batches(self, jobs):
+        groups = {}
+        for job in jobs:
+            groups.setdefault((job.source_language, job.target_language), []).append(job)
+        max_size, max_chars = self.backend.max_batch_size, self.backend.max_batch_chars
+        for group in groups.values():
+            batch, chars = [], 0
+            for job in group:
+                if batch and (len(batch) >= max_size or chars + len(job.source_text) > max_chars):
+                    yield batch
+                    batch, chars = [], 0
+                batch.append(job)
+                chars += len(job.source_text)
+            if batch:
+                yield batch
+
+    def _run_batch(self, batch):
+        texts = [job.source_text for job in batch]
+        source_language, target_language = batch[0].source_language, batch[0].target_language
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            with self._lock:
+                self.requests += 1
+            try:
+                results = self.backend.translate_many(texts, source_language, target_language)
+            except Exception as e:
+                error = e
+                if attempt < self.max_retries:
+                    self._sleep(self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                continue
+            for job, result in zip(batch, results):
+                job.result, job.error, job.attempts = result, None, attempt + 1
+            return batch
+        for job in batch:
+            job.error, job.attempts = error, self.max_retries + 1
+        return batch
+
+
+def normalize_source_text(text):
+    return ' '.join(str(text).split())
+
+
+def source_hash(text):
+    return hashlib.sha256(normalize_source_text(text).encode()).hexdigest()
+
+
+def source_fingerprint(text):
+    # Stored in TranslationFingerprint.source_hash; compared in Python by
+    # stale_translations(), so no database hash function is needed.
+    return hashlib.sha256(str(text).encode()).hexdigest()
+
+
+def stale_translations(model, fields, source_language, target_languages, force_update=False,
+                       after_pk=None, pks=None):
+    """
+    Select, in one query, what needs translating: returns a list of (pk,
+    {(field_name, language_code), ...}) pairs in pk order for every object with a
+    non-empty source text whose target translation is missing or empty, or
+    was made from a different source text than the current one. With
+    force_update every translation of a non-empty source is selected.
+
+    Missing translations are found in SQL. For the others the query returns
+    the stored fingerprint next to the source text, and the two are compared
+    here.
+    """
+    translation_model = model._parler_meta.root_model
+    object_id = Cast(OuterRef('master_id'), CharField())
+    queryset = translation_model.objects.filter(language_code=source_language).order_by('master_id')
+    if after_pk is not None:
+        queryset = queryset.filter(master_id__gt=after_pk)
+    if pks:
+        queryset = queryset.filter(master_id__in=pks)
+
+    columns = []
+    annotations = {}
+    candidates = Q()
+    for field_name in fields:
+        has_source = ~Q(**{f'{field_name}__isnull': True}) & ~Q(**{field_name: ''})
+        for language_code in target_languages:
+            missing, fingerprint = f'missing_{field_name}_{language_code}', f'fingerprint_{field_name}_{language_code}'
+            if force_update:
+                condition = has_source
+                annotations[fingerprint] = Value(None, output_field=CharField())
+            else:
+                translated = translation_model.objects.filter(
+                    master_id=OuterRef('master_id'), language_code=language_code,
+                ).exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+                condition = has_source & ~Exists(translated)
+                annotations[fingerprint] = Subquery(TranslationFingerprint.objects.filter(
+                    model=model._meta.label_lower, object_id=object_id,
+                    field_name=field_name, language_code=language_code,
+                ).values('source_hash')[:1])
+                candidates |= has_source & Q(**{f'{fingerprint}__isnull': False})
+            annotations[missing] = ExpressionWrapper(condition, output_field=BooleanField())
+            candidates |= Q(**{missing: True})
+            columns.append((field_name, language_code, missing, fingerprint))
+    queryset = queryset.annotate(**annotations).filter(candidates)
+
+    result = []
+    for row in queryset.values('master_id', *fields, *annotations):
+        digests = {}
+        stale = set()
+        for field_name, language_code, missing, fingerprint in columns:
+            if row[missing]:
+                stale.add((field_name, language_code))
+            elif row[fingerprint] is not None and row[field_name] not in (None, ''):
+                if field_name not in digests:
+                    digests[field_name] = source_fingerprint(row[field_name])
+                if row[fingerprint] != digests[field_name]:
+                    stale.add((field_name, language_code))
+        if stale:
+            result.append((row['master_id'], stale))
+    return result
+
+
+def checkpoint_signature(**options):
+    return hashlib.sha256(repr(sorted(options.items())).encode()).hexdigest()
+
+
+def get_checkpoint(signature, model):
+    return TranslationCheckpoint.objects.filter(
+        signature=signature, model=model._meta.label_lower
+    ).values_list('last_object_id', flat=True).first()
+
+
+def save_checkpoint(signature, model, last_pk):
+    TranslationCheckpoint.objects.update_or_create(
+        signature=signature, model=model._meta.label_lower, defaults={'last_object_id': str(last_pk)},
+    )
+
+
+def clear_checkpoint(signature, model):
+    TranslationCheckpoint.objects.filter(signature=signature, model=model._meta.label_lower).delete()
+
+
+class TranslationMemoryLookup:
+    """
+    Resolves jobs from the TranslationMemory table before they reach the
+    provider, and records provider results afterwards. Also collapses
+    duplicates within a batch, so each distinct (text, source, target) is
+    translated at most once per run.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _key(self, job):
+        return source_hash(job.source_text), job.source_language, job.target_language
+
+    def resolve(self, jobs):
+        """
+        Fill `result` for jobs found in memory; return one representative job
+        per distinct missing key, to be translated by the caller.
+        """
+        keys = {self._key(job) for job in jobs}
+        stored = {}
+        if keys:
+            entries = TranslationMemory.objects.filter(
+                backend=self.backend, source_hash__in={key[0] for key in keys}
+            ).values_list('source_hash', 'source_language', 'target_language', 'translated_text')
+            stored = {(h, src, tgt): text for h, src, tgt, text in entries if (h, src, tgt) in keys}
+
+        self._pending = {}
+        for job in jobs:
+            key = self._key(job)
+            if key in stored:
+                job.result = stored[key]
+                self.hits += 1
+            else:
+                self._pending.setdefault(key, []).append(job)
+                self.misses += 1
+        return [group[0] for group in self._pending.values()]
+
+    def store(self):
+        """
+        Copy provider results to the duplicates of each translated job and
+        persist the successful ones.
+        """
+        entries = []
+        for (h, src, tgt), group in self._pending.items():
+            first = group[0]
+            for job in group[1:]:
+                job.result, job.error = first.result, first.error
+            if first.error is None and first.result:
+                entries.append(TranslationMemory(
+                    source_hash=h, source_language=src, target_language=tgt, backend=self.backend,
+                    source_text=first.source_text, translated_text=first.result,
+                ))
+        TranslationMemory.objects.bulk_create(entries, ignore_conflicts=True)
+        self._pending = {}
+
+
+class TranslationWriter:
+    """
+    Buffers translated field values for one parler model until flush(),
+    which writes them to its translation table in batches of `batch_size`
+    rows. Each batch is one atomic block (a savepoint when flush() is called
+    inside a transaction, as the checkpointing command does): a SELECT of the
+    affected rows, one bulk_update and one bulk_create.
+
+    Fingerprints of the source texts are written in the same block.
+
+    Bulk writes bypass post_save, so the invalidation done by api.signals
+    (parler's translation cache, place versions, definition versions,
+    place listings) is repeated here once per batch; like there, the
+    versions are bumped on commit.
+    """
+
+    def __init__(self, model, batch_size=500):
+        self.model = model
+        self.translation_model = model._parler_meta.root_model
+        self.batch_size = max(batch_size, 1)
+        self.rows_written = 0
+        self._pending = {}
+        self._fingerprints = {}
+
+    def add(self, master_id, language_code, field_name, value, source_text=None):
+        self._pending.setdefault((master_id, language_code), {})[field_name] = value
+        if source_text is not None:
+            self._fingerprints[(master_id, language_code, field_name)] = source_fingerprint(source_text)
+
+    def flush(self):
+        """Write the pending rows; return how many were created or changed."""
+        pending, self._pending = list(self._pending.items()), {}
+        fingerprints, self._fingerprints = self._fingerprints, {}
+        written = 0
+        for start in range(0, len(pending), self.batch_size):
+            batch = dict(pending[start:start + self.batch_size])
+            written += self._write(batch, {
+                key: source_hash for key, source_hash in fingerprints.items() if key[:2] in batch
+            })
+        self.rows_written += written
+        return written
+
+    def _write(self, pending, fingerprints):
+        with transaction.atomic():
+            existing = {
+                (row.master_id, row.language_code): row
+                for row in self.translation_model.objects.select_for_update().filter(
+                    master_id__in={master_id for master_id, _ in pending},
+                    language_code__in={language_code for _, language_code in pending},
+                )
+            }
+            to_update, to_create, updated_fields = [], [], set()
+            for (master_id, language_code), values in pending.items():
+                row = existing.get((master_id, language_code))
+                if row is None:
+                    to_create.append(self.translation_model(
+                        master_id=master_id, language_code=language_code, **values
+                    ))
+                    continue
+                changed = {name: value for name, value in values.items() if getattr(row, name) != value}
+                if changed:
+                    for name, value in changed.items():
+                        setattr(row, name, value)
+                    updated_fields.update(changed)
+                    to_update.append(row)
+
+            if to_update:
+                self.translation_model.objects.bulk_update(to_update, sorted(updated_fields))
+            if to_create:
+                self.translation_model.objects.bulk_create(to_create)
+            TranslationFingerprint.objects.bulk_create(
+                [
+                    TranslationFingerprint(
+                        model=self.model._meta.label_lower, object_id=str(master_id),
+                        field_name=field_name, language_code=language_code, source_hash=source_hash,
+                    )
+                    for (master_id, language_code, field_name), source_hash in fingerprints.items()
+                ],
+                update_conflicts=True, unique_fields=['model', 'object_id', 'language_code', 'field_name'],
+                update_fields=['source_hash', 'updated_at'],
+            )
+            written = to_update + to_create
+            if written:
+                self._invalidate(written)
+        return len(written)
+
+    def _invalidate(self, rows):
+        cache.delete_many([
+            get_translation_cache_key(self.translation_model, row.master_id, row.language_code) for row in rows
+        ])
+        master_ids = sorted({row.master_id for row in rows})
+        if self.model is Place:
+            def bump_place_versions():
+                for place_id in master_ids:
+                    bump_version(place_version_key(place_id))
+
+            transaction.on_commit(bump_place_versions)
+            transaction.on_commit(lambda: rebuild_place_listings(master_ids))
+        else:
+            # Category names and definition labels end up in every place detail payload.
+            transaction.on_commit(lambda: bump_version(DEFINITIONS_VERSION_KEY))
+            if self.model is Category:
+                transaction.on_commit(lambda: rebuild_place_listings(
+                    Place.objects.filter(category_id__in=master_ids).values('pk')
+                ))
@@ -0,0 +1,143 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class TranslationBackend:
+    """
+    A translation provider. translate_many() translates a list of strings
+    from one language to another in a single request and returns the
+    translations in input order; it must raise on failure.
+
+    max_batch_size and max_batch_chars bound what one request may carry
+    (TranslationEngine batches jobs accordingly).
+    """
+    name = None
+    max_batch_size = 1
+    max_batch_chars = 5000
+
+    def translate_many(self, texts, source_language, target_language):
+        raise NotImplementedError
+
+
+class MyMemoryBackend(TranslationBackend):
+    # MyMemory's /get endpoint takes one string (at most 500 bytes) per request.
+    name = 'mymemory'
+    max_batch_size = 1
+    max_batch_chars = 500
+
+    def translate_many(self, texts, source_language, target_language):
+        from api.utils import get_mymemory_translator
+
+        translator = get_mymemory_translator(target_language, source_language)
+        translations = []
+        for text in texts:
+            translation = translator.translate(text)
+            if translation.upper().startswith('MYMEMORY WARNING'):
+                # Quota and rate-limit errors come back as the "translation".
+                raise RuntimeError(translation)
+            translations.append(translation)
+        return translations
+
+
+class GoogleBackend(TranslationBackend):
+    # Cloud Translation v2 accepts up to 128 segments per request. Credentials
+    # come from GOOGLE_APPLICATION_CREDENTIALS as usual.
+    name = 'google'
+    max_batch_size = 128
+    max_batch_chars = 30000
+
+    def __init__(self):
+        try:
+            from google.cloud import translate_v2
+        except ImportError:
+            raise ImproperlyConfigured("The 'google' translation backend requires google-cloud-translate.")
+        self.client = translate_v2.Client()
+
+    def translate_many(self, texts, source_language, target_language):
+        results = self.client.translate(
+            texts, target_language=target_language, source_language=source_language, format_='text'
+        )
+        return [result['translatedText'] for result in results]
+
+
+class LibreTranslateBackend(TranslationBackend):
+    # LibreTranslate takes a list for "q" in a JSON body; libretranslatepy's
+    # translate() form-encodes a single string, so only its URL and key
+    # handling is reused here.
+    name = 'libretranslate'
+    max_batch_size = 50
+    max_batch_chars = 10000
+
+    def __init__(self):
+        try:
+            from libretranslatepy import LibreTranslateAPI
+        except ImportError:
+            raise ImproperlyConfigured("The 'libretranslate' translation backend requires libretranslatepy.")
+        self.client = LibreTranslateAPI(
+            getattr(settings, 'LIBRETRANSLATE_URL', 'https://translate.terraprint.co/'),
+            getattr(settings, 'LIBRETRANSLATE_API_KEY', None),
+        )
+
+    def translate_many(self, texts, source_language, target_language):
+        import requests
+
+        payload = {'q': texts, 'source': source_language, 'target': target_language, 'format': 'text'}
+        if self.client.api_key is not None:
+            payload['api_key'] = self.client.api_key
+        response = requests.post(self.client.url + 'translate', json=payload, timeout=60)
+        response.raise_for_status()
+        translations = response.json()['translatedText']
+        if isinstance(translations, str):
+            translations = [translations]
+        if len(translations) != len(texts):
+            raise RuntimeError(f"LibreTranslate returned {len(translations)} translations for {len(texts)} texts")
+        return translations
+
+
+class StubBackend(TranslationBackend):
+    """
+    Deterministic local backend for tests and benchmarks: sleeps `latency`
+    seconds per request and returns "[tr] text" for every string.
+    """
+    name = 'stub'
+    max_batch_size = 50
+    max_batch_chars = 10000
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def translate_many(self, texts, source_language, target_language):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [f"[{target_language}] {text}" for text in texts]
+
+
+TRANSLATION_BACKENDS = {
+    backend.name: backend
+    for backend in (MyMemoryBackend, GoogleBackend, LibreTranslateBackend, StubBackend)
+}
+
+
+def get_translation_backend(name=None, **kwargs):
+    """
+    Instantiate the backend called `name`, defaulting to the TRANSLATION_BACKEND
+    setting. A dotted path to a TranslationBackend subclass also works.
+    """
+    name = name or getattr(settings, 'TRANSLATION_BACKEND', MyMemoryBackend.name)
+    if name in TRANSLATION_BACKENDS:
+        backend_class = TRANSLATION_BACKENDS[name]
+    elif '.' in name:
+        backend_class = import_string(name)
+    else:
+        raise ImproperlyConfigured(
+            f"Unknown translation backend '{name}'. Choose from: {', '.join(TRANSLATION_BACKENDS)}."
+        )
+    return backend_class(**kwargs)
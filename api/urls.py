@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'languages', views.LanguageViewSet, basename='language')
@@ -8,8 +9,19 @@ router.register(r'categories', views.CategoryViewSet, basename='category')
 router.register(r'places', views.PlaceViewSet, basename='place')
 
 
-urlpatterns = [
+sync_urlpatterns = [
     path('', include(router.urls)),
     path('filter-options/', views.FilterOptionsView.as_view(), name='filter-options'),
     path('wheel-spin/', views.WheelSpinView.as_view(), name='wheel-spin'),
 ]
+
+# Same URLs and names as their sync counterparts, which keep serving
+# everything else (nearby, bulk, like, format suffixes, the browsable API).
+async_urlpatterns = [
+    path('places/', async_views.PlaceListView.as_view(), name='place-list'),
+    path('places/<int:pk>/', async_views.PlaceDetailView.as_view(), name='place-detail'),
+    path('filter-options/', async_views.FilterOptionsView.as_view(), name='filter-options'),
+    path('wheel-spin/', async_views.WheelSpinView.as_view(), name='wheel-spin'),
+]
+
+urlpatterns = (async_urlpatterns if settings.ASYNC_API_VIEWS else []) + sync_urlpatterns
@@ -1,21 +1,37 @@
 from rest_framework import viewsets, generics, status, views
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
-import random
-from django.db import models
+import hashlib
+import json
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from django.db.models import F, Prefetch, Q
 from django.conf import settings 
-from rest_framework import viewsets, filters 
-from django_filters.rest_framework import DjangoFilterBackend 
-from .filters import PlaceFilter
+from django_filters.utils import translate_validation
+from rest_framework.settings import api_settings
+from .filters import PlaceFilter, PlaceFilterBackend, PlaceOrderingFilter, PlaceSearchFilter
+from .pagination import PlaceKeysetPagination
+from .caching import (
+    DEFINITIONS_VERSION_KEY, aget_version, get_place_facets_timeout, get_version, place_facets_cache_key
+)
+from .facets import count_in_database, facets_payload, facets_signature, index_selection
+from .geo import bounding_box, geo_cell_filter, haversine_km
+from .listings import listing_language
+from .instrumentation import record_cache
+from .attributes import (
+    ATTRIBUTE_BITS, EXPECTATION_KEY_FIELDS, REGION_KEY_FIELDS, attribute_index, mask_for_keys
+)
 
 from .models import (
-    Language, Category, Place, ExpectationDefinition, SortTagDefinition
+    Language, Category, Place, PlaceLike, PlaceListing, ExpectationDefinition, SortTagDefinition
 )
 from .serializers import (
-    LanguageSerializer, CategorySerializer, PlaceListSerializer, PlaceDetailSerializer,
+    ALL_LANGUAGES, LanguageSerializer, CategorySerializer, PlaceListSerializer, PlaceDetailSerializer,
     ExpectationDefinitionSerializer, SortTagDefinitionSerializer,
-    WheelSpinRequestSerializer, LikeRequestSerializer
+    WheelSpinRequestSerializer, LikeRequestSerializer, NearbyPlaceSerializer, NearbyRequestSerializer,
+    BulkPlacesRequestSerializer
 )
 from django.utils.translation import get_language, activate, override 
 
@@ -32,26 +48,119 @@ class CategoryViewSet(ParlerViewSetMixin, viewsets.ReadOnlyModelViewSet):
 
 class PlaceViewSet(ParlerViewSetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PlaceDetailSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [PlaceFilterBackend, PlaceSearchFilter, PlaceOrderingFilter]
     filterset_class = PlaceFilter
-    search_fields = ['translations__name', 'translations__description', 'address', 'category__translations__name']
-    ordering_fields = ['translations__name', 'created_at', 'category__translations__name', 'popular']
+    pagination_class = PlaceKeysetPagination
+    ordering_fields = ['translations__name', 'created_at', 'category__translations__name', 'popular', 'closing_soon']
     ordering = ['-created_at']
 
+    # Prefetch -> serializer fields that read it; a prefetch is skipped when
+    # ?fields= / ?omit= leaves none of its fields.
+    field_prefetches = {
+        'translations': ('name', 'description', 'all_translations'),
+        'category__translations': ('category_name', 'type'),
+        'images': ('images',),
+        'open_times': ('working_hours_status', 'open_times'),
+    }
+
     def get_serializer_class(self):
         if self.action == 'list':
             return PlaceListSerializer
-        return PlaceDetailSerializer
+        # retrieve uses the PlaceDetailSerializer default; extra actions set their own.
+        return self.serializer_class
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        context['languages'] = self.get_requested_languages()
+        return context
+
+    def get_requested_languages(self):
+        """
+        Languages of the detail payload's all_translations from ?languages=
+        (comma separated codes, or 'all'); None keeps the default, the active
+        language. Unknown codes are ignored.
+        """
+        value = self.request.query_params.get('languages', '').strip()
+        if value == ALL_LANGUAGES:
+            return ALL_LANGUAGES
+        supported = {code for code, name in settings.LANGUAGES}
+        languages = tuple(dict.fromkeys(code.strip() for code in value.split(',') if code.strip() in supported))
+        return languages or None
+
+    def get_sparse_fields(self):
+        """
+        Field names selected by ?fields= and/or ?omit= (comma separated), in
+        serializer order, or None when neither is given. Unknown names are
+        ignored.
+        """
+        if self.action == 'like':
+            return None
+        params = self.request.query_params
+        if 'fields' not in params and 'omit' not in params:
+            return None
+        split = lambda value: {name.strip() for name in value.split(',') if name.strip()}
+        selected = self.get_serializer_class().Meta.fields
+        if 'fields' in params:
+            requested = split(params['fields'])
+            selected = [name for name in selected if name in requested]
+        omitted = split(params.get('omit', ''))
+        return tuple(name for name in selected if name not in omitted)
+
+    def get_prefetches(self, *prefetches):
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return prefetches
+        return [lookup for lookup in prefetches if set(self.field_prefetches[lookup]) & set(fields)]
 
     def get_queryset(self):
-        queryset = Place.objects.language().filter(is_active=True).prefetch_related(
+        if self.action in ('list', 'facets', 'nearby'):
+            # list and nearby read values() rows of the flat read model, see list().
+            return PlaceListing.objects.filter(language_code=listing_language(), is_active=True)
+        queryset = Place.objects.language().filter(is_active=True)
+        if self.action == 'like':
+            return queryset
+        if self.action == 'retrieve':
+            # Most of the detail payload is served from the response cache; only
+            # the live working-hours status needs related rows on every request.
+            return queryset.prefetch_related(*self.get_prefetches('open_times'))
+        prefetches = self.get_prefetches(
             'translations',
             'category__translations',
             'images',
             'open_times',
         )
+        if self.action == 'bulk':
+            prefetches = [self.get_detail_translations_prefetch() if lookup == 'translations' else lookup
+                          for lookup in prefetches]
+        queryset = queryset.prefetch_related(*prefetches)
         return queryset
 
+    def get_detail_translations_prefetch(self):
+        # Detail payloads only read the active language and its fallback (name,
+        # description) plus the ?languages= ones (all_translations).
+        languages = self.get_requested_languages()
+        if languages == ALL_LANGUAGES:
+            return 'translations'
+        codes = {get_language(), settings.PARLER_DEFAULT_LANGUAGE_CODE, *(languages or ())}
+        return Prefetch('translations', queryset=Place._parler_meta.root_model.objects.filter(language_code__in=codes))
+
+    def list(self, request, *args, **kwargs):
+        # PlaceListing rows instead of model instances: filtering, search and
+        # ordering need no joins, and PlaceListSerializer.serialize_rows builds
+        # the same payload from a handful of columns.
+        fields = self.get_sparse_fields()
+        rows = self.get_list_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(PlaceListSerializer.serialize_rows(page, fields))
+        return Response(PlaceListSerializer.serialize_rows(list(rows), fields))
+
+    def get_list_rows(self, queryset):
+        # The row_fields plus the ordering columns, which the keyset cursor reads.
+        ordering = [term.lstrip('-') for term in queryset.query.order_by if isinstance(term, str)]
+        return queryset.values(*dict.fromkeys([*PlaceListSerializer.row_fields, *ordering]))
+
     def retrieve(self, request, *args, **kwargs):
         current_lang_for_debug = get_language()
         instance = self.get_object()
@@ -62,47 +171,182 @@ class PlaceViewSet(ParlerViewSetMixin, viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], serializer_class=NearbyPlaceSerializer)
+    def nearby(self, request):
+        params = NearbyRequestSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        lat, lng = params.validated_data['lat'], params.validated_data['lng']
+        radius, limit = params.validated_data['radius'], params.validated_data['limit']
+
+        # Grid cells (indexed) and the exact bounding box narrow the candidate
+        # PlaceListing rows; haversine distances then rank them, and
+        # serialize_rows builds the NearbyPlaceSerializer payload from them.
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+        queryset = self.filter_queryset(self.get_queryset())
+        candidates = queryset.filter(
+            geo_cell_filter(lat, lng, radius),
+            latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng),
+        ).order_by().values(*PlaceListSerializer.row_fields)
+
+        rows, distances = {}, {}
+        for row in candidates:
+            distance = haversine_km(lat, lng, float(row['latitude']), float(row['longitude']))
+            if distance <= radius:
+                rows[row['place_id']], distances[row['place_id']] = row, distance
+        nearest = sorted(distances, key=distances.get)[:limit]
+
+        fields = self.get_sparse_fields()
+        results = PlaceListSerializer.serialize_rows([rows[pk] for pk in nearest], fields)
+        if fields is None or 'distance_km' in fields:
+            for item, pk in zip(results, nearest):
+                item['distance_km'] = round(distances[pk], 3)
+        return Response(results)
+
+    @action(detail=False, methods=['get'])
+    def bulk(self, request):
+        # Detail payloads for ?ids= in request order (unknown or inactive ids
+        # are left out). Everything is prefetched up front, so the query count
+        # does not depend on the number of ids.
+        params = BulkPlacesRequestSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        ids = params.validated_data['ids']
+
+        # language() alone means PARLER's default language; the payloads (and
+        # the detail cache entries they fill) are for the active one.
+        queryset = self.get_queryset().language(get_language()).filter(pk__in=ids).select_related('category')
+        places = {place.pk: place for place in queryset}
+        results = [places[pk] for pk in ids if pk in places]
+        return Response(self.get_serializer(results, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        # Counts per category, expectation, sort tag and region of the places
+        # list() returns for the same filters and ?search=, see api.facets.
+        signature = facets_signature(
+            request.query_params, [*self.filterset_class.base_filters, api_settings.SEARCH_PARAM], listing_language()
+        )
+        cache_key = place_facets_cache_key(signature)
+        payload = cache.get(cache_key)
+        record_cache('place_facets', payload is not None)
+        if payload is None:
+            payload = self.count_facets()
+            cache.set(cache_key, payload, get_place_facets_timeout())
+        return Response(payload)
+
+    def count_facets(self):
+        queryset = self.get_queryset()
+        filterset = PlaceFilterBackend().get_filterset(self.request, queryset, self)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        search = PlaceSearchFilter()
+        selection = index_selection(filterset.form.cleaned_data)
+        if selection is not None and not search.get_search_terms(self.request):
+            counts = attribute_index.facet_counts(*selection)
+        else:
+            counts = count_in_database(search.filter_queryset(self.request, filterset.qs, self))
+        return facets_payload(*counts, Category.objects.order_by('pk').values_list('pk', flat=True))
+
     @action(detail=True, methods=['post'], serializer_class=LikeRequestSerializer)
     def like(self, request, pk=None):
         place = self.get_object()
         serializer = LikeRequestSerializer(data=request.data)
         if serializer.is_valid():
             device_id = serializer.validated_data['device_id']
-            is_liked_action = False
-            if device_id in place.liked_by_devices:
-                place.liked_by_devices.remove(device_id)
-            else:
-                place.liked_by_devices.append(device_id)
-                is_liked_action = True
-            place.save(update_fields=['liked_by_devices'])
-            return Response({"success": True, "is_liked": is_liked_action, "like_count": len(place.liked_by_devices)}, status=status.HTTP_200_OK)
+            with transaction.atomic():
+                deleted, _ = PlaceLike.objects.filter(place=place, device_id=device_id).delete()
+                if deleted:
+                    Place.objects.filter(pk=place.pk).update(like_count=F('like_count') - deleted)
+                    is_liked_action = False
+                else:
+                    _, created = PlaceLike.objects.get_or_create(place=place, device_id=device_id)
+                    if created:
+                        Place.objects.filter(pk=place.pk).update(like_count=F('like_count') + 1)
+                    is_liked_action = True
+                like_count = Place.objects.filter(pk=place.pk).values_list('like_count', flat=True).get()
+            return Response({"success": True, "is_liked": is_liked_action, "like_count": like_count}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class BaseParlerAPIView(views.APIView):
     def get_serializer_context(self):
-        context = super().get_serializer_context()
+        # APIView has no get_serializer_context of its own, so build the same
+        # context GenericAPIView would.
+        context = {'request': self.request, 'format': self.format_kwarg, 'view': self}
         # context['lang_code'] = get_language() # Pass current language if needed by serializer explicitly
-        context['request'] = self.request
         return context
 
 
 class FilterOptionsView(BaseParlerAPIView):
+    # language -> (definitions version, payload, etag); the payload only changes
+    # when categories or definitions do, see api.signals.
+    _local_cache = {}
+
     def get(self, request, *args, **kwargs):
+        payload, etag = self.get_cached_payload()
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(payload, headers={'ETag': etag})
+
+    def get_cached_payload(self):
+        language_code = get_language()
+        version = get_version(DEFINITIONS_VERSION_KEY)
+        local = self._local_cache.get(language_code)
+        if local and local[0] == version:
+            record_cache('filter_options', True)
+            return local[1], local[2]
+
+        cache_key = f'api:filter_options:{language_code}:{version}'
+        cached = cache.get(cache_key)
+        record_cache('filter_options', cached is not None)
+        if cached is None:
+            cached = self.with_etag(self.build_payload())
+            cache.set(cache_key, cached, None)
+        self._local_cache[language_code] = (version, *cached)
+        return cached
+
+    async def aget_cached_payload(self):
+        # get_cached_payload() with async cache access, for api.async_views.
+        language_code = get_language()
+        version = await aget_version(DEFINITIONS_VERSION_KEY)
+        local = self._local_cache.get(language_code)
+        if local and local[0] == version:
+            record_cache('filter_options', True)
+            return local[1], local[2]
+
+        cache_key = f'api:filter_options:{language_code}:{version}'
+        cached = await cache.aget(cache_key)
+        record_cache('filter_options', cached is not None)
+        if cached is None:
+            cached = self.with_etag(await sync_to_async(self.build_payload)())
+            await cache.aset(cache_key, cached, None)
+        self._local_cache[language_code] = (version, *cached)
+        return cached
+
+    @staticmethod
+    def with_etag(payload):
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        return payload, quote_etag(digest)
+
+    def build_payload(self):
         context = self.get_serializer_context()
         regions = SortTagDefinition.objects.language().filter(type='region')
         expectations = ExpectationDefinition.objects.language().all()
         sort_tags = SortTagDefinition.objects.language().filter(type__in=['general', 'amenity'])
         place_types = Category.objects.language().all()
 
-        return Response({
+        return {
             "regions": SortTagDefinitionSerializer(regions, many=True, context=context).data,
             "expectations": ExpectationDefinitionSerializer(expectations, many=True, context=context).data,
             "sort_tags": SortTagDefinitionSerializer(sort_tags, many=True, context=context).data,
             "place_types": CategorySerializer(place_types, many=True, context=context).data,
-        })
+        }
 
 class WheelSpinView(BaseParlerAPIView):
+    not_found_payload = {"detail": ("No places found matching your criteria.")}
+
     def post(self, request, *args, **kwargs):
         context = self.get_serializer_context()
         request_serializer = WheelSpinRequestSerializer(data=request.data)
@@ -110,32 +354,17 @@ class WheelSpinView(BaseParlerAPIView):
             return Response(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         data = request_serializer.validated_data
-        queryset = Place.objects.language().filter(is_active=True)
-
-        if data.get('category_ids'):
-            queryset = queryset.filter(category_id__in=data['category_ids'])
-
-        for key in data.get('expectation_keys', []):
-            field_mapping = { "outsideArea": "outside_area", "kardPay": "kard_pay", "coffee": "coffee", "meatAndChicken": "meat_and_chicken",
-                             "insideArea": "inside_area", "reservation": "reservation", "kidsMenu": "kids_menu", "babySit": "baby_sit",
-                            "cash": "cash", "freeParkArea": "free_park_area", "bar": "bar", "dessert": "dessert", "kitchen": "kitchen",
-                            "WheelchairAccessibleEntrance": "wheelchair_accessible_entrance", "petsAllow": "pets_allow", "fish": "fish" }
-            if key in field_mapping: queryset = queryset.filter(**{field_mapping[key]: True})
-            elif hasattr(Place, key) and isinstance(Place._meta.get_field(key), models.BooleanField): queryset = queryset.filter(**{key: True})
-
-
-        for key in data.get('region_keys', []):
-            field_mapping = {"kyrenia": "kyrenia", "nicosia": "nicosia", "famagusta": "famagusta", "iskele": "iskele", "guzelyurt": "guzelyurt",
-                             "karpaz": "karpaz", "lefke": "lefke" }
-            if key in field_mapping: queryset = queryset.filter(**{field_mapping[key]: True})
-            elif hasattr(Place, key) and isinstance(Place._meta.get_field(key), models.BooleanField): queryset = queryset.filter(**{key: True})
-
-
-        if queryset.exists():
-            count = queryset.count()
-            if count > 0:
-                random_index = random.randint(0, count - 1)
-                place = queryset[random_index]
+        place_pk = attribute_index.random_pk(self.get_mask(data), data.get('category_ids'))
+        if place_pk is not None:
+            place = Place.objects.language(get_language()).filter(pk=place_pk, is_active=True).order_by().first()
+            if place:
                 return Response(PlaceDetailSerializer(place, context=context).data)
 
-        return Response({"detail": ("No places found matching your criteria.")}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response(self.not_found_payload, status=status.HTTP_404_NOT_FOUND)
+
+    @staticmethod
+    def get_mask(data):
+        mask = ATTRIBUTE_BITS['is_active']
+        mask |= mask_for_keys(data.get('expectation_keys', []), EXPECTATION_KEY_FIELDS, allow_field_names=True)
+        mask |= mask_for_keys(data.get('region_keys', []), REGION_KEY_FIELDS, allow_field_names=True)
+        return mask
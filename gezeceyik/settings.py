@@ -8,6 +8,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from django.utils.translation import gettext_lazy as _
 import os
+import sys
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  
@@ -96,6 +98,27 @@ DATABASES = {
 }
 
 
+# Cache
+# Version keys in the default cache tell every worker process when its
+# in-process state (api.attributes.AttributeIndex, api.definitions) and the
+# cached place detail / facet payloads are stale, so deployments with more than
+# one process need a cache all of them share: set REDIS_URL. Without it each
+# process gets a private LocMemCache, which `manage.py check --deploy` reports.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -126,6 +149,8 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Only the .po sources are versioned; build the .mo catalogs on deploy with
+# `python manage.py compilemessages` (needs GNU gettext).
 LOCALE_PATHS = [
     os.path.join(BASE_DIR, 'locale')
 ]
@@ -172,4 +197,55 @@ PARLER_LANGUAGES = {
 PARLER_DEFAULT_LANGUAGE_CODE = LANGUAGE_CODE
 
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '').split(',')
-CORS_ALLOW_CREDENTIALS = os.getenv('CORS_ALLOW_CREDENTIALS', 'True') == 'False'
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = os.getenv('CORS_ALLOW_CREDENTIALS', 'True') == 'False'
+
+# Serve the places list and detail, filter-options and wheel-spin with the
+# async views in api.async_views. Only worth it under ASGI (gezeceyik.asgi);
+# under WSGI every async view is run through an event loop per request. Off
+# until `manage.py benchmark_concurrency` shows a gain on the deployment's
+# hardware; so far the two paths measure within noise of each other.
+ASYNC_API_VIEWS = os.getenv('ASYNC_API_VIEWS', 'False') == 'True'
+
+# Place detail payloads are cached per (place, language, version); saves bump
+# the version through api.signals, so this only bounds how long unused entries live.
+PLACE_DETAIL_CACHE_TIMEOUT = 60 * 60 * 24
+
+# /api/places/facets/ counts are cached per filter signature and invalidated
+# like the places list; this bounds how long unused signatures are kept.
+PLACE_FACETS_CACHE_TIMEOUT = 60 * 60
+
+# Backend used by auto_translate_content: mymemory, google, libretranslate or stub
+# (see api.translation_backends). Google reads GOOGLE_APPLICATION_CREDENTIALS.
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'mymemory')
+LIBRETRANSLATE_URL = os.getenv('LIBRETRANSLATE_URL', 'https://translate.terraprint.co/')
+LIBRETRANSLATE_API_KEY = os.getenv('LIBRETRANSLATE_API_KEY')
+
+# Fraction of requests, per URL name, that get a Server-Timing header and an
+# 'api.performance' log line (see api.middleware.ServerTimingMiddleware).
+SERVER_TIMING_SAMPLE_RATES = {
+    'default': 0.0,
+    'place-list': 0.1,
+    'place-detail': 0.1,
+    'place-nearby': 0.1,
+    'wheel-spin': 0.1,
+    'filter-options': 0.1,
+}
+
+# The sampled lines are logged at INFO; `manage.py test` keeps them out of the
+# test output (tests that check them use assertLogs, which lowers the level).
+TESTING = sys.argv[1:2] == ['test']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING' if TESTING else 'INFO',
+            'propagate': False,
+        },
+    },
+}